@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark CLI startup time.
+
+Measures how long the interpreter takes to reach useful work for the
+paths launchd and users hit most, and lists the most expensive imports.
+
+Usage (from the project root):
+    python scripts/bench_startup.py            # 10 runs per scenario
+    python scripts/bench_startup.py --runs 30 --imports 20
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "interpreter": [sys.executable, "-c", "pass"],
+    "import src.main": [sys.executable, "-c", "import src.main"],
+    "--help": [sys.executable, "-m", "src.main", "--help"],
+    "import graph stack": [
+        sys.executable,
+        "-c",
+        "import src.auth.graph_auth, src.services.email_service, src.services.onenote_service",
+    ],
+}
+
+
+def time_command(command: list, runs: int) -> list:
+    """Run a command repeatedly and return wall-clock durations in ms."""
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, check=True)
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def top_imports(limit: int) -> list:
+    """Return (cumulative_us, module) for the slowest imports of src.main."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <module>"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), module.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark Note Summary startup time.")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per scenario (default: 10)")
+    parser.add_argument(
+        "--imports", type=int, default=15, help="Slowest imports to list (default: 15)"
+    )
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'median':>9} {'min':>9} {'max':>9}")
+    print("-" * 52)
+    for name, command in SCENARIOS.items():
+        durations = time_command(command, args.runs)
+        print(
+            f"{name:<22} {statistics.median(durations):8.1f}ms "
+            f"{min(durations):8.1f}ms {max(durations):8.1f}ms"
+        )
+
+    if args.imports:
+        print("\nSlowest imports for 'import src.main' (cumulative):")
+        for cumulative_us, module in top_imports(args.imports):
+            print(f"  {cumulative_us / 1000:8.1f}ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 """Microsoft Graph API authentication using MSAL interactive browser flow."""
 
 import sys
-from typing import Optional
+from typing import List, Optional
 
 from msal import PublicClientApplication
 
+from src.auth.identity import IdentityCache
+from src.auth.metadata_cache import MetadataCache
 from src.auth.token_cache import TokenCache
 from src.utils.config import AzureConfig
+from src.utils.metrics import get_metrics
 
 
 # Microsoft Graph API scopes required for this application
@@ -18,27 +21,47 @@ GRAPH_SCOPES = [
     "Notes.ReadWrite",
 ]
 
+# Extra scopes for email.folder_name (creating the inbox rule)
+FOLDER_MODE_SCOPES = ["MailboxSettings.ReadWrite"]
+
 
 class GraphAuth:
     """Handle Microsoft Graph API authentication."""
 
-    def __init__(self, config: AzureConfig):
+    def __init__(self, config: AzureConfig, scopes: Optional[List[str]] = None):
         """Initialize Graph authentication.
 
         Args:
             config: Azure AD configuration with client_id and tenant_id.
+            scopes: Scopes to request. Defaults to GRAPH_SCOPES.
         """
         self._config = config
+        self._scopes = scopes or GRAPH_SCOPES
         self._token_cache = TokenCache()
+        self._metadata_cache = MetadataCache()
+        self._identity_cache = IdentityCache()
+        self._app_instance: Optional[PublicClientApplication] = None
 
-        # Build authority URL
-        authority = f"https://login.microsoftonline.com/{config.tenant_id}"
+    @property
+    def _app(self) -> PublicClientApplication:
+        """MSAL application, built on first use.
 
-        self._app = PublicClientApplication(
-            client_id=config.client_id,
-            authority=authority,
-            token_cache=self._token_cache.cache,
-        )
+        Construction performs authority discovery, so it is deferred until
+        a token is actually needed and served from the persisted metadata
+        cache when possible.
+        """
+        if self._app_instance is None:
+            # Build authority URL
+            authority = f"https://login.microsoftonline.com/{self._config.tenant_id}"
+
+            self._app_instance = PublicClientApplication(
+                client_id=self._config.client_id,
+                authority=authority,
+                token_cache=self._token_cache.cache,
+                http_cache=self._metadata_cache,
+            )
+            self._metadata_cache.save()
+        return self._app_instance
 
     def get_access_token(self, interactive: bool = True) -> Optional[str]:
         """Get an access token for Microsoft Graph API.
@@ -52,19 +75,36 @@ class GraphAuth:
         Returns:
             Access token string, or None if authentication failed.
         """
+        metrics = get_metrics()
+
         # Try to get token silently from cache
-        accounts = self._app.get_accounts()
-        if accounts:
-            result = self._app.acquire_token_silent(GRAPH_SCOPES, account=accounts[0])
-            if result and "access_token" in result:
-                self._token_cache.save()
-                return result["access_token"]
+        with metrics.timer("note_summary_token_seconds", flow="silent"):
+            accounts = self._app.get_accounts()
+            result = None
+            if accounts:
+                result = self._app.acquire_token_silent(self._scopes, account=accounts[0])
+        if result and "access_token" in result:
+            metrics.inc("note_summary_token_requests_total", flow="silent", result="ok")
+            self._token_cache.save()
+            self._metadata_cache.save()
+            self._identity_cache.set_current(
+                accounts[0]["home_account_id"], result.get("id_token_claims")
+            )
+            return result["access_token"]
+        metrics.inc("note_summary_token_requests_total", flow="silent", result="miss")
 
         if not interactive:
             return None
 
         # No cached token, use interactive browser flow
-        return self._authenticate_interactive()
+        with metrics.timer("note_summary_token_seconds", flow="interactive"):
+            token = self._authenticate_interactive()
+        metrics.inc(
+            "note_summary_token_requests_total",
+            flow="interactive",
+            result="ok" if token else "failed",
+        )
+        return token
 
     def _authenticate_interactive(self) -> Optional[str]:
         """Authenticate using interactive browser flow.
@@ -84,7 +124,7 @@ class GraphAuth:
 
         try:
             result = self._app.acquire_token_interactive(
-                scopes=GRAPH_SCOPES,
+                scopes=self._scopes,
                 prompt="select_account",
             )
         except Exception as e:
@@ -93,6 +133,11 @@ class GraphAuth:
 
         if "access_token" in result:
             self._token_cache.save()
+            accounts = self._app.get_accounts()
+            if accounts:
+                self._identity_cache.set_current(
+                    accounts[0]["home_account_id"], result.get("id_token_claims")
+                )
             print("Authentication successful!")
             return result["access_token"]
         else:
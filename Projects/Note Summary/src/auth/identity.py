@@ -0,0 +1,126 @@
+"""Persistent cache of the signed-in user's identity (/me)."""
+
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from src.utils.config import get_data_dir
+
+
+@dataclass
+class Identity:
+    """Who the MSAL account belongs to."""
+
+    account_id: str
+    mail: str = ""
+    user_principal_name: str = ""
+    object_id: str = ""
+
+    @property
+    def address(self) -> str:
+        """Address notes are sent from: mail, else the UPN."""
+        return self.mail or self.user_principal_name
+
+    @classmethod
+    def from_claims(cls, account_id: str, claims: dict) -> "Identity":
+        """Build an identity from ID-token claims.
+
+        The mail address is only taken from the optional ``email`` claim;
+        ``preferred_username`` is the UPN, which can differ from the
+        mailbox address.
+        """
+        return cls(
+            account_id=account_id,
+            mail=claims.get("email", ""),
+            user_principal_name=claims.get("preferred_username", ""),
+            object_id=claims.get("oid", ""),
+        )
+
+
+class IdentityCache:
+    """Identities of MSAL accounts, and which account is signed in.
+
+    Written when a token is acquired and read by EmailService, so steady
+    state runs skip the /me request. Keyed by MSAL home_account_id, so
+    switching accounts never reuses another user's address.
+    """
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """Initialize identity cache.
+
+        Args:
+            cache_file: Path to cache file. Defaults to data/identity.json.
+        """
+        if cache_file is None:
+            cache_file = get_data_dir() / "identity.json"
+
+        self._cache_file = cache_file
+
+    def _load(self) -> dict:
+        try:
+            with open(self._cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {"current": None, "accounts": {}}
+        data.setdefault("accounts", {})
+        return data
+
+    def _save(self, data: dict) -> None:
+        """Atomically write the cache, readable by the owner only."""
+        self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_file.parent, prefix=".identity-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self._cache_file)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def current(self) -> Optional[Identity]:
+        """Identity of the signed-in account, if known."""
+        data = self._load()
+        account_id = data.get("current")
+        record = data["accounts"].get(account_id) if account_id else None
+        if record is None:
+            return None
+        return Identity(**record)
+
+    def set_current(self, account_id: str, claims: Optional[dict] = None) -> None:
+        """Record the signed-in account, filling in what its claims tell us.
+
+        Fields already known (e.g. mail from an earlier /me call) are kept.
+
+        Args:
+            account_id: MSAL home_account_id.
+            claims: ID-token claims, if the token response carried them.
+        """
+        data = self._load()
+        record = data["accounts"].get(account_id, {"account_id": account_id})
+        if claims:
+            for key, value in asdict(Identity.from_claims(account_id, claims)).items():
+                if value and not record.get(key):
+                    record[key] = value
+        if data.get("current") == account_id and data["accounts"].get(account_id) == record:
+            return
+        data["current"] = account_id
+        data["accounts"][account_id] = record
+        self._save(data)
+
+    def update_current(self, mail: str, user_principal_name: str, object_id: str) -> None:
+        """Store /me details for the signed-in account; no-op if none is recorded."""
+        data = self._load()
+        account_id = data.get("current")
+        if not account_id:
+            return
+        data["accounts"][account_id] = asdict(Identity(
+            account_id=account_id,
+            mail=mail,
+            user_principal_name=user_principal_name,
+            object_id=object_id,
+        ))
+        self._save(data)
@@ -0,0 +1,64 @@
+"""Persistent cache for MSAL authority and instance discovery metadata."""
+
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from src.utils.config import get_data_dir
+
+
+class MetadataCache(dict):
+    """Dict-like HTTP cache for MSAL, persisted between runs.
+
+    MSAL accepts any dict-like object as ``http_cache`` and uses it to
+    remember tenant discovery and OpenID configuration responses. Keeping
+    it on disk means a scheduled one-shot run does not refetch authority
+    metadata on every launch.
+    """
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """Initialize and load the metadata cache.
+
+        Args:
+            cache_file: Path to cache file. Defaults to data/msal_http_cache.bin.
+        """
+        super().__init__()
+        if cache_file is None:
+            cache_file = get_data_dir() / "msal_http_cache.bin"
+
+        self._cache_file = cache_file
+        self._loaded_state: bytes = b""
+        self._load()
+
+    def _load(self) -> None:
+        """Load cache from disk if it exists."""
+        if not self._cache_file.exists():
+            return
+        try:
+            with open(self._cache_file, "rb") as f:
+                self._loaded_state = f.read()
+            self.update(pickle.loads(self._loaded_state))
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            # Cache file corrupted or written by an incompatible MSAL, start fresh
+            self.clear()
+            self._loaded_state = b""
+
+    def save(self) -> None:
+        """Save cache to disk if it has changed."""
+        state = pickle.dumps(dict(self))
+        if state == self._loaded_state:
+            return
+
+        self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_file.parent, prefix=".msal-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(state)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self._cache_file)
+        except OSError:
+            os.unlink(tmp_path)
+            return
+        self._loaded_state = state
@@ -3,34 +3,68 @@
 
 import argparse
 import logging
+import math
+import os
+import socket
 import sys
+import tempfile
+import threading
 import time
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
 
-from src.auth.graph_auth import GraphAuth
-from src.processors.email_processor import EmailProcessor
-from src.services.email_service import EmailService
-from src.services.onenote_service import OneNoteService
-from src.storage.processed_tracker import ProcessedTracker
-from src.utils.config import Config
+from src.utils.config import Config, ConfigWatcher, get_data_dir, use_data_dir
+from src.utils.logging_setup import (
+    LOG_FORMATS,
+    configure_logging,
+    log_context,
+    logging_options,
+    new_correlation_id,
+)
+from src.utils.metrics import get_metrics
+from src.utils.profiling import PROFILE_MODES
+
+# Heavy dependencies (msal, requests and the services built on them) are
+# imported inside the functions that need them, so --help and config
+# errors return without paying for library boot.
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    from src.auth.graph_auth import GraphAuth
+    from src.processors.email_processor import EmailProcessor, ProcessedNote
+    from src.services.email_service import Email, EmailService
+    from src.sinks.base import Sink
+    from src.storage.job_queue import Job, JobQueue
+    from src.storage.note_store import NoteStore, StoredImage, StoredNote
+    from src.storage.processed_tracker import ProcessedTracker
+    from src.utils.cost_estimate import CostEstimate, NoteCost
+    from src.utils.instance_lock import InstanceLock
+    from src.utils.progress import RangeProgress
 
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
 
 
-def setup_logging(verbose: bool) -> None:
-    """Configure logging level."""
+def setup_logging(verbose: bool, log_format: str = "text") -> None:
+    """Configure logging level and output format."""
+    configure_logging(verbose=verbose, log_format=log_format)
     if verbose:
-        logging.getLogger().setLevel(logging.DEBUG)
         logger.debug("Verbose logging enabled")
 
 
+def _graph_auth(config: Config) -> "GraphAuth":
+    """GraphAuth requesting the scopes the configured features need."""
+    from src.auth.graph_auth import FOLDER_MODE_SCOPES, GRAPH_SCOPES, GraphAuth
+
+    scopes = GRAPH_SCOPES + (FOLDER_MODE_SCOPES if config.email.folder_name else [])
+    return GraphAuth(config.azure, scopes=scopes)
+
+
 def authenticate(config: Config, auth_only: bool = False) -> str:
     """Authenticate and get access token.
 
@@ -41,7 +75,7 @@ def authenticate(config: Config, auth_only: bool = False) -> str:
     Returns:
         Access token.
     """
-    auth = GraphAuth(config.azure)
+    auth = _graph_auth(config)
 
     if auth_only:
         logger.info("Running authentication only...")
@@ -66,15 +100,20 @@ def authenticate(config: Config, auth_only: bool = False) -> str:
     return token
 
 
-def list_notebooks(config: Config, token: str) -> None:
+def list_notebooks(
+    config: Config, token: str, session: Optional["requests.Session"] = None
+) -> None:
     """List available notebooks and sections."""
-    onenote = OneNoteService(token, config.onenote)
+    from src.services.onenote_service import OneNoteService
+
+    onenote = OneNoteService(token, config.onenote, session=session)
 
     print("\nAvailable OneNote Notebooks:")
     print("=" * 50)
 
     try:
-        notebooks = onenote.list_notebooks()
+        # One request for the whole hierarchy instead of one per notebook
+        notebooks = onenote.get_notebook_tree()
         if not notebooks:
             print("No notebooks found.")
             return
@@ -83,124 +122,1520 @@ def list_notebooks(config: Config, token: str) -> None:
             print(f"\n  Notebook: {nb.display_name}")
             print(f"  ID: {nb.id}")
 
-            sections = onenote.list_sections(nb.id)
-            if sections:
+            if nb.sections:
                 print("  Sections:")
-                for section in sections:
+                for section in nb.sections:
                     print(f"    - {section.display_name}")
             else:
                 print("  Sections: (none)")
+            for group in nb.section_groups:
+                print(f"  Section group: {group.display_name}")
+                for section in group.sections:
+                    print(f"    - {section.display_name}")
 
     except Exception as e:
-        logger.error(f"Failed to list notebooks: {e}")
+        logger.error("Failed to list notebooks: %s", e)
         sys.exit(1)
 
 
-def process_emails(config: Config, token: str, dry_run: bool = False) -> int:
+def process_emails(
+    config: Config,
+    token: str,
+    dry_run: bool = False,
+    session: Optional["requests.Session"] = None,
+    tracker: Optional["ProcessedTracker"] = None,
+    store: Optional["NoteStore"] = None,
+    sync: bool = True,
+) -> int:
     """Process pending note emails.
 
+    New notes are saved to the local note store first, then (unless sync
+    is False) the store is published to OneNote by sync_notes. A OneNote
+    outage leaves notes in the store without failing their emails.
+
     Args:
         config: Application configuration.
         token: Access token.
         dry_run: If True, don't actually create notes.
+        session: Shared HTTP session for Graph calls.
+        tracker: Processed-email tracker; a default one is opened if omitted.
+        store: Local note store; a default one is opened if omitted.
+        sync: Publish stored notes after ingesting.
 
     Returns:
-        Number of emails processed.
+        Number of emails processed into notes.
     """
-    email_service = EmailService(token, config.email)
-    onenote_service = OneNoteService(token, config.onenote)
+    from src.storage.note_store import NoteStore
+    from src.storage.processed_tracker import ProcessedTracker
+
+    if tracker is None:
+        tracker = ProcessedTracker()
+    if store is None:
+        store = NoteStore()
+
+    with get_metrics().timer("note_summary_cycle_seconds"):
+        processed = _process_emails(config, token, dry_run, session, tracker, store)
+        if sync and not dry_run:
+            sync_notes(config, token, session=session, tracker=tracker, store=store)
+    return processed
+
+
+def _process_emails(
+    config: Config,
+    token: str,
+    dry_run: bool,
+    session: Optional["requests.Session"],
+    tracker: "ProcessedTracker",
+    store: "NoteStore",
+) -> int:
+    """Fetch and ingest one batch of emails; see process_emails."""
+    from src.processors.email_processor import EmailProcessor
+    from src.auth.identity import IdentityCache
+    from src.services.email_service import EmailService
+
+    metrics = get_metrics()
+    email_service = EmailService(
+        token,
+        config.email,
+        session=session,
+        identity_cache=IdentityCache(),
+        unique_body=config.append.conversations,
+    )
     processor = EmailProcessor(config.email)
-    tracker = ProcessedTracker()
 
-    logger.info(f"Fetching emails with subject pattern: {config.email.subject_pattern}")
-    logger.info(f"Looking back {config.email.lookback_hours} hours")
+    logger.info("Fetching emails with subject patterns: %s", ", ".join(config.email.patterns))
+    logger.info("Looking back %s hours", config.email.lookback_hours)
 
+    delta_key = delta_link = None
     try:
-        emails = email_service.fetch_note_emails()
+        started = time.perf_counter()
+        with metrics.timer("note_summary_stage_seconds", stage="fetch"):
+            folder_id = _note_folder_id(config, email_service, tracker, dry_run)
+            if folder_id:
+                delta_key = f"mail_delta:{folder_id}"
+                emails, delta_link = _fetch_folder_emails(
+                    config, email_service, tracker, folder_id, delta_key
+                )
+            else:
+                emails = email_service.fetch_note_emails()
     except Exception as e:
-        logger.error(f"Failed to fetch emails: {e}")
+        logger.error("Failed to fetch emails: %s", e, extra={"stage": "fetch"})
         return 0
 
     if not emails:
         logger.info("No matching emails found.")
+        if delta_key and not dry_run:
+            tracker.save_sync_state(delta_key, delta_link)
         return 0
 
-    logger.info(f"Found {len(emails)} matching email(s)")
+    logger.info(
+        "Found %s matching email(s)",
+        len(emails),
+        extra={"stage": "fetch", "duration_ms": _elapsed_ms(started)},
+    )
+
+    estimate = None
+    if dry_run:
+        from src.utils.cost_estimate import CostEstimate
+
+        estimate = CostEstimate()
+        # /me and the message listing, then notebook and section lookups
+        estimate.add_calls("list", 2)
+        estimate.add_calls("section", 2)
+
+    if config.append.conversations:
+        # A thread's first note must be in before its replies can join it
+        emails = sorted(emails, key=lambda e: e.received_datetime)
 
     processed_count = 0
-    for email in emails:
-        # Skip already processed emails
-        if tracker.is_processed(email.id):
-            logger.debug(f"Skipping already processed: {email.subject}")
-            continue
+    if config.queue.workers != 1 and not dry_run:
+        processed_count = _ingest_with_workers(config, emails, tracker)
+    else:
+        for email in emails:
+            with log_context(correlation_id=new_correlation_id(), email_id=email.id):
+                if _ingest_one(
+                    email, config, dry_run, processor, email_service, tracker, store, estimate
+                ):
+                    processed_count += 1
 
-        logger.info(f"Processing: {email.subject}")
+    if estimate is not None:
+        _log_estimate(estimate, workers=1)
+        logger.info(
+            "[DRY RUN] %s note(s) already waiting in the local store", store.pending_count()
+        )
 
-        try:
-            # Process email into note format
-            note = processor.process_email(email)
+    # Later polls only see changes after the delta link, so it moves on
+    # only once every email is in or given up on; failures are fetched
+    # again next time
+    if delta_key and not dry_run and all(
+        tracker.is_processed(e.id) or tracker.is_dead_letter(e.id) for e in emails
+    ):
+        tracker.save_sync_state(delta_key, delta_link)
+
+    logger.info("Processed %s new email(s)", processed_count)
+    return processed_count
+
+
+def _create_job_queue(config: Config, db_path: Optional[Path] = None) -> "JobQueue":
+    """Build the configured job queue backend (queue.backend).
+
+    Raises:
+        ValueError: If the backend is not supported.
+    """
+    from src.storage.job_queue import SqliteJobQueue
+
+    if config.queue.backend == "sqlite":
+        return SqliteJobQueue(db_path)
+    raise ValueError(f"Unsupported queue backend: {config.queue.backend}")
+
+
+def _needs_ingest(email_id: str, tracker: "ProcessedTracker") -> bool:
+    """Whether a listed email is new, or failed before and is due again."""
+    if tracker.is_processed(email_id):
+        return False
+    failure = tracker.get_email_failure(email_id)
+    return failure is None or (
+        not failure["dead_lettered_at"]
+        and datetime.fromisoformat(failure["next_attempt_at"]) <= datetime.utcnow()
+    )
+
+
+def _ingest_with_workers(
+    config: Config,
+    emails: List["Email"],
+    tracker: "ProcessedTracker",
+    queue: Optional["JobQueue"] = None,
+) -> int:
+    """Queue emails for worker processes and, unless queue.workers is 0, run them.
+
+    Returns:
+        Number of the listed emails that are now processed and were not before.
+    """
+    from src.storage.job_queue import Job
+
+    if queue is None:
+        queue = _create_job_queue(config)
+    waiting = [email for email in emails if _needs_ingest(email.id, tracker)]
+    queued = queue.enqueue(
+        Job(
+            email_id=email.id,
+            subject=email.subject,
+            received_at=email.received_datetime.isoformat(),
+            conversation_id=email.conversation_id if config.append.conversations else "",
+        )
+        for email in waiting
+    )
+    logger.info("Queued %s new email(s); %s waiting in the job queue", queued, queue.count())
+    if config.queue.workers == 0:
+        return 0
+
+    _run_worker_processes(config, config.queue.workers)
+    return sum(1 for email in waiting if tracker.is_processed(email.id))
+
+
+def _run_worker_processes(config: Config, count: int) -> None:
+    """Start count worker processes and wait until they have drained the queue."""
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_worker_process,
+            args=(config, logging_options(), get_data_dir()),
+            name=f"worker-{i + 1}",
+        )
+        for i in range(count)
+    ]
+    with get_metrics().timer("note_summary_stage_seconds", stage="workers"):
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    failed = sum(1 for process in processes if process.exitcode)
+    if failed:
+        logger.warning(
+            "%s worker process(es) exited with an error; their emails are picked up again "
+            "once their leases run out",
+            failed,
+        )
+
+
+def _worker_process(config: Config, log_options: Dict[str, object], data_dir: Path) -> None:
+    """Entry point of a worker process started by _run_worker_processes.
 
-            if dry_run:
-                logger.info(f"  [DRY RUN] Would create note: {note.title}")
+    Args:
+        config: Application configuration.
+        log_options: The parent's logging setup (see logging_options).
+        data_dir: The parent's data directory, so the worker shares its
+            tracker, note store and job queue.
+    """
+    from src.services.http_session import close_session, create_session
+
+    configure_logging(**log_options)
+    use_data_dir(data_dir)
+    auth = _graph_auth(config)
+    session = create_session()
+    try:
+        run_worker(config, partial(auth.get_access_token, interactive=False), session=session)
+    finally:
+        close_session(session)
+
+
+def run_worker(
+    config: Config,
+    get_token: Callable[[], Optional[str]],
+    session: Optional["requests.Session"] = None,
+    tracker: Optional["ProcessedTracker"] = None,
+    store: Optional["NoteStore"] = None,
+    queue: Optional["JobQueue"] = None,
+    wait: bool = False,
+    poll_seconds: float = 10.0,
+    worker_id: Optional[str] = None,
+) -> int:
+    """Ingest emails from the job queue into the local note store.
+
+    Emails are claimed one at a time under a lease of queue.lease_seconds,
+    which a background thread renews while the worker is alive. Each is
+    fetched by ID and ingested like in a single-process run; the fetching
+    process (or daemon) publishes the resulting notes.
+
+    Args:
+        config: Application configuration.
+        get_token: Returns a current access token, or None once sign-in is
+            needed again.
+        session: Shared HTTP session for Graph calls.
+        tracker: Processed-email tracker; a default one is opened if omitted.
+        store: Local note store; a default one is opened if omitted.
+        queue: Job queue; the configured one is opened if omitted.
+        wait: Keep polling an empty queue every poll_seconds instead of
+            returning.
+        poll_seconds: Seconds between polls of an empty queue.
+        worker_id: Lease owner name; defaults to host:pid.
+
+    Returns:
+        Number of emails ingested into new notes.
+    """
+    from src.auth.identity import IdentityCache
+    from src.processors.email_processor import EmailProcessor
+    from src.services.email_service import EmailService
+    from src.storage.note_store import NoteStore
+    from src.storage.processed_tracker import ProcessedTracker
+
+    if tracker is None:
+        tracker = ProcessedTracker()
+    if store is None:
+        store = NoteStore()
+    if queue is None:
+        queue = _create_job_queue(config)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    lease_seconds = config.queue.lease_seconds
+    processor = EmailProcessor(config.email)
+    email_service = None
+    token = None
+    processed = 0
+
+    stopping = threading.Event()
+
+    def renew_leases() -> None:
+        while not stopping.wait(lease_seconds / 3):
+            try:
+                queue.heartbeat(worker_id, lease_seconds)
+            except Exception as e:
+                logger.warning("Failed to renew job leases: %s", e)
+
+    heartbeat = threading.Thread(target=renew_leases, name="lease-heartbeat", daemon=True)
+    heartbeat.start()
+    logger.info("Worker %s started", worker_id)
+    try:
+        while True:
+            jobs = queue.claim(worker_id, lease_seconds)
+            if not jobs:
+                if not wait:
+                    break
+                time.sleep(poll_seconds)
                 continue
+            [job] = jobs
+
+            current_token = get_token()
+            if not current_token:
+                logger.warning("Token expired. Please re-authenticate.")
+                break
+            if current_token != token:
+                token = current_token
+                email_service = EmailService(
+                    token,
+                    config.email,
+                    session=session,
+                    identity_cache=IdentityCache(),
+                    unique_body=config.append.conversations,
+                )
+
+            with log_context(correlation_id=new_correlation_id(), email_id=job.email_id):
+                if _ingest_job(job, config, processor, email_service, tracker, store):
+                    processed += 1
+            queue.complete(job.email_id, worker_id)
+    finally:
+        stopping.set()
+        # Emails claimed but not finished (Ctrl+C, expired token) go back
+        queue.release(worker_id)
+
+    logger.info("Worker %s ingested %s email(s)", worker_id, processed)
+    return processed
+
+
+def _ingest_job(
+    job: "Job",
+    config: Config,
+    processor: "EmailProcessor",
+    email_service: "EmailService",
+    tracker: "ProcessedTracker",
+    store: "NoteStore",
+) -> bool:
+    """Fetch a queued email and ingest it; see _ingest_one."""
+    # Claimed again and again without finishing: workers crash on it
+    if job.attempts > config.retry.max_attempts:
+        tracker.record_email_failure(
+            job.email_id, job.subject, datetime.fromisoformat(job.received_at),
+            f"Claimed {job.attempts} times without finishing", max_attempts=1,
+        )
+        logger.error("Gave up on %s after %s claims; retry with --requeue %s",
+                     job.subject, job.attempts, job.email_id)
+        get_metrics().inc("note_summary_dead_letters_total", stage="queue")
+        return False
+
+    try:
+        email = email_service.fetch_email(job.email_id)
+    except Exception as e:
+        # Still unprocessed, so the next check lists and queues it again
+        logger.error("Failed to fetch queued email: %s", e)
+        return False
+    if email is None:
+        logger.info("Queued email %s no longer exists", job.subject)
+        return False
+    return _ingest_one(email, config, False, processor, email_service, tracker, store)
+
+
+def _note_folder_id(
+    config: Config,
+    email_service: "EmailService",
+    tracker: "ProcessedTracker",
+    dry_run: bool,
+) -> Optional[str]:
+    """ID of the note folder when email.folder_name is set, provisioning it once.
+
+    The first run creates the folder and the inbox rule that moves notes
+    into it. A dry run never provisions and searches the mailbox instead.
+
+    Returns:
+        Folder ID, or None to search the whole mailbox.
+    """
+    name = config.email.folder_name
+    if not name:
+        return None
+
+    key = _folder_key(config)
+    folder_id = tracker.get_sync_state(key)
+    if folder_id:
+        return folder_id
+    if dry_run:
+        logger.info("[DRY RUN] Would create mail folder %r and its inbox rule", name)
+        return None
+
+    folder_id = email_service.ensure_note_folder(name)
+    email_service.ensure_note_rule(folder_id)
+    tracker.save_sync_state(key, folder_id)
+    logger.info("Notes are moved to mail folder %r by inbox rule", name)
+    return folder_id
+
+
+def _folder_key(config: Config) -> str:
+    """Sync-state key of the provisioned note folder; new settings provision again."""
+    return f"mail_folder:{config.email.folder_name}:{','.join(config.email.patterns)}"
+
+
+def _fetch_folder_emails(
+    config: Config,
+    email_service: "EmailService",
+    tracker: "ProcessedTracker",
+    folder_id: str,
+    delta_key: str,
+) -> Tuple[List["Email"], str]:
+    """Poll the note folder from the saved delta link.
+
+    A delta link the server no longer accepts is dropped and the folder is
+    read again over the lookback period. If the folder itself is gone it is
+    provisioned again on the next run.
+    """
+    from src.services.email_service import MailFolderNotFound
+
+    delta_link = tracker.get_sync_state(delta_key)
+    try:
+        if delta_link:
+            try:
+                return email_service.fetch_folder_emails(folder_id, delta_link)
+            except MailFolderNotFound:
+                logger.warning("Mail folder delta state expired; listing the folder again")
+                tracker.save_sync_state(delta_key, None)
+        return email_service.fetch_folder_emails(folder_id)
+    except MailFolderNotFound:
+        tracker.save_sync_state(_folder_key(config), None)
+        raise
+
+
+def _log_estimate(estimate: "CostEstimate", workers: int) -> None:
+    """Log the aggregate cost of a dry run."""
+    logger.info("[DRY RUN] Estimated cost of a real run:")
+    for line in estimate.summary_lines(workers):
+        logger.info("  %s", line)
 
-            # Create OneNote page
-            page_id = onenote_service.create_page(note.title, note.html_content)
-            logger.info(f"  Created OneNote page: {note.title}")
 
-            # Mark as processed
+def _ingest_one(
+    email: "Email",
+    config: Config,
+    dry_run: bool,
+    processor: "EmailProcessor",
+    email_service: "EmailService",
+    tracker: "ProcessedTracker",
+    store: "NoteStore",
+    estimate: Optional["CostEstimate"] = None,
+) -> bool:
+    """Process a single email into the local note store.
+
+    In a dry run nothing is written; the cost a real run would incur is
+    logged and, if given, added to estimate.
+
+    Returns:
+        True if a new note was stored for publishing.
+    """
+    from src.processors.fingerprint import simhash
+    from src.processors.grouping import entry_html, note_group
+    from src.processors.inline_images import has_inline_images
+    from src.services.circuit_breaker import CircuitOpenError
+    from src.storage.note_store import StoredNote
+
+    metrics = get_metrics()
+
+    # Skip already processed emails
+    if tracker.is_processed(email.id):
+        logger.debug("Skipping already processed: %s", email.subject)
+        metrics.inc("note_summary_emails_total", outcome="skipped")
+        return False
+
+    # Emails that failed before wait out their backoff; dead letters wait
+    # for --requeue
+    failure = tracker.get_email_failure(email.id)
+    if failure is not None:
+        if failure["dead_lettered_at"]:
+            logger.debug("Skipping dead letter: %s", email.subject)
+            metrics.inc("note_summary_emails_total", outcome="dead_letter")
+            return False
+        if not dry_run and datetime.fromisoformat(failure["next_attempt_at"]) > datetime.utcnow():
+            logger.debug("Skipping until %s (failed %s time(s)): %s",
+                         failure["next_attempt_at"], failure["attempts"], email.subject)
+            metrics.inc("note_summary_emails_total", outcome="backoff")
+            return False
+
+    logger.info("Processing: %s", email.subject)
+
+    try:
+        # Conversation mode: a reply goes onto its thread's page with only the
+        # text it adds (uniqueBody), not the quoted history of the thread
+        thread = None
+        if config.append.conversations and email.conversation_id:
+            thread = tracker.get_conversation(email.conversation_id)
+        source = email
+        if thread is not None and email.unique_body_content:
+            source = replace(
+                email,
+                body_content=email.unique_body_content,
+                body_content_type=email.unique_body_content_type or email.body_content_type,
+            )
+
+        # Process email into note format
+        cpu_started = time.thread_time()
+        with metrics.timer("note_summary_stage_seconds", stage="process"), \
+                metrics.cpu_timer("note_summary_processor_cpu_seconds"):
+            note = processor.process_email(source)
+        cpu_seconds = time.thread_time() - cpu_started
+        if note.stripped_bytes:
+            logger.info("  Stripped %s bytes of quoted replies and signature",
+                        note.stripped_bytes)
+            metrics.inc("note_summary_stripped_bytes_total", note.stripped_bytes)
+
+        # Check for an earlier note with the same content; a short reply
+        # ("Thanks!") belongs to its thread however often it was sent before
+        note_simhash = None
+        if config.dedup.policy != "off" and thread is None:
+            if config.dedup.near_duplicates:
+                note_simhash = simhash(f"{note.title} {note.plain_text}")
+            original = tracker.find_duplicate(
+                note.content_hash, note_simhash, config.dedup.max_distance
+            )
+            if original is not None:
+                if dry_run:
+                    cost = _estimate_cost(
+                        email, note, "", "duplicate", config, email_service, cpu_seconds
+                    )
+                    if config.dedup.policy == "append":
+                        cost.calls["append_page"] = 1
+                    _report_cost(cost, estimate)
+                return _handle_duplicate(
+                    email, note, original, config, dry_run, email_service, tracker, store
+                )
+
+        # Append mode: the note goes onto its group's page when published
+        group = None if thread else note_group(email.subject, note, config.append.group_by)
+        html_content = entry_html(note) if group or thread else note.html_content
+
+        if dry_run:
+            group_page = tracker.get_group_page(group.key) if group else None
+            if thread is not None:
+                action = "append_page"
+                logger.info("  [DRY RUN] Would append reply to conversation: %s", note.title)
+            elif group_page and group_page["note_count"] < config.append.max_notes_per_page:
+                action = "append_page"
+                logger.info("  [DRY RUN] Would append note to page: %s", group.page_title)
+            else:
+                action = "create_page"
+                logger.info("  [DRY RUN] Would create note: %s", note.title)
+            cost = _estimate_cost(
+                source, note, html_content, action, config, email_service, cpu_seconds
+            )
+            _report_cost(cost, estimate)
+            metrics.inc("note_summary_emails_total", outcome="dry_run")
+            return False
+
+        # Embed inline images (cid: references) as multipart parts
+        images = []
+        if config.onenote.embed_inline_images and has_inline_images(html_content):
+            with metrics.timer("note_summary_stage_seconds", stage="inline_images"):
+                html_content, images, image_hashes = _prepare_images(
+                    source, html_content, config, email_service, tracker
+                )
+            if image_hashes:
+                tracker.record_images(image_hashes)
+
+        # Persist locally first; sync_notes publishes it
+        with metrics.timer("note_summary_stage_seconds", stage="store"):
+            store.put(
+                StoredNote(
+                    email_id=email.id,
+                    subject=email.subject,
+                    title=note.title,
+                    html_content=html_content,
+                    received_at=email.received_datetime.isoformat(),
+                    content_hash=note.content_hash,
+                    plain_text=note.plain_text,
+                    images=images,
+                    group_key=group.key if group else None,
+                    group_title=group.page_title if group else None,
+                    pattern=note.pattern or None,
+                    append_to_email_id=thread["email_id"] if thread else None,
+                )
+            )
+
+        # Mark as processed
+        with metrics.timer("note_summary_stage_seconds", stage="tracker_commit"):
             tracker.mark_processed(
                 email_id=email.id,
                 subject=email.subject,
                 received_at=email.received_datetime,
-                onenote_page_id=page_id,
+                content_hash=note.content_hash,
+                simhash=note_simhash,
             )
+            tracker.index_note(email.id, note.title, note.plain_text)
+            if config.append.conversations and email.conversation_id:
+                tracker.record_conversation_message(email.conversation_id, email.id)
+
+        _mark_read(email, config, email_service)
+
+        metrics.inc("note_summary_emails_total", outcome="processed")
+        return True
+
+    except Exception as e:
+        logger.error("  Failed to process email: %s", e)
+        metrics.inc("note_summary_emails_total", outcome="failed")
+        # An open circuit refused a call without trying it: not the email's fault
+        if not dry_run and not isinstance(e, CircuitOpenError):
+            failure = tracker.record_email_failure(
+                email.id, email.subject, email.received_datetime, str(e),
+                config.retry.max_attempts,
+            )
+            if failure["dead_lettered_at"]:
+                logger.error("  Gave up after %s attempts; retry with --requeue %s",
+                             failure["attempts"], email.id)
+                metrics.inc("note_summary_dead_letters_total", stage="ingest")
+        return False
+
+
+def _estimate_cost(
+    email: "Email",
+    note: "ProcessedNote",
+    html_content: str,
+    action: str,
+    config: Config,
+    email_service: "EmailService",
+    cpu_seconds: float,
+) -> "NoteCost":
+    """Work out what writing a note would cost in a real run.
+
+    Inline image sizes come from attachment metadata only, so the estimate
+    costs one small call per email with images instead of downloading them.
+    """
+    from src.processors.inline_images import has_inline_images
+    from src.services.email_service import MAX_BATCH_REQUESTS
+    from src.utils.cost_estimate import NoteCost
+
+    cost = NoteCost(email.id, note.title, action, cpu_seconds=cpu_seconds)
+    if html_content:
+        cost.calls[action] = 1
+        cost.payload_bytes = len(html_content.encode("utf-8"))
+        if config.onenote.embed_inline_images and has_inline_images(html_content):
+            sizes = email_service.fetch_inline_attachment_sizes(email.id)
+            sizes = [size for size in sizes if size <= config.onenote.max_image_bytes]
+            # The listing, then a $batch download per 20 images within the cap
+            cost.calls["attachments"] = 1 + math.ceil(len(sizes) / MAX_BATCH_REQUESTS)
+            cost.payload_bytes += sum(sizes)
+    if config.email.mark_as_read and not email.is_read:
+        cost.calls["mark_as_read"] = 1
+    return cost
+
+
+def _report_cost(cost: "NoteCost", estimate: Optional["CostEstimate"]) -> None:
+    """Log a dry-run note cost and add it to the aggregate."""
+    logger.info("  [DRY RUN] Cost: %s", cost.describe())
+    if estimate is not None:
+        estimate.add(cost)
+
+
+def _mark_read(email: "Email", config: Config, email_service: "EmailService") -> None:
+    """Optionally mark a handled email as read."""
+    if config.email.mark_as_read and not email.is_read:
+        started = time.perf_counter()
+        with get_metrics().timer("note_summary_stage_seconds", stage="mark_as_read"):
+            email_service.mark_as_read(email.id)
+        logger.debug(
+            "  Marked email as read",
+            extra={"stage": "mark_as_read", "duration_ms": _elapsed_ms(started)},
+        )
+
+
+def _handle_duplicate(
+    email: "Email",
+    note: "ProcessedNote",
+    original: dict,
+    config: Config,
+    dry_run: bool,
+    email_service: "EmailService",
+    tracker: "ProcessedTracker",
+    store: "NoteStore",
+) -> bool:
+    """Apply the dedup policy to a note that matches an earlier one.
+
+    Returns:
+        Always False: no new note is created for a duplicate.
+    """
+    from src.storage.note_store import StoredNote
+
+    policy = config.dedup.policy
+    logger.info(
+        "  Duplicate of %s (%s); policy: %s", original["subject"], original["email_id"], policy
+    )
+    get_metrics().inc("note_summary_emails_total", outcome="duplicate")
+
+    if dry_run:
+        return False
+
+    if policy == "append":
+        # Published after the original, onto the original's page
+        received = email.received_datetime.strftime("%Y-%m-%d %H:%M:%S UTC")
+        store.put(
+            StoredNote(
+                email_id=email.id,
+                subject=email.subject,
+                title=note.title,
+                html_content=f"<p><em>Received again: {received}</em></p>",
+                received_at=email.received_datetime.isoformat(),
+                content_hash=note.content_hash,
+                append_to_email_id=original["email_id"],
+            )
+        )
+
+    tracker.mark_processed(
+        email_id=email.id,
+        subject=email.subject,
+        received_at=email.received_datetime,
+        content_hash=note.content_hash,
+        duplicate_of=original["email_id"],
+        # The original may still be waiting in the note store; the tracker
+        # fills in its page when it is published
+        link_to_original=policy == "link",
+    )
+    _mark_read(email, config, email_service)
+    return False
+
 
-            # Optionally mark email as read
-            if config.email.mark_as_read and not email.is_read:
-                email_service.mark_as_read(email.id)
-                logger.debug(f"  Marked email as read")
+def _prepare_images(
+    email: "Email",
+    html_content: str,
+    config: Config,
+    email_service: "EmailService",
+    tracker: "ProcessedTracker",
+) -> Tuple[str, List["StoredImage"], List[str]]:
+    """Fetch a message's inline images and rewrite the HTML to reference them.
 
-            processed_count += 1
+    Returns:
+        Rewritten HTML, the images to upload with the page and their
+        content hashes.
+    """
+    from src.processors.inline_images import content_hash, prepare_inline_images
+    from src.storage.note_store import StoredImage
 
+    attachments = email_service.fetch_inline_attachments(
+        email.id, config.onenote.max_image_bytes
+    )
+    repeated = tracker.get_repeated_images(
+        (content_hash(a) for a in attachments),
+        config.onenote.skip_repeated_images_after,
+    )
+    result = prepare_inline_images(
+        html_content,
+        attachments,
+        max_image_bytes=config.onenote.max_image_bytes,
+        max_total_bytes=config.onenote.max_page_image_bytes,
+        skip_hashes=repeated,
+    )
+    logger.debug(
+        "  Embedding %s image(s) (%s bytes), dropped %s",
+        len(result.parts),
+        result.upload_bytes,
+        result.dropped,
+    )
+    images = [
+        StoredImage(part.name, part.content_type, part.base64_data or "") for part in result.parts
+    ]
+    return result.html_content, images, result.uploaded_hashes
+
+
+def sync_notes(
+    config: Config,
+    token: str,
+    session: Optional["requests.Session"] = None,
+    tracker: Optional["ProcessedTracker"] = None,
+    store: Optional["NoteStore"] = None,
+    workers: int = 1,
+    pool: Optional["ThreadPoolExecutor"] = None,
+) -> int:
+    """Publish notes waiting in the local store to the enabled sinks.
+
+    Notes are published oldest first. A note leaves the store once every
+    sink has it; one that fails stays and is retried with exponential
+    backoff by later syncs, without holding up the others. Notes that
+    affect each other (same append group, or appended to the same earlier
+    note) share a lane and keep their order; lanes run in parallel when
+    workers > 1.
+
+    Args:
+        config: Application configuration.
+        token: Access token.
+        session: Shared HTTP session for Graph calls.
+        tracker: Processed-email tracker; a default one is opened if omitted.
+        store: Local note store; a default one is opened if omitted.
+        workers: Concurrent publishers.
+        pool: Executor to run lanes on; a temporary one is used if omitted.
+
+    Returns:
+        Number of notes published.
+    """
+    from src.storage.note_store import NoteStore
+    from src.storage.processed_tracker import ProcessedTracker
+
+    if tracker is None:
+        tracker = ProcessedTracker()
+    if store is None:
+        store = NoteStore()
+
+    notes = store.pending()
+    if not notes:
+        return 0
+
+    sinks: List["Sink"] = []
+    unavailable: Dict[str, str] = {}
+    for sink in _create_sinks(config, token, session, tracker):
+        try:
+            sink.open()
+            sinks.append(sink)
         except Exception as e:
-            logger.error(f"  Failed to process email: {e}")
-            continue
+            logger.error("Sink %s unavailable; it will be retried: %s", sink.name, e)
+            unavailable[sink.name] = f"unavailable: {e}"
+    if not sinks:
+        logger.error("No sink available; %s note(s) stay in the local store", len(notes))
+        return 0
 
-    logger.info(f"Processed {processed_count} new email(s)")
-    return processed_count
+    logger.info("Publishing %s stored note(s) to %s", len(notes), ", ".join(s.name for s in sinks))
+    workers = max(1, workers)
+    by_lane: List[List["StoredNote"]] = [[] for _ in range(workers)]
+    for note in notes:
+        key = note.group_key or note.append_to_email_id or note.email_id
+        by_lane[hash(key) % workers].append(note)
+    lanes = [lane for lane in by_lane if lane]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Each lane hands its notes to every sink at once, so a sync takes as
+    # long as the slowest sink rather than the sum of them
+    fanout = None
+    if len(sinks) > 1:
+        fanout = ThreadPoolExecutor(
+            max_workers=len(sinks) * len(lanes), thread_name_prefix="sink"
+        )
+
+    def run_lane(lane: List["StoredNote"]) -> int:
+        return _publish_lane(
+            lane, sinks, unavailable, tracker, store, fanout, config.retry.max_attempts
+        )
+
+    try:
+        with get_metrics().timer("note_summary_stage_seconds", stage="sync"):
+            if len(lanes) == 1:
+                return run_lane(lanes[0])
+            if pool is not None:
+                return sum(pool.map(run_lane, lanes))
+
+            with ThreadPoolExecutor(max_workers=len(lanes), thread_name_prefix="sync") as own_pool:
+                return sum(own_pool.map(run_lane, lanes))
+    finally:
+        if fanout is not None:
+            fanout.shutdown()
+        for sink in sinks:
+            sink.close()
+
+
+def _create_sinks(
+    config: Config,
+    token: str,
+    session: Optional["requests.Session"],
+    tracker: "ProcessedTracker",
+) -> List["Sink"]:
+    """Build the enabled sinks."""
+    sinks: List["Sink"] = []
+    if "markdown" in config.sinks.enabled:
+        from src.sinks.markdown_sink import MarkdownSink
+
+        base_dir = config.source_path.parent if config.source_path else Path.cwd()
+        sinks.append(MarkdownSink(config.markdown, tracker, base_dir))
+    if "onenote" in config.sinks.enabled:
+        from src.sinks.onenote_sink import OneNoteSink
+
+        sinks.append(OneNoteSink(config, token, tracker, session=session))
+    return sinks
+
+
+def _publish_lane(
+    lane: List["StoredNote"],
+    sinks: List["Sink"],
+    unavailable: Dict[str, str],
+    tracker: "ProcessedTracker",
+    store: "NoteStore",
+    fanout: Optional["ThreadPoolExecutor"] = None,
+    max_attempts: Optional[int] = None,
+) -> int:
+    """Publish a lane of stored notes to every sink.
+
+    Each sink only gets the notes it does not have yet, so a note that
+    failed in one sink is retried there alone. A note a sink keeps
+    rejecting is dead-lettered after max_attempts; failures of a sink that
+    could not be opened do not count towards that.
+
+    Args:
+        lane: Notes in publishing order.
+        sinks: Open sinks.
+        unavailable: Error per enabled sink that could not be opened.
+        tracker: Processed-email tracker (per-sink delivery state).
+        store: Local note store.
+        fanout: Executor to run the sinks on concurrently; sequential if omitted.
+        max_attempts: Failed attempts before a note is dead-lettered; None
+            retries forever.
+
+    Returns:
+        Number of notes now in every sink; the others are rescheduled in
+        the store.
+    """
+    metrics = get_metrics()
+    email_ids = [note.email_id for note in lane]
+
+    def run_sink(sink: "Sink") -> Tuple["Sink", list]:
+        delivered = tracker.get_delivered(email_ids, sink.name)
+        todo = [note for note in lane if note.email_id not in delivered]
+        return sink, sink.publish_batch(todo) if todo else []
+
+    outcomes = fanout.map(run_sink, sinks) if fanout is not None else map(run_sink, sinks)
+
+    errors: Dict[str, List[str]] = {}
+    # Notes a sink that was up failed on, as opposed to a sink being down
+    rejected: Set[str] = set()
+    for sink, results in outcomes:
+        for result in results:
+            if result.ok:
+                tracker.record_sink_location(result.note.email_id, sink.name, result.location)
+                metrics.inc("note_summary_sink_notes_total", sink=sink.name, outcome="delivered")
+            else:
+                tracker.record_sink_failure(result.note.email_id, sink.name, result.error)
+                metrics.inc("note_summary_sink_notes_total", sink=sink.name, outcome="failed")
+                errors.setdefault(result.note.email_id, []).append(f"{sink.name}: {result.error}")
+                if not result.transient:
+                    rejected.add(result.note.email_id)
+
+    for name, error in unavailable.items():
+        delivered = tracker.get_delivered(email_ids, name)
+        for email_id in email_ids:
+            if email_id not in delivered:
+                errors.setdefault(email_id, []).append(f"{name}: {error}")
+
+    published = 0
+    for note in lane:
+        error = "; ".join(errors.get(note.email_id, []))
+        if not error:
+            store.complete(note)
+            metrics.inc("note_summary_emails_total", outcome="published")
+            published += 1
+        else:
+            with log_context(email_id=note.email_id):
+                logger.error("  Failed to publish note %s: %s", note.title, error)
+            metrics.inc("note_summary_emails_total", outcome="publish_failed")
+            if store.record_failure(
+                note, error, max_attempts if note.email_id in rejected else None
+            ):
+                with log_context(email_id=note.email_id):
+                    logger.error("  Gave up after %s attempts; retry with --requeue %s",
+                                 note.attempts, note.email_id)
+                metrics.inc("note_summary_dead_letters_total", stage="publish")
+    return published
+
+
+def _elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.perf_counter() reading."""
+    return round((time.perf_counter() - started) * 1000, 2)
 
 
-def run_daemon(config: Config, token: str, interval: int = 300) -> None:
+def run_daemon(
+    config: Config,
+    token: str,
+    interval: int = 300,
+    session: Optional["requests.Session"] = None,
+    metrics_file: Optional[Path] = None,
+    max_ticks: Optional[int] = None,
+    lock: Optional["InstanceLock"] = None,
+) -> None:
     """Run in continuous monitoring mode.
 
+    Mail is ingested into the local note store on the main thread; a
+    background thread publishes the store to OneNote, woken after every
+    check, so slow or unavailable OneNote never delays ingestion. A
+    one-shot run started while the daemon holds the instance lock wakes
+    it with SIGUSR1 to check immediately instead of waiting out interval.
+
     Args:
         config: Application configuration.
         token: Access token.
         interval: Seconds between checks.
+        session: Shared HTTP session for Graph calls.
+        metrics_file: If set, rewrite metrics to this file after every check.
+        max_ticks: Stop after this many checks (runs forever if None). The
+            store is synced once more before returning.
+        lock: The instance lock this daemon holds; it stops if another
+            instance takes the lock over.
     """
-    logger.info(f"Starting daemon mode. Checking every {interval} seconds.")
+    logger.info("Starting daemon mode. Checking every %s seconds.", interval)
     logger.info("Press Ctrl+C to stop.")
 
-    auth = GraphAuth(config.azure)
+    from src.storage.note_store import NoteStore
+    from src.storage.processed_tracker import ProcessedTracker
+    from src.utils.instance_lock import handle_wake_signal
 
-    while True:
-        try:
-            # Refresh token if needed
-            current_token = auth.get_access_token(interactive=False)
-            if not current_token:
-                logger.warning("Token expired. Please re-authenticate.")
+    # Long-lived state survives config reloads; only settings are swapped
+    auth = _graph_auth(config)
+    tracker = ProcessedTracker()
+    store = NoteStore()
+    watcher = (
+        ConfigWatcher(config, snapshot_path=_snapshot_path())
+        if config.source_path is not None
+        else None
+    )
+    ticks = 0
+
+    token_lock = threading.Lock()
+
+    def fresh_token() -> Optional[str]:
+        with token_lock:
+            return auth.get_access_token(interactive=False)
+
+    wake_sync = threading.Event()
+    stopping = threading.Event()
+
+    def lost_lock() -> bool:
+        return lock is not None and not lock.held
+
+    def sync_loop() -> None:
+        while not stopping.is_set():
+            wake_sync.wait(interval)
+            wake_sync.clear()
+            if stopping.is_set() or lost_lock():
                 break
+            try:
+                sync_token = fresh_token()
+                if sync_token:
+                    sync_notes(config, sync_token, session=session, tracker=tracker, store=store)
+            except Exception as e:
+                logger.error("Error during sync: %s", e)
 
-            process_emails(config, current_token)
+    sync_thread = threading.Thread(target=sync_loop, name="sync", daemon=True)
+    sync_thread.start()
 
-        except KeyboardInterrupt:
-            logger.info("Shutting down...")
-            break
-        except Exception as e:
-            logger.error(f"Error during processing: {e}")
+    wake = threading.Event()
+    restore_wake_handler = handle_wake_signal(wake)
+
+    try:
+        while True:
+            if lost_lock():
+                logger.error("Another instance took over the instance lock; stopping")
+                break
+            try:
+                # Refresh token if needed
+                current_token = fresh_token()
+                if not current_token:
+                    logger.warning("Token expired. Please re-authenticate.")
+                    break
+
+                if watcher is not None:
+                    watcher.poll()
+                    config = watcher.current
+
+                process_emails(
+                    config, current_token, session=session, tracker=tracker, store=store,
+                    sync=False,
+                )
+                wake_sync.set()
+
+                if metrics_file:
+                    get_metrics().write_prometheus(metrics_file)
+
+            except KeyboardInterrupt:
+                logger.info("Shutting down...")
+                break
+            except Exception as e:
+                logger.error("Error during processing: %s", e)
+
+            ticks += 1
+            if max_ticks is not None and ticks >= max_ticks:
+                logger.info("Completed %s check(s). Stopping.", ticks)
+                stopping.set()
+                wake_sync.set()
+                sync_thread.join()
+                final_token = fresh_token()
+                if final_token:
+                    sync_notes(config, final_token, session=session, tracker=tracker, store=store)
+                break
+
+            if wake.wait(interval):
+                logger.info("Woken by another run; checking now")
+            wake.clear()
+    finally:
+        restore_wake_handler()
+        stopping.set()
+        wake_sync.set()
+
+
+# Concurrent page writes per backfill. OneNote throttles per user well
+# before this; 429s beyond it are absorbed by the session's Retry-After
+# handling rather than failing notes.
+MAX_BACKFILL_WORKERS = 8
+
+
+def run_backfill(
+    config: Config,
+    token: str,
+    since: datetime,
+    until: Optional[datetime] = None,
+    session: Optional["requests.Session"] = None,
+    tracker: Optional["ProcessedTracker"] = None,
+    workers: int = 4,
+    chunk_days: int = 7,
+    dry_run: bool = False,
+    refresh_token: Optional[Callable[[], Optional[str]]] = None,
+    store: Optional["NoteStore"] = None,
+    lock: Optional["InstanceLock"] = None,
+) -> int:
+    """Import historical notes from a date range, ignoring lookback_hours.
+
+    The range is walked oldest first in chunks of chunk_days. Each page of
+    mail is ingested into the local note store and then published with
+    up to `workers` concurrent lanes (see sync_notes). After each chunk
+    the tracker records a checkpoint, so an interrupted run resumes where
+    it stopped. The checkpoint only moves past chunks where every email
+    was ingested; on resume, later chunks are listed again but their
+    processed emails are skipped. Notes that fail to publish stay in the
+    store and are retried by later syncs.
+
+    Args:
+        config: Application configuration.
+        token: Access token.
+        since: Start of the range (inclusive).
+        until: End of the range (exclusive). If None, the range ends when
+            the run first starts; resuming it keeps that end.
+        session: Shared HTTP session for Graph calls.
+        tracker: Processed-email tracker; a default one is opened if omitted.
+        workers: Concurrent page writers (at most MAX_BACKFILL_WORKERS).
+        chunk_days: Days covered per checkpoint.
+        dry_run: If True, don't create notes or checkpoints.
+        refresh_token: Returns a fresh access token; called before each chunk.
+        store: Local note store; a default one is opened if omitted.
+        lock: The instance lock this run holds; if another instance takes
+            it over, the run stops after the current chunk.
+
+    Returns:
+        Number of notes published to OneNote.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.processors.email_processor import EmailProcessor
+    from src.storage.note_store import NoteStore
+    from src.storage.processed_tracker import ProcessedTracker
+
+    if tracker is None:
+        tracker = ProcessedTracker()
+    if store is None:
+        store = NoteStore()
+    workers = max(1, min(workers, MAX_BACKFILL_WORKERS))
+    run_key = f"{since.isoformat()}/{until.isoformat() if until else 'open'}"
+    processor = EmailProcessor(config.email)
+
+    checkpoint = tracker.get_backfill_checkpoint(run_key)
+    if until is None:
+        if checkpoint and checkpoint["until_at"]:
+            until = datetime.fromisoformat(checkpoint["until_at"])
+        else:
+            until = datetime.now(timezone.utc)
+            if not dry_run:
+                tracker.save_backfill_checkpoint(run_key, since, 0, 0, until=until)
+    if checkpoint and checkpoint["completed_at"] and not dry_run:
+        logger.info("Backfill of this range already completed at %s", checkpoint["completed_at"])
+        return 0
+
+    cursor = since
+    if checkpoint and not dry_run:
+        cursor = datetime.fromisoformat(checkpoint["cursor"])
+        logger.info("Resuming backfill from %s", cursor.strftime("%Y-%m-%d %H:%M"))
+
+    from src.utils.progress import RangeProgress
+
+    progress = RangeProgress(since, until, resumed_at=cursor)
+    estimate = None
+    if dry_run:
+        from src.utils.cost_estimate import CostEstimate
+
+        estimate = CostEstimate()
+    base_emails = checkpoint["emails"] if checkpoint else 0
+    base_written = checkpoint["written"] if checkpoint else 0
+    # Moves only while every chunk so far succeeded completely
+    checkpoint_cursor: Optional[datetime] = cursor
+
+    logger.info(
+        "Backfilling %s to %s with %s worker(s)",
+        since.strftime("%Y-%m-%d"), until.strftime("%Y-%m-%d"), workers,
+    )
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill") as pool:
+        while cursor < until:
+            if lock is not None and not lock.held:
+                logger.error("Another instance took over the instance lock; stopping backfill")
+                break
+            chunk_end = min(cursor + timedelta(days=chunk_days), until)
+            if refresh_token is not None:
+                token = refresh_token() or token
+
+            failed = _backfill_chunk(
+                config, token, cursor, chunk_end, session, tracker, store, processor, pool,
+                workers, dry_run, progress, estimate,
+            )
+
+            progress.advance(chunk_end)
+            if failed:
+                checkpoint_cursor = None
+            elif checkpoint_cursor is not None:
+                checkpoint_cursor = chunk_end
+            if checkpoint_cursor is not None and not dry_run:
+                tracker.save_backfill_checkpoint(
+                    run_key,
+                    checkpoint_cursor,
+                    base_emails + progress.emails,
+                    base_written + progress.written,
+                    completed=checkpoint_cursor >= until,
+                    until=until,
+                )
+
+            logger.info("Backfill: %s", progress.summary())
+            cursor = chunk_end
+
+    if estimate is not None:
+        _log_estimate(estimate, workers)
+    if progress.failed:
+        logger.warning(
+            "%s email(s) failed; run the same backfill again to retry them", progress.failed
+        )
+    return progress.written
+
+
+def _backfill_chunk(
+    config: Config,
+    token: str,
+    since: datetime,
+    until: datetime,
+    session: Optional["requests.Session"],
+    tracker: "ProcessedTracker",
+    store: "NoteStore",
+    processor: "EmailProcessor",
+    pool: "ThreadPoolExecutor",
+    workers: int,
+    dry_run: bool,
+    progress: "RangeProgress",
+    estimate: Optional["CostEstimate"] = None,
+) -> int:
+    """Ingest and publish one backfill chunk; returns the number of failed emails."""
+    from src.processors.inline_images import has_inline_images
+    from src.auth.identity import IdentityCache
+    from src.services.email_service import EmailService
+
+    email_service = EmailService(
+        token,
+        config.email,
+        session=session,
+        identity_cache=IdentityCache(),
+        unique_body=config.append.conversations,
+    )
+    if estimate is not None:
+        # Each chunk's fresh services look up /me and the section again
+        estimate.add_calls("list")
+        estimate.add_calls("section", 2)
+
+    failed = 0
+    for page in email_service.iter_note_emails(since, until):
+        if estimate is not None:
+            estimate.add_calls("list")
+        pending = [email for email in page if not tracker.is_processed(email.id)]
+        progress.emails += len(page)
+        if not pending:
+            continue
+
+        if config.onenote.embed_inline_images and not dry_run:
+            with_images = [e.id for e in pending if has_inline_images(e.body_content)]
+            if with_images:
+                email_service.prefetch_inline_attachments(
+                    with_images, config.onenote.max_image_bytes
+                )
+
+        for email in pending:
+            with log_context(correlation_id=new_correlation_id(), email_id=email.id):
+                _ingest_one(
+                    email, config, dry_run, processor, email_service, tracker, store, estimate
+                )
+            if not dry_run and not (
+                tracker.is_processed(email.id) or tracker.is_dead_letter(email.id)
+            ):
+                failed += 1
+                progress.failed += 1
+
+        if not dry_run:
+            progress.written += sync_notes(
+                config, token, session=session, tracker=tracker, store=store,
+                workers=workers, pool=pool,
+            )
+
+    return failed
+
+
+def _snapshot_path() -> Path:
+    """Location of the compiled config snapshot."""
+    return get_data_dir() / "config.snapshot.json"
+
+
+def run_profiled(
+    config: Config,
+    token: str,
+    args: argparse.Namespace,
+    session: Optional["requests.Session"] = None,
+) -> None:
+    """Run one cycle, or a bounded number of daemon checks, under the profiler.
+
+    Args:
+        config: Application configuration.
+        token: Access token.
+        args: Parsed command-line arguments.
+        session: Shared HTTP session for Graph calls.
+    """
+    if args.daemon:
+        def target():
+            run_daemon(
+                config,
+                token,
+                args.interval,
+                session=session,
+                metrics_file=args.metrics_file,
+                max_ticks=args.profile_ticks,
+            )
+    else:
+        def target():
+            return process_emails(config, token, dry_run=args.dry_run, session=session)
+
+    from src.utils.profiling import profile_call
+
+    _, result = profile_call(target, get_data_dir() / "profiles", mode=args.profile)
+
+    logger.info(
+        "Profile: %.3fs wall, %.3fs network wait, %.3fs processor CPU",
+        result.wall_seconds,
+        result.network_seconds,
+        result.processor_cpu_seconds,
+    )
+    logger.info("Profile report: %s", result.report_path)
+    logger.info("Collapsed stacks: %s", result.collapsed_path)
+
+
+def search_notes(query: str, limit: int = 20) -> None:
+    """Search captured notes in the local full-text index and print matches."""
+    from src.storage.processed_tracker import ProcessedTracker
+
+    started = time.perf_counter()
+    try:
+        results = ProcessedTracker().search(query, limit=limit)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    print(f"\n{len(results)} result(s) for {query!r} in {_elapsed_ms(started)} ms")
+    print("=" * 50)
+    for number, result in enumerate(results, 1):
+        received = (result["received_at"] or "")[:10]
+        print(f"\n{number}. {result['title']}  ({received})")
+        print(f"   {result['snippet']}")
+
+
+def list_dead_letters() -> None:
+    """Print emails and notes given up on after repeated failures."""
+    from src.storage.note_store import NoteStore
+    from src.storage.processed_tracker import ProcessedTracker
+
+    emails = ProcessedTracker().get_dead_letters()
+    notes = NoteStore().dead_letters()
+
+    print(f"\n{len(emails)} email(s) that failed to process")
+    print("=" * 50)
+    for failure in emails:
+        print(f"\n{failure['subject']}  ({failure['received_at'][:10]})")
+        print(f"   ID: {failure['email_id']}")
+        print(f"   {failure['attempts']} attempt(s); last error: {failure['last_error']}")
+
+    print(f"\n{len(notes)} note(s) that failed to publish")
+    print("=" * 50)
+    for note in notes:
+        print(f"\n{note.title}  ({note.received_at[:10]})")
+        print(f"   ID: {note.email_id}")
+        print(f"   {note.attempts} attempt(s); last error: {note.last_error}")
 
-        time.sleep(interval)
+
+def requeue_dead_letters(email_ids: List[str]) -> None:
+    """Give dead-lettered emails and notes a fresh set of attempts.
+
+    Requeued notes are published by the next sync. Requeued emails are
+    processed when the next run fetches them again, which needs them to
+    be within lookback_hours (or a --backfill-from range).
+    """
+    from src.storage.note_store import NoteStore
+    from src.storage.processed_tracker import ProcessedTracker
+
+    tracker = ProcessedTracker()
+    store = NoteStore()
+    missing = []
+    for email_id in email_ids:
+        if store.requeue(email_id):
+            logger.info("Requeued note %s; the next sync publishes it", email_id)
+        elif tracker.clear_email_failure(email_id):
+            # Folder delta links have moved past it; list the folder again
+            tracker.clear_sync_state("mail_delta:")
+            logger.info("Requeued email %s; the next run processes it", email_id)
+        else:
+            missing.append(email_id)
+    if missing:
+        logger.error("Not a dead letter: %s", ", ".join(missing))
+        sys.exit(1)
+
+
+def _parse_date(value: str) -> datetime:
+    """Parse a YYYY-MM-DD (or ISO datetime) argument as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r} (expected YYYY-MM-DD)")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _lock_mode(args: argparse.Namespace) -> Optional[str]:
+    """Instance-lock mode for a command line, or None if it needs no lock.
+
+    Listing notebooks, signing in and dry runs change no local state and
+    run alongside anything.
+    """
+    if args.list_notebooks or args.auth_only or args.dry_run:
+        return None
+    # Workers coordinate through job leases and run alongside the fetcher;
+    # replays use their own data directory
+    if args.worker or args.replay:
+        return None
+    if args.daemon:
+        return "daemon"
+    if args.backfill_from:
+        return "backfill"
+    if args.sync_only:
+        return "sync"
+    return "run"
+
+
+def acquire_instance_lock(mode: str) -> Optional["InstanceLock"]:
+    """Take the single-instance lock, or leave the work to whoever holds it.
+
+    A plain run that finds the daemon holding the lock wakes it to check
+    mail now, and one that overlaps a slow earlier run (launchd fires on
+    schedule regardless) skips its turn; both return None. Other modes
+    exit with an error rather than work alongside another instance.
+
+    Args:
+        mode: "run", "daemon", "backfill" or "sync".
+
+    Returns:
+        The held lock, or None if this run should stop without working.
+    """
+    from src.utils.instance_lock import LOCK_FILENAME, InstanceLock, wake
+
+    lock = InstanceLock(get_data_dir() / LOCK_FILENAME, mode=mode)
+    if lock.acquire():
+        return lock
+
+    holder = lock.read_holder()
+    who = (
+        f"pid {holder.pid}, {holder.mode} since {holder.started_at}"
+        if holder is not None
+        else "unreadable lock file"
+    )
+    if mode == "run":
+        if holder is not None and holder.mode == "daemon" and wake(holder):
+            logger.info("Daemon is running (%s); asked it to check mail now", who)
+        else:
+            logger.info("Another run is in progress (%s); skipping this one", who)
+        return None
+    logger.error("Another instance holds %s (%s); not starting", lock.path, who)
+    sys.exit(1)
 
 
 def main() -> None:
@@ -214,6 +1649,14 @@ Examples:
   python -m src.main --list-notebooks  # Show available notebooks
   python -m src.main                   # Process pending emails
   python -m src.main --daemon          # Continuous monitoring
+  python -m src.main --sync-only       # Publish notes stored while OneNote was down
+  python -m src.main --backfill-from 2026-01-01     # Import historical notes
+  python -m src.main --search "quarterly budget"    # Search captured notes offline
+  python -m src.main --dead-letters                 # Show emails/notes that keep failing
+  python -m src.main --requeue EMAIL_ID             # Retry one of them
+  python -m src.main --worker --daemon              # Ingest mail queued by another instance
+  python -m src.main --record data/cycle.jsonl.gz   # Capture Graph traffic
+  python -m src.main --replay data/cycle.jsonl.gz   # Re-run a captured cycle offline
         """,
     )
 
@@ -248,39 +1691,282 @@ Examples:
         action="store_true",
         help="Enable verbose output",
     )
+    parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default="text",
+        help="Log output format; json emits one JSON object per line (default: text)",
+    )
     parser.add_argument(
         "--config",
         type=Path,
         help="Path to configuration file",
     )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        nargs="?",
+        const=Path(""),
+        metavar="PATH",
+        help="Write Prometheus metrics to a file (default: data/metrics.prom)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="Serve Prometheus metrics on localhost:PORT/metrics in daemon mode",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=PROFILE_MODES,
+        help="Profile one cycle (or --profile-ticks daemon checks); reports go to data/profiles",
+    )
+    parser.add_argument(
+        "--profile-ticks",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Number of daemon checks to profile with --daemon --profile (default: 1)",
+    )
+    parser.add_argument(
+        "--record",
+        type=Path,
+        metavar="CASSETTE",
+        help="Record all Graph traffic to a cassette file (tokens are redacted)",
+    )
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        metavar="CASSETTE",
+        help="Serve Graph traffic from a recorded cassette instead of the network",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        choices=["original", "max"],
+        default="original",
+        help="Replay with recorded latencies or as fast as possible (default: original)",
+    )
+
+    parser.add_argument(
+        "--backfill-from",
+        type=_parse_date,
+        metavar="DATE",
+        help="Import notes received since DATE (YYYY-MM-DD), ignoring lookback_hours; "
+             "resumable",
+    )
+    parser.add_argument(
+        "--backfill-to",
+        type=_parse_date,
+        metavar="DATE",
+        help="End of the backfill range, exclusive (default: now)",
+    )
+    parser.add_argument(
+        "--backfill-workers",
+        type=int,
+        default=4,
+        metavar="N",
+        help=f"Concurrent page writers during backfill (default: 4, max: {MAX_BACKFILL_WORKERS})",
+    )
+    parser.add_argument(
+        "--backfill-chunk-days",
+        type=int,
+        default=7,
+        metavar="N",
+        help="Days per backfill checkpoint (default: 7)",
+    )
+
+    parser.add_argument(
+        "--sync-only",
+        action="store_true",
+        help="Publish notes waiting in the local store without fetching mail",
+    )
+    parser.add_argument(
+        "--search",
+        metavar="QUERY",
+        help="Search captured notes in the local index (offline) and exit",
+    )
+    parser.add_argument(
+        "--search-limit",
+        type=int,
+        default=20,
+        metavar="N",
+        help="Maximum search results (default: 20)",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Ingest emails queued by another instance (queue.workers: 0) until the "
+             "queue is empty; with --daemon, keep waiting for more",
+    )
+    parser.add_argument(
+        "--dead-letters",
+        action="store_true",
+        help="List emails and notes given up on after repeated failures, and exit",
+    )
+    parser.add_argument(
+        "--requeue",
+        action="append",
+        metavar="EMAIL_ID",
+        help="Retry a dead-lettered email or note (repeatable), and exit",
+    )
 
     args = parser.parse_args()
 
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    if args.replay and (args.daemon or args.auth_only):
+        parser.error("--replay only supports one-shot runs and --list-notebooks")
+    if args.backfill_to and not args.backfill_from:
+        parser.error("--backfill-to requires --backfill-from")
+    if args.backfill_from and args.daemon:
+        parser.error("--backfill-from cannot be combined with --daemon")
+    if args.backfill_chunk_days < 1:
+        parser.error("--backfill-chunk-days must be at least 1")
+    if args.worker and (args.backfill_from or args.sync_only or args.dry_run):
+        parser.error("--worker cannot be combined with --backfill-from, --sync-only or --dry-run")
+    if args.metrics_port is not None and not args.daemon:
+        parser.error("--metrics-port requires --daemon")
+
     # Set up logging
-    setup_logging(args.verbose)
+    setup_logging(args.verbose, args.log_format)
+
+    # A replay starts from empty state, so it reproduces the recorded cycle
+    # and leaves the real tracker, note store and caches alone
+    if args.replay:
+        replay_dir = Path(tempfile.mkdtemp(prefix="note-summary-replay-"))
+        use_data_dir(replay_dir)
+        logger.info("Replaying into %s", replay_dir)
+
+    # Metrics are only recorded when something will export them
+    if args.metrics_file == Path(""):
+        args.metrics_file = get_data_dir() / "metrics.prom"
+    if args.metrics_file or args.metrics_port is not None:
+        get_metrics().enabled = True
+    if args.metrics_port is not None:
+        from src.utils.metrics import start_http_server
+
+        start_http_server(get_metrics(), args.metrics_port)
+        logger.info("Serving metrics on http://127.0.0.1:%s/metrics", args.metrics_port)
+
+    # Searching and dead-letter handling only touch local state: no config
+    # or sign-in needed
+    if args.search is not None:
+        search_notes(args.search, limit=args.search_limit)
+        return
+    if args.dead_letters:
+        list_dead_letters()
+        return
+    if args.requeue:
+        requeue_dead_letters(args.requeue)
+        return
 
+    # One instance at a time works on the mailbox and local state
+    mode = _lock_mode(args)
+    lock = None
+    if mode is not None:
+        lock = acquire_instance_lock(mode)
+        if lock is None:
+            return
+    try:
+        _run(args, lock)
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+def _run(args: argparse.Namespace, lock: Optional["InstanceLock"] = None) -> None:
+    """Load config, sign in and run the action selected on the command line.
+
+    Long-running actions stop early if the instance lock (when held) is lost.
+    """
     # Load configuration
     try:
-        config = Config.load(args.config)
+        config = Config.load(args.config, snapshot_path=_snapshot_path())
     except FileNotFoundError as e:
         logger.error(str(e))
         sys.exit(1)
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         sys.exit(1)
 
-    # Authenticate
-    token = authenticate(config, auth_only=args.auth_only)
+    # Authenticate (replayed traffic carries redacted tokens, so skip it)
+    if args.replay:
+        token = "replay"
+        # Markdown notes of a replay go next to its state, not into the vault
+        vault = get_data_dir() / "vault"
+        vault.mkdir(exist_ok=True)
+        config = replace(config, markdown=replace(config.markdown, vault_path=str(vault)))
+    else:
+        token = authenticate(config, auth_only=args.auth_only)
+
+    # A cassette is one ordered stream of this process's traffic, so worker
+    # processes could neither replay from it nor record into it
+    if (args.record or args.replay) and config.queue.workers != 1:
+        logger.info("Ingesting in this process while recording or replaying")
+        config = replace(config, queue=replace(config.queue, workers=1))
+
+    from src.services.http_session import close_session, create_session
+
+    try:
+        session = create_session(
+            record_to=args.record,
+            replay_from=args.replay,
+            replay_speed=args.replay_speed,
+            pool_size=max(10, args.backfill_workers + 2),
+        )
+    except (OSError, ValueError) as e:
+        logger.error("Failed to open cassette: %s", e)
+        sys.exit(1)
 
     # Execute requested action
-    if args.list_notebooks:
-        list_notebooks(config, token)
-    elif args.daemon:
-        run_daemon(config, token, args.interval)
-    else:
-        processed = process_emails(config, token, dry_run=args.dry_run)
-        if args.dry_run:
-            logger.info("Dry run complete. No changes made.")
+    try:
+        if args.list_notebooks:
+            list_notebooks(config, token, session=session)
+        elif args.profile:
+            run_profiled(config, token, args, session)
+        elif args.sync_only:
+            published = sync_notes(config, token, session=session)
+            logger.info("Published %s stored note(s)", published)
+        elif args.backfill_from:
+            refresh_token = None
+            if not args.replay:
+                auth = _graph_auth(config)
+                refresh_token = partial(auth.get_access_token, interactive=False)
+            run_backfill(
+                config,
+                token,
+                args.backfill_from,
+                args.backfill_to,
+                session=session,
+                workers=args.backfill_workers,
+                chunk_days=args.backfill_chunk_days,
+                dry_run=args.dry_run,
+                refresh_token=refresh_token,
+                lock=lock,
+            )
+        elif args.worker:
+            get_token = (lambda: token) if args.replay else partial(
+                _graph_auth(config).get_access_token, interactive=False
+            )
+            run_worker(config, get_token, session=session, wait=args.daemon)
+        elif args.daemon:
+            run_daemon(
+                config, token, args.interval, session=session, metrics_file=args.metrics_file,
+                lock=lock,
+            )
+        else:
+            processed = process_emails(config, token, dry_run=args.dry_run, session=session)
+            if args.dry_run:
+                logger.info("Dry run complete. No changes made.")
+    finally:
+        close_session(session)
+        if args.metrics_file:
+            get_metrics().write_prometheus(args.metrics_file)
+            logger.info("Wrote metrics to %s", args.metrics_file)
+        if args.record:
+            logger.info("Recorded Graph traffic to %s", args.record)
 
 
 if __name__ == "__main__":
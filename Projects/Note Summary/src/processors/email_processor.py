@@ -6,6 +6,9 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+from src.processors.fingerprint import content_fingerprint, html_to_text
+from src.processors.reply_stripper import ReplyStripper, StripResult, is_forward
+from src.processors.subject_matcher import SubjectMatcher
 from src.services.email_service import Email
 from src.utils.config import EmailConfig
 
@@ -18,6 +21,12 @@ class ProcessedNote:
     title: str
     html_content: str
     received_datetime: datetime
+    plain_text: str = ""
+    content_hash: str = ""
+    # Subject pattern the email matched, for routing
+    pattern: str = ""
+    # Bytes of quoted history and signature dropped from the body
+    stripped_bytes: int = 0
 
 
 class EmailProcessor:
@@ -30,12 +39,13 @@ class EmailProcessor:
             config: Email configuration.
         """
         self._config = config
-        self._pattern = config.subject_pattern
+        self._matcher = SubjectMatcher(config.patterns)
+        self._stripper = ReplyStripper(config.signature_patterns)
 
     def extract_title(self, subject: str) -> str:
         """Extract note title from email subject.
 
-        Removes the subject pattern prefix and strips whitespace.
+        Removes the matching subject pattern prefix and strips whitespace.
 
         Args:
             subject: Email subject line.
@@ -43,12 +53,8 @@ class EmailProcessor:
         Returns:
             Extracted title.
         """
-        # Remove the pattern prefix (case-insensitive)
-        pattern_len = len(self._pattern)
-        if subject.lower().startswith(self._pattern.lower()):
-            title = subject[pattern_len:].strip()
-        else:
-            title = subject.strip()
+        # Remove the longest matching pattern prefix (case-insensitive)
+        title = self._matcher.strip(subject)
 
         # Ensure we have a title
         return title if title else "Untitled Note"
@@ -87,6 +93,26 @@ class EmailProcessor:
 
         return cleaned.strip()
 
+    def strip_replies(self, content: str, content_type: str, subject: str = "") -> StripResult:
+        """Remove quoted replies and the signature from an email body.
+
+        Quoted history is only removed when email.strip_quoted_replies is
+        set. Forwards keep both their quoted part and any signature in it.
+
+        Args:
+            content: Email body content.
+            content_type: Content type (html or text).
+            subject: Email subject, to recognise forwards.
+
+        Returns:
+            The stripped body and how many bytes were removed.
+        """
+        forward = is_forward(subject, content)
+        quotes = self._config.strip_quoted_replies and not forward
+        if content_type.lower() == "text":
+            return self._stripper.strip_text(content, quotes, signature=not forward)
+        return self._stripper.strip_html(content, quotes, signature=not forward)
+
     def create_metadata_footer(self, email: Email) -> str:
         """Create a metadata footer for the note.
 
@@ -116,14 +142,22 @@ class EmailProcessor:
             Processed note ready for OneNote.
         """
         title = self.extract_title(email.subject)
-        body_html = self.clean_html_content(email.body_content, email.body_content_type)
+        stripped = self.strip_replies(
+            email.body_content, email.body_content_type, email.subject
+        )
+        body_html = self.clean_html_content(stripped.content, email.body_content_type)
         footer = self.create_metadata_footer(email)
 
         html_content = f"{body_html}\n{footer}"
+        plain_text = html_to_text(body_html)
 
         return ProcessedNote(
             email_id=email.id,
             title=title,
             html_content=html_content,
             received_datetime=email.received_datetime,
+            plain_text=plain_text,
+            content_hash=content_fingerprint(title, plain_text),
+            pattern=self._matcher.match(email.subject) or "",
+            stripped_bytes=stripped.bytes_removed,
         )
@@ -0,0 +1,74 @@
+"""Content fingerprints for detecting duplicate notes."""
+
+import hashlib
+import html
+import re
+from typing import Iterable
+
+
+SIMHASH_BITS = 64
+# Near-duplicate lookups split the SimHash into this many bands; two
+# hashes within (SIMHASH_BANDS - 1) bits share at least one band exactly.
+SIMHASH_BANDS = 4
+MAX_SIMHASH_DISTANCE = SIMHASH_BANDS - 1
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def html_to_text(html_content: str) -> str:
+    """Strip tags and entities and collapse whitespace."""
+    text = _TAG_RE.sub(" ", html_content)
+    return _WS_RE.sub(" ", html.unescape(text)).strip()
+
+
+def normalize(text: str) -> str:
+    """Normalize text for comparison: lowercase, single spaces."""
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+def content_fingerprint(title: str, body_text: str) -> str:
+    """Exact-match fingerprint over the normalized title and body text.
+
+    Args:
+        title: Note title (subject with the pattern prefix removed).
+        body_text: Plain text of the cleaned body, without the metadata footer.
+
+    Returns:
+        Hex SHA-256 digest.
+    """
+    payload = f"{normalize(title)}\n{normalize(body_text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _shingles(words: list, size: int = 3) -> Iterable[str]:
+    if len(words) < size:
+        yield " ".join(words)
+        return
+    for i in range(len(words) - size + 1):
+        yield " ".join(words[i:i + size])
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word trigrams of normalized text."""
+    words = _WORD_RE.findall(normalize(text))
+    weights = [0] * SIMHASH_BITS
+    for shingle in _shingles(words):
+        digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        h = int.from_bytes(digest, "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def simhash_bands(value: int) -> list:
+    """Split a SimHash into equal-width integer bands."""
+    width = SIMHASH_BITS // SIMHASH_BANDS
+    mask = (1 << width) - 1
+    return [(value >> (i * width)) & mask for i in range(SIMHASH_BANDS)]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
@@ -0,0 +1,60 @@
+"""Group notes onto shared pages for append mode."""
+
+import html
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src.processors.email_processor import ProcessedNote
+
+
+# Leading bracketed tag of a subject, e.g. "Note:Deal" in "[Note:Deal] Acme renewal"
+_TAG_RE = re.compile(r"^\s*\[([^\]]+)\]")
+
+
+def subject_tag(subject: str) -> str:
+    """Return the leading [bracketed] tag of a subject, or "" if there is none."""
+    match = _TAG_RE.match(subject)
+    return match.group(1).strip() if match else ""
+
+
+@dataclass
+class NoteGroup:
+    """The shared page a note belongs to."""
+
+    key: str
+    page_title: str
+
+
+def note_group(subject: str, note: ProcessedNote, group_by: List[str]) -> Optional[NoteGroup]:
+    """Work out which group page a note should be appended to.
+
+    Args:
+        subject: Original email subject (for the tag).
+        note: Processed note.
+        group_by: Grouping keys from AppendConfig.group_by.
+
+    Returns:
+        The group, or None when append mode is off.
+    """
+    if not group_by:
+        return None
+
+    values = {
+        "title": note.title,
+        "day": note.received_datetime.strftime("%Y-%m-%d"),
+        "tag": subject_tag(subject),
+    }
+    parts = [f"{key}={values[key].lower()}" for key in group_by]
+
+    if "title" in group_by:
+        page_title = note.title
+    else:
+        page_title = " ".join(f"[{values[key]}]" if key == "tag" else values[key]
+                              for key in group_by if values[key])
+    return NoteGroup(key="|".join(parts), page_title=page_title or note.title)
+
+
+def entry_html(note: ProcessedNote) -> str:
+    """HTML for one note as an entry on a group page."""
+    return f"<h2>{html.escape(note.title)}</h2>\n{note.html_content}"
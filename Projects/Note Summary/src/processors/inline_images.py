@@ -0,0 +1,114 @@
+"""Rewrite cid: image references into OneNote multipart part references."""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+from src.services.email_service import Attachment
+from src.services.multipart import MultipartPart, decoded_length
+
+
+# Matches an <img> tag whose src is a cid: reference, capturing the content ID
+_CID_IMG_RE = re.compile(
+    r"""<img\b[^>]*?\bsrc\s*=\s*["']cid:([^"']+)["'][^>]*>""",
+    re.IGNORECASE,
+)
+
+
+def has_inline_images(html_content: str) -> bool:
+    """Check whether HTML references any cid: images."""
+    return "cid:" in html_content and _CID_IMG_RE.search(html_content) is not None
+
+
+def content_hash(attachment: Attachment) -> str:
+    """Stable content hash of an attachment (over its base64 payload)."""
+    return hashlib.sha256(attachment.content_base64.encode("ascii")).hexdigest()
+
+
+@dataclass
+class InlineImageResult:
+    """Outcome of preparing inline images for a page."""
+
+    html_content: str
+    parts: List[MultipartPart] = field(default_factory=list)
+    # Hashes of images included as parts, for the repeat-image cache
+    uploaded_hashes: List[str] = field(default_factory=list)
+    dropped: int = 0
+    upload_bytes: int = 0
+
+
+def prepare_inline_images(
+    html_content: str,
+    attachments: List[Attachment],
+    max_image_bytes: int,
+    max_total_bytes: int,
+    skip_hashes: Set[str],
+) -> InlineImageResult:
+    """Replace cid: references with name: part references.
+
+    Each distinct image becomes a single part, even if the body references
+    it several times. Images that are missing, larger than
+    max_image_bytes, would push the page past max_total_bytes, or whose
+    hash is in skip_hashes (recurring logos and signatures) are removed
+    from the HTML rather than left as broken references.
+
+    Args:
+        html_content: Cleaned note HTML.
+        attachments: Inline attachments of the source message.
+        max_image_bytes: Per-image size cap.
+        max_total_bytes: Cap on the sum of all image parts.
+        skip_hashes: Content hashes to drop instead of uploading.
+
+    Returns:
+        Rewritten HTML and the multipart image parts.
+    """
+    by_cid = {a.content_id.lower(): a for a in attachments}
+    part_names: Dict[str, str] = {}
+    result = InlineImageResult(html_content=html_content)
+
+    def replace(match: "re.Match[str]") -> str:
+        attachment = by_cid.get(match.group(1).strip("<>").lower())
+        if attachment is None:
+            result.dropped += 1
+            return ""
+
+        digest = content_hash(attachment)
+        if digest in part_names:
+            return _set_src(match.group(0), f"name:{part_names[digest]}")
+
+        size = decoded_length(attachment.content_base64)
+        if (
+            digest in skip_hashes
+            or size > max_image_bytes
+            or result.upload_bytes + size > max_total_bytes
+        ):
+            result.dropped += 1
+            return ""
+
+        name = f"image{len(part_names) + 1}"
+        part_names[digest] = name
+        result.parts.append(
+            MultipartPart(
+                name=name,
+                content_type=attachment.content_type,
+                base64_data=attachment.content_base64,
+            )
+        )
+        result.uploaded_hashes.append(digest)
+        result.upload_bytes += size
+        return _set_src(match.group(0), f"name:{name}")
+
+    result.html_content = _CID_IMG_RE.sub(replace, html_content)
+    return result
+
+
+def _set_src(img_tag: str, src: str) -> str:
+    """Replace the src attribute value of an <img> tag."""
+    return re.sub(
+        r"""(\bsrc\s*=\s*["'])cid:[^"']+(["'])""",
+        lambda m: f"{m.group(1)}{src}{m.group(2)}",
+        img_tag,
+        count=1,
+        flags=re.IGNORECASE,
+    )
@@ -0,0 +1,195 @@
+"""Convert cleaned note HTML to Markdown."""
+
+import re
+from html.parser import HTMLParser
+from typing import Callable, List, Optional
+
+
+_BLOCK_TAGS = {"p", "div", "section", "article", "header", "footer", "table"}
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_SKIP_TAGS = {"script", "style", "head", "title"}
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_TRAILING_WS_RE = re.compile(r"[ \t]+\n")
+# Characters that would otherwise start Markdown formatting inside text
+_ESCAPE_RE = re.compile(r"([\\`*_\[\]])")
+
+
+class _MarkdownWriter(HTMLParser):
+    """Walks the HTML and emits Markdown for the common formatting tags.
+
+    Unknown tags are dropped and their text kept, so anything the converter
+    does not understand still reads as plain text.
+    """
+
+    def __init__(self, image_src: Optional[Callable[[str], str]]):
+        super().__init__(convert_charrefs=True)
+        self._image_src = image_src
+        self._out: List[str] = []
+        self._lists: List[List] = []  # [ordered, next number]
+        self._links: List[Optional[str]] = []
+        self._skip = 0
+        self._pre = 0
+        self._quote = 0
+        self._rows = 0  # rows written in the current table
+        self._cells = 0  # cells in the current row
+
+    # Output helpers
+
+    def _write(self, text: str) -> None:
+        if self._quote and "\n" in text:
+            text = text.replace("\n", "\n" + "> " * self._quote)
+        self._out.append(text)
+
+    def _newlines(self, count: int) -> None:
+        """End the current line and leave up to count-1 blank lines."""
+        current = "".join(self._out[-4:])
+        trailing = len(current) - len(current.rstrip("\n"))
+        if not self._out or trailing >= count:
+            return
+        self._write("\n" * (count - trailing))
+
+    # Parser callbacks
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attrs = dict(attrs)
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _HEADINGS:
+            self._newlines(2)
+            self._write("#" * _HEADINGS[tag] + " ")
+        elif tag in _BLOCK_TAGS and tag != "table":
+            self._newlines(2)
+        elif tag == "br":
+            self._write("  \n")
+        elif tag == "hr":
+            self._newlines(2)
+            self._write("---")
+            self._newlines(2)
+        elif tag in ("strong", "b"):
+            self._write("**")
+        elif tag in ("em", "i"):
+            self._write("*")
+        elif tag in ("s", "del", "strike"):
+            self._write("~~")
+        elif tag == "code" and not self._pre:
+            self._write("`")
+        elif tag == "pre":
+            self._newlines(2)
+            self._write("```\n")
+            self._pre += 1
+        elif tag == "blockquote":
+            self._newlines(2)
+            self._quote += 1
+            self._write("> ")
+        elif tag in ("ul", "ol"):
+            self._newlines(1 if self._lists else 2)
+            self._lists.append([tag == "ol", 1])
+        elif tag == "li":
+            self._newlines(1)
+            depth = max(0, len(self._lists) - 1)
+            marker = "-"
+            if self._lists and self._lists[-1][0]:
+                marker = f"{self._lists[-1][1]}."
+                self._lists[-1][1] += 1
+            self._write("    " * depth + marker + " ")
+        elif tag == "table":
+            self._newlines(2)
+            self._rows = 0
+        elif tag == "tr":
+            self._newlines(1)
+            self._write("|")
+            self._cells = 0
+        elif tag in ("td", "th"):
+            self._write(" ")
+            self._cells += 1
+        elif tag == "a":
+            href = attrs.get("href")
+            self._links.append(href)
+            if href:
+                self._write("[")
+        elif tag == "img":
+            src = attrs.get("src") or ""
+            if self._image_src is not None:
+                src = self._image_src(src)
+            if src:
+                alt = (attrs.get("alt") or "").replace("]", "")
+                self._write(f"![{alt}]({src.replace(' ', '%20')})")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _HEADINGS or tag in _BLOCK_TAGS:
+            self._newlines(2)
+        elif tag in ("td", "th"):
+            self._write(" |")
+        elif tag == "tr":
+            if self._rows == 0:
+                # Markdown tables need a header separator after the first row
+                self._write("\n|" + " --- |" * max(1, self._cells))
+            self._rows += 1
+            self._newlines(1)
+        elif tag in ("strong", "b"):
+            self._write("**")
+        elif tag in ("em", "i"):
+            self._write("*")
+        elif tag in ("s", "del", "strike"):
+            self._write("~~")
+        elif tag == "code" and not self._pre:
+            self._write("`")
+        elif tag == "pre" and self._pre:
+            self._pre -= 1
+            self._newlines(1)
+            self._write("```")
+            self._newlines(2)
+        elif tag == "blockquote" and self._quote:
+            self._quote -= 1
+            self._newlines(2)
+        elif tag in ("ul", "ol") and self._lists:
+            self._lists.pop()
+            self._newlines(1 if self._lists else 2)
+        elif tag == "a" and self._links:
+            href = self._links.pop()
+            if href:
+                self._write(f"]({href})")
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.handle_starttag(tag, attrs)
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+        if self._pre:
+            self._write(data)
+            return
+        text = re.sub(r"\s+", " ", data)
+        if not text.strip() and (not self._out or self._out[-1].endswith(("\n", " "))):
+            return
+        self._write(_ESCAPE_RE.sub(r"\\\1", text))
+
+    def markdown(self) -> str:
+        text = _TRAILING_WS_RE.sub(lambda m: "  \n" if m.group(0).startswith("  ") else "\n",
+                                   "".join(self._out))
+        return _BLANK_LINES_RE.sub("\n\n", text).strip() + "\n"
+
+
+def html_to_markdown(
+    html_content: str,
+    image_src: Optional[Callable[[str], str]] = None,
+) -> str:
+    """Convert note HTML to Markdown.
+
+    Handles the formatting notes actually use: headings, paragraphs, line
+    breaks, bold/italic, links, lists, quotes, code, rules and images.
+
+    Args:
+        html_content: Cleaned note HTML.
+        image_src: Maps an <img> src to the Markdown link target; an empty
+            result drops the image. Defaults to keeping src unchanged.
+
+    Returns:
+        Markdown text ending in a newline.
+    """
+    writer = _MarkdownWriter(image_src)
+    writer.feed(html_content)
+    writer.close()
+    return writer.markdown()
@@ -0,0 +1,260 @@
+"""Strip quoted replies, forwarded history and signatures from note bodies."""
+
+import html
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from src.utils.config import DEFAULT_SIGNATURE_PATTERNS
+
+
+# Reply markers in HTML bodies; each is a plain substring check first, so
+# bodies without quoted history skip the regex entirely.
+# Outlook desktop/web: the header block above the quoted message
+_OUTLOOK_REPLY_RE = re.compile(
+    r"""(?:<hr[^>]*>\s*)?<div[^>]*\bid=["']?divRplyFwdMsg""", re.IGNORECASE
+)
+# Gmail: the quote container (the "On ... wrote:" attribution sits inside it)
+_GMAIL_QUOTE_RE = re.compile(
+    r"""<(?:div|blockquote)[^>]*\bclass=["'][^"']*\bgmail_quote""", re.IGNORECASE
+)
+# Apple Mail / iOS: <blockquote type="cite">
+_CITE_QUOTE_RE = re.compile(r"""<blockquote[^>]*\btype=["']?cite""", re.IGNORECASE)
+# Any <blockquote>; only a reply quote when an attribution line precedes it,
+# since notes use block quotes themselves
+_BLOCKQUOTE_RE = re.compile(r"<blockquote\b", re.IGNORECASE)
+# "On Mon, 19 Oct 2026 at 09:00, Jane <jane@example.com> wrote:"
+_ATTRIBUTION_RE = re.compile(r"\bOn\b[^<>]{1,300}?\bwrote:", re.IGNORECASE)
+_TEXT_ATTRIBUTION_RE = re.compile(r"On\b.{1,300}\bwrote:", re.IGNORECASE)
+# Classic Outlook and plain text: From:/Sent: header of the quoted message
+_HEADER_RE = re.compile(
+    r"\bFrom:(?:\s|<[^>]*>|&nbsp;|&#160;)[\s\S]{0,400}?\b(?:Sent|Date):"
+    r"[\s\S]{0,400}?\b(?:To|Subject):",
+    re.IGNORECASE,
+)
+_ORIGINAL_MESSAGE_RE = re.compile(
+    r"-{2,}\s*(?:Original Message|Forwarded message)\s*-{2,}", re.IGNORECASE
+)
+# Opening tags a cut point is moved back to, so the removed part starts
+# with whole elements
+_BLOCK_START_RE = re.compile(r"<(?:div|p|hr|table|br)\b[^>]*>", re.IGNORECASE)
+# Text between tags, for matching signature lines
+_TEXT_RUN_RE = re.compile(r"[^<>]+(?=<|$)")
+_TAG_RE = re.compile(r"<[^>]*>")
+# How far back from a marker to look for the start of its element
+_BLOCK_LOOKBACK = 200
+# The "-- " signature delimiter (RFC 3676) only counts with at most this
+# much text after it; further up it is more likely part of the note
+_SIGNATURE_MAX_CHARS = 500
+_DELIMITERS = ("-- ", "--\xa0")
+# Forwards keep their quoted part: it is usually the note itself
+_FORWARD_SUBJECT_RE = re.compile(r"(?:^|[\s\]])(?:fwd?|fw):", re.IGNORECASE)
+_FORWARD_BODY_RE = re.compile(r"-{2,}\s*Forwarded message\s*-{2,}|Begin forwarded message:",
+                              re.IGNORECASE)
+
+
+@dataclass
+class StripResult:
+    """A body with its quoted history and signature removed."""
+
+    content: str
+    bytes_removed: int = 0
+    # What was cut: "quote" and/or "signature"
+    removed: List[str] = field(default_factory=list)
+
+
+def is_forward(subject: str, content: str = "") -> bool:
+    """Whether an email forwards another (FW:/Fwd: subject or a forward header)."""
+    return bool(_FORWARD_SUBJECT_RE.search(subject) or _FORWARD_BODY_RE.search(content))
+
+
+class ReplyStripper:
+    """Cuts quoted history from a note body and removes its signature.
+
+    Detectors cover the markers Outlook (desktop, web, mobile), Gmail and
+    Apple Mail put in front of quoted messages; everything from the first
+    one to the end of the body is quoted history. Signature lines are
+    regular expressions matched against each line of the text before the
+    quoted history, plus the "-- " delimiter when only a short signature
+    follows it. A signature with little text after it is removed up to
+    the quoted history; a signature line further up is removed on its own.
+    A body whose text would be removed entirely (e.g. a bare forward) is
+    left as is.
+    """
+
+    def __init__(self, signature_patterns: Iterable[str] = DEFAULT_SIGNATURE_PATTERNS):
+        """Compile the signature patterns.
+
+        Args:
+            signature_patterns: Regular expressions for lines that start a
+                signature or disclaimer; matched case-insensitively.
+        """
+        self._signatures = [re.compile(p, re.IGNORECASE) for p in signature_patterns]
+
+    def strip_html(
+        self, content: str, quotes: bool = True, signature: bool = True
+    ) -> StripResult:
+        """Strip quoted history (if quotes) and the signature (if signature) from HTML."""
+        quote = self._html_quote_start(content)
+        end = quote if quotes and quote is not None else len(content)
+        removed = ["quote"] if end < len(content) else []
+        stripped = content[:end]
+        span = self._html_signature(content[:quote]) if signature else None
+        if span is not None:
+            start, stop = span
+            stripped = content[:start].rstrip() + content[stop:end]
+            removed.append("signature")
+        stripped = stripped.rstrip()
+        if not removed or not _has_text(_TAG_RE.sub("", stripped)):
+            return StripResult(content)
+        return _result(content, stripped, removed)
+
+    def strip_text(
+        self, content: str, quotes: bool = True, signature: bool = True
+    ) -> StripResult:
+        """Strip quoted history (if quotes) and the signature (if signature) from text."""
+        lines = content.split("\n")
+        quote = _text_quote_start(lines)
+        end = quote if quotes and quote is not None else len(lines)
+        removed = ["quote"] if end < len(lines) else []
+        kept = lines[:end]
+        span = self._text_signature(lines[:quote]) if signature else None
+        if span is not None:
+            start, stop = span
+            kept = lines[:start] + lines[stop:end]
+            removed.append("signature")
+        stripped = "\n".join(kept).rstrip()
+        if not removed or not _has_text(stripped):
+            return StripResult(content)
+        return _result(content, stripped, removed)
+
+    def _text_signature(self, lines: List[str]) -> Optional[Tuple[int, int]]:
+        """Line range of the signature in a body's own text, or None."""
+        for index, line in enumerate(lines):
+            delimiter = line.rstrip("\r") in _DELIMITERS
+            if not delimiter and not self._is_signature(line):
+                continue
+            short = len("\n".join(lines[index + 1:]).strip()) <= _SIGNATURE_MAX_CHARS
+            if short:
+                # Up to its last line: blank lines before a quote stay
+                end = len(lines)
+                while not lines[end - 1].strip():
+                    end -= 1
+                return index, end
+            if not delimiter:
+                return index, index + 1
+        return None
+
+    def _is_signature(self, line: str) -> bool:
+        line = line.strip()
+        return bool(line) and any(p.search(line) for p in self._signatures)
+
+    def _html_quote_start(self, content: str) -> Optional[int]:
+        """Offset of the first reply marker in HTML, or None."""
+        lowered = content.lower()
+        starts = []
+        if "divrplyfwdmsg" in lowered:
+            match = _OUTLOOK_REPLY_RE.search(content)
+            if match:
+                starts.append(match.start())
+        if "gmail_quote" in lowered:
+            match = _GMAIL_QUOTE_RE.search(content)
+            if match:
+                starts.append(match.start())
+        if "<blockquote" in lowered:
+            match = _CITE_QUOTE_RE.search(content)
+            if match:
+                starts.append(_block_start(content, _attribution_start(content, match.start())))
+            for match in _BLOCKQUOTE_RE.finditer(content):
+                attribution = _attribution_start(content, match.start())
+                if attribution < match.start():
+                    starts.append(_block_start(content, attribution))
+                    break
+        if "from:" in lowered:
+            match = _HEADER_RE.search(content)
+            if match:
+                starts.append(_block_start(content, match.start()))
+        if "-----" in content:
+            match = _ORIGINAL_MESSAGE_RE.search(content)
+            if match:
+                starts.append(_block_start(content, match.start()))
+        return min(starts) if starts else None
+
+    def _html_signature(self, content: str) -> Optional[Tuple[int, int]]:
+        """Offsets of the signature in a body's own HTML, or None."""
+        for match in _TEXT_RUN_RE.finditer(content):
+            text = html.unescape(match.group(0))
+            delimiter = text.strip("\r\n") in _DELIMITERS
+            if not delimiter and not self._is_signature(text):
+                continue
+            rest = html.unescape(_TAG_RE.sub("", content[match.end():])).strip()
+            start = _block_start(content, match.start())
+            if len(rest) <= _SIGNATURE_MAX_CHARS:
+                return start, len(content)
+            if not delimiter:
+                following = _BLOCK_START_RE.search(content, match.end())
+                return start, following.start() if following else len(content)
+        return None
+
+
+def _text_quote_start(lines: List[str]) -> Optional[int]:
+    """Index of the first line of quoted history in a plain-text body, or None."""
+    # Quoted ("> ") lines after the last line of own text are the quoted
+    # message; earlier ones are inline quotes answered below them
+    last_own = max(
+        (i for i, line in enumerate(lines) if line.strip() and not line.lstrip().startswith(">")),
+        default=-1,
+    )
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if _ORIGINAL_MESSAGE_RE.search(stripped):
+            return index
+        if _TEXT_ATTRIBUTION_RE.fullmatch(stripped):
+            return index
+        if stripped.lower().startswith("from:") and any(
+            following.strip().lower().startswith(("sent:", "date:"))
+            for following in lines[index + 1:index + 4]
+        ):
+            # Outlook draws a rule of underscores above the header
+            if index and set(lines[index - 1].strip()) == {"_"}:
+                return index - 1
+            return index
+        if index > last_own and stripped.startswith(">"):
+            return index
+    return None
+
+
+def _attribution_start(content: str, quote_start: int) -> int:
+    """Start of an "On ... wrote:" line right before a quote, else the quote."""
+    window_start = max(0, quote_start - 400)
+    window = content[window_start:quote_start]
+    match = None
+    for match in _ATTRIBUTION_RE.finditer(window):
+        pass
+    if match is None or _has_text(_TAG_RE.sub("", window[match.end():])):
+        return quote_start
+    return window_start + match.start()
+
+
+def _block_start(content: str, position: int) -> int:
+    """Move a cut point back to the opening tag of the element it is in."""
+    window_start = max(0, position - _BLOCK_LOOKBACK)
+    window = content[window_start:position]
+    match = None
+    for match in _BLOCK_START_RE.finditer(window):
+        pass
+    if match is None or _has_text(_TAG_RE.sub("", window[match.end():])):
+        return position
+    return window_start + match.start()
+
+
+def _has_text(content: str) -> bool:
+    return bool(html.unescape(content).strip())
+
+
+def _result(original: str, content: str, removed: List[str]) -> StripResult:
+    return StripResult(
+        content=content,
+        bytes_removed=len(original.encode("utf-8")) - len(content.encode("utf-8")),
+        removed=removed,
+    )
@@ -0,0 +1,49 @@
+"""Match email subjects against several note prefixes at once."""
+
+from typing import Dict, Iterable, List, Optional
+
+
+class SubjectMatcher:
+    """Case-insensitive prefix trie over the configured subject patterns.
+
+    One walk over the start of a subject finds the longest pattern it
+    begins with, however many patterns are configured.
+    """
+
+    # Key marking the end of a pattern within a trie node
+    _END = ""
+
+    def __init__(self, patterns: Iterable[str]):
+        """Build the trie.
+
+        Args:
+            patterns: Subject prefixes, e.g. ["[Note]", "[DCN]"].
+        """
+        self.patterns: List[str] = []
+        self._root: Dict[str, dict] = {}
+        for pattern in patterns:
+            if not pattern or pattern in self.patterns:
+                continue
+            self.patterns.append(pattern)
+            node = self._root
+            for char in pattern.lower():
+                node = node.setdefault(char, {})
+            node[self._END] = pattern
+
+    def match(self, subject: str) -> Optional[str]:
+        """Return the longest pattern the subject starts with, or None."""
+        node = self._root
+        found = None
+        for char in subject.lower():
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(self._END, found)
+        return found
+
+    def strip(self, subject: str) -> str:
+        """Remove the matched pattern and surrounding whitespace from a subject."""
+        pattern = self.match(subject)
+        if pattern is not None:
+            subject = subject[len(pattern):]
+        return subject.strip()
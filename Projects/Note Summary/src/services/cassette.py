@@ -0,0 +1,251 @@
+"""Record/replay cassettes for Microsoft Graph API traffic.
+
+A cassette is a gzip-compressed JSON Lines archive. The first line is a
+header; every following line is one request/response interaction. Access
+tokens are redacted before anything is written to disk.
+"""
+
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+CASSETTE_VERSION = 1
+
+# Headers whose values must never reach disk
+REDACTED_HEADERS = {"authorization", "cookie", "set-cookie"}
+REDACTED_VALUE = "<redacted>"
+
+# Replay serves decoded bodies, so transport-level encodings no longer apply
+HOP_BY_HOP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+
+REPLAY_SPEEDS = ("original", "max")
+
+
+class CassetteMissError(requests.ConnectionError):
+    """Raised when a replayed request has no recorded interaction."""
+
+
+def _redact_headers(headers) -> Dict[str, str]:
+    """Copy headers, replacing credentials with a placeholder."""
+    return {
+        name: REDACTED_VALUE if name.lower() in REDACTED_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def _encode_body(body) -> Optional[dict]:
+    """Encode a request/response body for JSON storage."""
+    if body is None:
+        return None
+    if isinstance(body, str):
+        return {"text": body}
+    if isinstance(body, (bytes, bytearray)):
+        try:
+            return {"text": bytes(body).decode("utf-8")}
+        except UnicodeDecodeError:
+            return {"base64": base64.b64encode(body).decode("ascii")}
+    # Generators and file-like bodies are streamed and cannot be captured
+    return {"streamed": True}
+
+
+def _decode_body(body: Optional[dict]) -> bytes:
+    """Decode a stored body back to bytes."""
+    if not body:
+        return b""
+    if "base64" in body:
+        return base64.b64decode(body["base64"])
+    return body.get("text", "").encode("utf-8")
+
+
+def interaction_key(method: str, url: str) -> Tuple[str, str]:
+    """Build the replay matching key for a request.
+
+    Query strings are ignored because they embed run-dependent values
+    such as the lookback cutoff timestamp; interactions sharing a key are
+    served in recorded order.
+    """
+    return method.upper(), urlsplit(url).path
+
+
+class CassetteWriter:
+    """Append interactions to a cassette file."""
+
+    def __init__(self, path: Path):
+        """Open a cassette for writing.
+
+        Args:
+            path: Destination file, conventionally ending in .jsonl.gz.
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.count = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._write_line({
+            "version": CASSETTE_VERSION,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    @property
+    def path(self) -> Path:
+        """Path of the cassette being written."""
+        return self._path
+
+    def _write_line(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def record(self, response: requests.Response, elapsed: float) -> None:
+        """Record one completed request/response pair.
+
+        Args:
+            response: Response whose content has been read.
+            elapsed: Wall-clock seconds spent on the round trip.
+        """
+        request = response.request
+        record = {
+            "offset": round(time.monotonic() - self._started - elapsed, 6),
+            "elapsed": round(elapsed, 6),
+            "request": {
+                "method": request.method,
+                "url": request.url,
+                "headers": _redact_headers(request.headers),
+                "body": _encode_body(request.body),
+            },
+            "response": {
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": _redact_headers(response.headers),
+                "body": _encode_body(response.content),
+            },
+        }
+        with self._lock:
+            self._write_line(record)
+            self.count += 1
+
+    def close(self) -> None:
+        """Flush and close the cassette file."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class Cassette:
+    """Recorded interactions loaded for replay."""
+
+    def __init__(self, interactions: List[dict]):
+        """Index interactions by matching key.
+
+        Args:
+            interactions: Interaction records in recorded order.
+        """
+        self._lock = threading.Lock()
+        self._queues: Dict[Tuple[str, str], Deque[dict]] = defaultdict(deque)
+        for interaction in interactions:
+            req = interaction["request"]
+            self._queues[interaction_key(req["method"], req["url"])].append(interaction)
+
+    @classmethod
+    def load(cls, path: Path) -> "Cassette":
+        """Load a cassette file.
+
+        Raises:
+            FileNotFoundError: If the cassette does not exist.
+            ValueError: If the cassette version is unsupported.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version: {header.get('version')}")
+            interactions = [json.loads(line) for line in f if line.strip()]
+        return cls(interactions)
+
+    def next_interaction(self, method: str, url: str) -> dict:
+        """Pop the next recorded interaction matching a request.
+
+        Raises:
+            CassetteMissError: If no matching interaction remains.
+        """
+        key = interaction_key(method, url)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteMissError(f"No recorded interaction for {key[0]} {key[1]}")
+            return queue.popleft()
+
+    def remaining(self) -> int:
+        """Number of interactions not yet replayed."""
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter that records every exchange to a cassette."""
+
+    def __init__(self, writer: CassetteWriter, **kwargs):
+        super().__init__(**kwargs)
+        self._writer = writer
+
+    def send(self, request, **kwargs):
+        started = time.monotonic()
+        response = super().send(request, **kwargs)
+        # Force the body to be read so it can be stored
+        _ = response.content
+        self._writer.record(response, time.monotonic() - started)
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter that serves responses from a cassette."""
+
+    def __init__(self, cassette: Cassette, speed: str = "original", **kwargs):
+        """Create a replay adapter.
+
+        Args:
+            cassette: Loaded cassette to serve from.
+            speed: "original" to sleep for recorded latencies, "max" to skip them.
+        """
+        if speed not in REPLAY_SPEEDS:
+            raise ValueError(f"Unknown replay speed: {speed}")
+        super().__init__(**kwargs)
+        self._cassette = cassette
+        self._speed = speed
+
+    def send(self, request, **kwargs):
+        interaction = self._cassette.next_interaction(request.method, request.url)
+        elapsed = interaction.get("elapsed", 0.0)
+        if self._speed == "original" and elapsed > 0:
+            time.sleep(elapsed)
+
+        recorded = interaction["response"]
+        content = _decode_body(recorded.get("body"))
+        headers = CaseInsensitiveDict({
+            name: value
+            for name, value in recorded.get("headers", {}).items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        })
+        headers["Content-Length"] = str(len(content))
+
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.reason = recorded.get("reason")
+        response.headers = headers
+        response._content = content
+        response.encoding = requests.utils.get_encoding_from_headers(headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=elapsed)
+        response.connection = self
+        return response
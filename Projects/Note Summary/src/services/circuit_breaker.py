@@ -0,0 +1,140 @@
+"""Circuit breaker that stops calling a degraded dependency for a while."""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from src.utils.metrics import get_metrics
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """A call was refused because its dependency's circuit is open.
+
+    Says nothing about the request itself, so callers retry it later
+    without counting it as a failure of the note or email.
+    """
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe -> closed.
+
+    While open, calls fail immediately with CircuitOpenError instead of
+    waiting for a slow failure. Once reset_seconds have passed a single
+    probe call is let through: success closes the circuit, failure opens
+    it again for another reset_seconds. Thread-safe, as sync lanes share
+    one session.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a closed circuit.
+
+        Args:
+            name: Dependency name ("onenote", "mail"), for logs and metrics.
+            failure_threshold: Consecutive failures that open the circuit.
+            reset_seconds: How long the circuit stays open before a probe.
+            clock: Monotonic time source (for testing).
+        """
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open."""
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> None:
+        """Check that a call may go ahead.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                probe already in flight.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if self._state == OPEN:
+                remaining = self._opened_at + self._reset_seconds - self._clock()
+                if remaining > 0:
+                    self._reject(f"retrying in {remaining:.0f}s")
+                self._transition(HALF_OPEN)
+            if self._probing:
+                self._reject("waiting for the probe request")
+            self._probing = True
+
+    def record_success(self) -> None:
+        """Count a call the dependency answered properly."""
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != CLOSED:
+                logger.info("Graph %s calls are succeeding again; circuit closed", self.name)
+                self._transition(CLOSED)
+
+    def record_failure(self, reason: str = "") -> None:
+        """Count a failed call (error, timeout or server failure)."""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self._failure_threshold
+            ):
+                logger.warning(
+                    "Graph %s calls failing (%s in a row, last: %s); pausing them for %ss",
+                    self.name, self._failures, reason or "error", self._reset_seconds,
+                )
+                self._opened_at = self._clock()
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        get_metrics().inc("note_summary_circuit_transitions_total", dependency=self.name,
+                          state=state)
+
+    def _reject(self, detail: str) -> None:
+        get_metrics().inc("note_summary_circuit_rejected_total", dependency=self.name)
+        raise CircuitOpenError(f"{self.name} circuit open ({detail})")
+
+    def call(self, func: Callable, is_failure: Optional[Callable] = None):
+        """Run func under the breaker.
+
+        Args:
+            func: The call to make.
+            is_failure: Classifies a returned value as a failure (e.g. a
+                5xx response). Exceptions always count as failures.
+
+        Returns:
+            Whatever func returns.
+        """
+        self.before_call()
+        try:
+            result = func()
+        except Exception as e:
+            self.record_failure(type(e).__name__)
+            raise
+        if is_failure is not None and is_failure(result):
+            self.record_failure(str(getattr(result, "status_code", "failure")))
+        else:
+            self.record_success()
+        return result
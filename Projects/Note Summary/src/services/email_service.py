@@ -2,15 +2,32 @@
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import requests
 
+from src.auth.identity import IdentityCache
+from src.processors.subject_matcher import SubjectMatcher
 from src.utils.config import EmailConfig
 
 
 GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
 
+# Graph accepts at most 20 requests per JSON batch
+MAX_BATCH_REQUESTS = 20
+
+# Attachment metadata, listed before any content is downloaded
+ATTACHMENT_FIELDS = "id,name,contentType,size,isInline"
+
+MESSAGE_FIELDS = "id,subject,body,receivedDateTime,from,isRead,conversationId"
+
+# Inbox rule created for email.folder_name; found again by this name
+NOTE_RULE_NAME = "Note Summary: move notes"
+
+
+class MailFolderNotFound(RuntimeError):
+    """The note folder, or the delta state for it, no longer exists."""
+
 
 @dataclass
 class Email:
@@ -23,6 +40,11 @@ class Email:
     received_datetime: datetime
     sender_email: str
     is_read: bool
+    conversation_id: str = ""
+    # The part of the body not quoted from earlier messages of the thread;
+    # only fetched when requested (see EmailService)
+    unique_body_content: str = ""
+    unique_body_content_type: str = ""
 
     @classmethod
     def from_graph_response(cls, data: dict) -> "Email":
@@ -37,26 +59,70 @@ class Email:
             ),
             sender_email=data.get("from", {}).get("emailAddress", {}).get("address", ""),
             is_read=data.get("isRead", False),
+            conversation_id=data.get("conversationId", ""),
+            unique_body_content=data.get("uniqueBody", {}).get("content", ""),
+            unique_body_content_type=data.get("uniqueBody", {}).get("contentType", ""),
+        )
+
+
+@dataclass
+class Attachment:
+    """Represents an inline file attachment."""
+
+    id: str
+    name: str
+    content_type: str
+    content_id: str
+    size: int
+    content_base64: str
+
+    @classmethod
+    def from_graph_response(cls, data: dict) -> "Attachment":
+        """Create Attachment from Graph API response."""
+        return cls(
+            id=data["id"],
+            name=data.get("name", ""),
+            content_type=data.get("contentType") or "application/octet-stream",
+            content_id=(data.get("contentId") or "").strip("<>"),
+            size=data.get("size", 0),
+            content_base64=data.get("contentBytes", ""),
         )
 
 
 class EmailService:
     """Service for interacting with Outlook emails via Graph API."""
 
-    def __init__(self, access_token: str, config: EmailConfig):
+    def __init__(
+        self,
+        access_token: str,
+        config: EmailConfig,
+        session: Optional[requests.Session] = None,
+        identity_cache: Optional[IdentityCache] = None,
+        unique_body: bool = False,
+    ):
         """Initialize email service.
 
         Args:
             access_token: Microsoft Graph API access token.
             config: Email configuration.
+            session: Shared HTTP session. A private session is created if omitted.
+            identity_cache: Persisted identity of the signed-in account; when
+                given, the /me lookup is made at most once per account.
+            unique_body: Also fetch each message's uniqueBody (its text
+                without the quoted thread), for conversation grouping.
         """
         self._access_token = access_token
         self._config = config
+        self._session = session or requests.Session()
         self._headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json",
         }
         self._user_email: Optional[str] = None
+        self._identity_cache = identity_cache
+        self._fields = MESSAGE_FIELDS + (",uniqueBody" if unique_body else "")
+        # Attachments fetched ahead of time by prefetch_inline_attachments
+        self._attachment_cache: Dict[str, List[Attachment]] = {}
 
     def get_current_user_email(self) -> str:
         """Get the current user's email address.
@@ -70,13 +136,29 @@ class EmailService:
         if self._user_email:
             return self._user_email
 
-        response = requests.get(f"{GRAPH_BASE_URL}/me", headers=self._headers)
+        if self._identity_cache is not None:
+            identity = self._identity_cache.current()
+            if identity is not None and identity.mail:
+                self._user_email = identity.mail
+                return self._user_email
+
+        response = self._session.get(
+            f"{GRAPH_BASE_URL}/me",
+            headers=self._headers,
+            params={"$select": "id,mail,userPrincipalName"},
+        )
 
         if response.status_code != 200:
             raise RuntimeError(f"Failed to get user info: {response.text}")
 
         data = response.json()
         self._user_email = data.get("mail") or data.get("userPrincipalName", "")
+        if self._identity_cache is not None:
+            self._identity_cache.update_current(
+                mail=self._user_email,
+                user_principal_name=data.get("userPrincipalName", ""),
+                object_id=data.get("id", ""),
+            )
         return self._user_email
 
     def fetch_note_emails(self) -> List[Email]:
@@ -91,26 +173,16 @@ class EmailService:
         Raises:
             RuntimeError: If API call fails.
         """
-        user_email = self.get_current_user_email()
         cutoff_time = datetime.now(timezone.utc) - timedelta(hours=self._config.lookback_hours)
-        cutoff_str = cutoff_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        # Build OData filter for self-sent emails with matching subject
-        # Note: startsWith is case-insensitive in Graph API
-        filter_query = (
-            f"receivedDateTime ge {cutoff_str} "
-            f"and startsWith(subject, '{self._config.subject_pattern}') "
-            f"and from/emailAddress/address eq '{user_email}'"
-        )
 
         params = {
-            "$filter": filter_query,
-            "$select": "id,subject,body,receivedDateTime,from,isRead",
+            "$filter": self._note_filter(cutoff_time),
+            "$select": self._fields,
             "$orderby": "receivedDateTime desc",
             "$top": 50,
         }
 
-        response = requests.get(
+        response = self._session.get(
             f"{GRAPH_BASE_URL}/me/messages",
             headers=self._headers,
             params=params,
@@ -124,6 +196,387 @@ class EmailService:
 
         return emails
 
+    def ensure_note_folder(self, name: str) -> str:
+        """Find or create a top-level mail folder.
+
+        Args:
+            name: Folder display name.
+
+        Returns:
+            Folder ID.
+
+        Raises:
+            RuntimeError: If API call fails.
+        """
+        response = self._session.get(
+            f"{GRAPH_BASE_URL}/me/mailFolders",
+            headers=self._headers,
+            params={
+                "$filter": f"displayName eq '{_odata_string(name)}'",
+                "$select": "id,displayName",
+            },
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to list mail folders: {response.text}")
+
+        folders = response.json().get("value", [])
+        if folders:
+            return folders[0]["id"]
+
+        response = self._session.post(
+            f"{GRAPH_BASE_URL}/me/mailFolders",
+            headers=self._headers,
+            json={"displayName": name},
+        )
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f"Failed to create mail folder: {response.text}")
+        return response.json()["id"]
+
+    def ensure_note_rule(self, folder_id: str) -> str:
+        """Find, update or create the inbox rule that moves notes to a folder.
+
+        The rule matches self-sent mail whose subject contains any subject
+        pattern; fetches still check that the subject starts with one.
+
+        Args:
+            folder_id: Destination folder ID.
+
+        Returns:
+            Rule ID.
+
+        Raises:
+            RuntimeError: If API call fails.
+        """
+        rule = {
+            "displayName": NOTE_RULE_NAME,
+            "sequence": 1,
+            "isEnabled": True,
+            "conditions": {
+                "subjectContains": list(self._config.patterns),
+                "fromAddresses": [
+                    {"emailAddress": {"address": self.get_current_user_email()}}
+                ],
+            },
+            "actions": {"moveToFolder": folder_id, "stopProcessingRules": False},
+        }
+        rules_url = f"{GRAPH_BASE_URL}/me/mailFolders/inbox/messageRules"
+
+        response = self._session.get(rules_url, headers=self._headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to list inbox rules: {response.text}")
+        existing = next(
+            (r for r in response.json().get("value", [])
+             if r.get("displayName") == NOTE_RULE_NAME),
+            None,
+        )
+
+        if existing is None:
+            response = self._session.post(rules_url, headers=self._headers, json=rule)
+            if response.status_code not in (200, 201):
+                raise RuntimeError(f"Failed to create inbox rule: {response.text}")
+            return response.json()["id"]
+
+        conditions = existing.get("conditions", {})
+        if (
+            conditions.get("subjectContains") != rule["conditions"]["subjectContains"]
+            or existing.get("actions", {}).get("moveToFolder") != folder_id
+            or not existing.get("isEnabled", False)
+        ):
+            response = self._session.patch(
+                f"{rules_url}/{existing['id']}", headers=self._headers, json=rule
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to update inbox rule: {response.text}")
+        return existing["id"]
+
+    def fetch_folder_emails(
+        self, folder_id: str, delta_link: Optional[str] = None
+    ) -> Tuple[List[Email], str]:
+        """Fetch new note emails from a mail folder with a delta query.
+
+        Without a delta link, messages from the lookback period are listed
+        and a delta link for later polls is returned. With one, only
+        messages added or changed since that poll come back.
+
+        Args:
+            folder_id: Mail folder ID.
+            delta_link: @odata.deltaLink from the previous poll.
+
+        Returns:
+            Emails whose subject starts with the pattern, and the new delta link.
+
+        Raises:
+            MailFolderNotFound: If the folder or the delta state is gone.
+            RuntimeError: If API call fails.
+        """
+        if delta_link:
+            url, params = delta_link, None
+        else:
+            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=self._config.lookback_hours)
+            url = f"{GRAPH_BASE_URL}/me/mailFolders/{folder_id}/messages/delta"
+            params = {
+                "$filter": f"receivedDateTime ge {_graph_time(cutoff_time)}",
+                "$select": self._fields,
+            }
+        headers = {**self._headers, "Prefer": "odata.maxpagesize=50"}
+
+        matcher = SubjectMatcher(self._config.patterns)
+        emails: List[Email] = []
+        while True:
+            response = self._session.get(url, headers=headers, params=params)
+            if response.status_code in (404, 410):
+                raise MailFolderNotFound(f"Failed to fetch folder changes: {response.text}")
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to fetch folder changes: {response.text}")
+
+            data = response.json()
+            for msg in data.get("value", []):
+                # Deletions and moves out of the folder carry only an id
+                if "@removed" in msg or "receivedDateTime" not in msg:
+                    continue
+                if matcher.match(msg.get("subject", "")):
+                    emails.append(Email.from_graph_response(msg))
+
+            if "@odata.deltaLink" in data:
+                return emails, data["@odata.deltaLink"]
+            url, params = data.get("@odata.nextLink"), None
+            if not url:
+                raise RuntimeError("Failed to fetch folder changes: no next or delta link")
+
+    def _note_filter(self, since: datetime, until: Optional[datetime] = None) -> str:
+        """Build the OData filter for self-sent emails with a matching subject."""
+        user_email = self.get_current_user_email()
+
+        # Note: startsWith is case-insensitive in Graph API
+        filter_query = f"receivedDateTime ge {_graph_time(since)} "
+        if until is not None:
+            filter_query += f"and receivedDateTime lt {_graph_time(until)} "
+        # One query for every pattern: the prefixes are OR'ed server-side
+        subject_terms = [
+            f"startsWith(subject, '{_odata_string(pattern)}')" for pattern in self._config.patterns
+        ]
+        subject_filter = (
+            subject_terms[0] if len(subject_terms) == 1 else f"({' or '.join(subject_terms)})"
+        )
+        return filter_query + (
+            f"and {subject_filter} "
+            f"and from/emailAddress/address eq '{user_email}'"
+        )
+
+    def iter_note_emails(
+        self,
+        since: datetime,
+        until: datetime,
+        page_size: int = 100,
+    ) -> Iterator[List[Email]]:
+        """Fetch matching emails received in [since, until), oldest first.
+
+        Follows @odata.nextLink, yielding one page of results at a time so
+        callers can start work before the whole range is listed.
+
+        Args:
+            since: Start of the range (inclusive).
+            until: End of the range (exclusive).
+            page_size: Messages requested per page.
+
+        Yields:
+            Lists of matching emails.
+
+        Raises:
+            RuntimeError: If API call fails.
+        """
+        url: Optional[str] = f"{GRAPH_BASE_URL}/me/messages"
+        params: Optional[dict] = {
+            "$filter": self._note_filter(since, until),
+            "$select": self._fields,
+            "$orderby": "receivedDateTime asc",
+            "$top": page_size,
+        }
+
+        while url:
+            response = self._session.get(url, headers=self._headers, params=params)
+
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to fetch emails: {response.text}")
+
+            data = response.json()
+            yield [Email.from_graph_response(msg) for msg in data.get("value", [])]
+
+            # The next link already carries every query parameter
+            url, params = data.get("@odata.nextLink"), None
+
+    def prefetch_inline_attachments(
+        self, email_ids: Iterable[str], max_bytes: Optional[int] = None
+    ) -> int:
+        """Fetch attachments for many messages with JSON batch requests.
+
+        Works like fetch_inline_attachments, one batch for the messages'
+        attachment lists and more for the attachments within max_bytes.
+        Results are cached for fetch_inline_attachments. Messages with a
+        failed batched request (e.g. throttled inside the batch) are left
+        uncached and fetched individually later.
+
+        Args:
+            email_ids: Message IDs to fetch attachments for.
+            max_bytes: Skip attachments larger than this.
+
+        Returns:
+            Number of messages whose attachments were cached.
+
+        Raises:
+            RuntimeError: If a batch request fails as a whole.
+        """
+        ids = [i for i in email_ids if i not in self._attachment_cache]
+        wanted: Dict[str, List[str]] = {}
+
+        for start in range(0, len(ids), MAX_BATCH_REQUESTS):
+            chunk = ids[start:start + MAX_BATCH_REQUESTS]
+            urls = [f"/me/messages/{i}/attachments?$select={ATTACHMENT_FIELDS}" for i in chunk]
+            for n, item in self._batch_get(urls):
+                if item.get("status") == 200:
+                    wanted[chunk[n]] = _attachments_to_fetch(
+                        item.get("body", {}).get("value", []), max_bytes
+                    )
+
+        found, failed = self._download_attachments(wanted)
+        for email_id, attachments in found.items():
+            if email_id not in failed:
+                self._attachment_cache[email_id] = attachments
+        return len(found) - len(failed)
+
+    def _download_attachments(
+        self, wanted: Dict[str, List[str]]
+    ) -> Tuple[Dict[str, List[Attachment]], Set[str]]:
+        """Download attachments by ID with as few $batch calls as possible.
+
+        Args:
+            wanted: Attachment IDs to download per message ID.
+
+        Returns:
+            The inline attachments found per message, and the messages for
+            which a download failed (attachments deleted since are skipped).
+        """
+        found: Dict[str, List[Attachment]] = {email_id: [] for email_id in wanted}
+        failed: Set[str] = set()
+        pairs = [(email_id, a) for email_id, att_ids in wanted.items() for a in att_ids]
+        for start in range(0, len(pairs), MAX_BATCH_REQUESTS):
+            chunk = pairs[start:start + MAX_BATCH_REQUESTS]
+            urls = [f"/me/messages/{email_id}/attachments/{a}" for email_id, a in chunk]
+            for n, item in self._batch_get(urls):
+                email_id = chunk[n][0]
+                if item.get("status") == 200:
+                    found[email_id] += _inline_attachments([item.get("body", {})])
+                elif item.get("status") != 404:
+                    failed.add(email_id)
+        return found, failed
+
+    def _batch_get(self, urls: List[str]) -> Iterator[Tuple[int, dict]]:
+        """Send GET requests in one $batch call; yield (index, response) pairs."""
+        response = self._session.post(
+            f"{GRAPH_BASE_URL}/$batch",
+            headers=self._headers,
+            json={
+                "requests": [
+                    {"id": str(n), "method": "GET", "url": url} for n, url in enumerate(urls)
+                ]
+            },
+        )
+
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to batch fetch attachments: {response.text}")
+
+        for item in response.json().get("responses", []):
+            yield int(item["id"]), item
+
+    def fetch_email(self, email_id: str) -> Optional[Email]:
+        """Fetch one message by ID.
+
+        Args:
+            email_id: The email message ID.
+
+        Returns:
+            The email, or None if it no longer exists.
+
+        Raises:
+            RuntimeError: If API call fails.
+        """
+        response = self._session.get(
+            f"{GRAPH_BASE_URL}/me/messages/{email_id}",
+            headers=self._headers,
+            params={"$select": self._fields},
+        )
+
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to fetch email: {response.text}")
+
+        return Email.from_graph_response(response.json())
+
+    def fetch_inline_attachments(
+        self, email_id: str, max_bytes: Optional[int] = None
+    ) -> List[Attachment]:
+        """Fetch the inline file attachments of a message.
+
+        The attachment list is fetched without content first, then the
+        inline attachments within max_bytes are downloaded together in a
+        $batch call, so oversized images are never transferred.
+
+        Args:
+            email_id: The email message ID.
+            max_bytes: Skip attachments larger than this.
+
+        Returns:
+            Inline attachments that carry content and a content ID.
+
+        Raises:
+            RuntimeError: If API call fails.
+        """
+        if email_id in self._attachment_cache:
+            return self._attachment_cache.pop(email_id)
+
+        response = self._session.get(
+            f"{GRAPH_BASE_URL}/me/messages/{email_id}/attachments",
+            headers=self._headers,
+            params={"$select": ATTACHMENT_FIELDS},
+        )
+
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to fetch attachments: {response.text}")
+
+        wanted = _attachments_to_fetch(response.json().get("value", []), max_bytes)
+        if not wanted:
+            return []
+        found, failed = self._download_attachments({email_id: wanted})
+        if failed:
+            raise RuntimeError("Failed to fetch attachments: batched download failed")
+        return found[email_id]
+
+    def fetch_inline_attachment_sizes(self, email_id: str) -> List[int]:
+        """Fetch the sizes of a message's inline attachments without their content.
+
+        Args:
+            email_id: The email message ID.
+
+        Returns:
+            Size in bytes of each inline attachment.
+
+        Raises:
+            RuntimeError: If API call fails.
+        """
+        response = self._session.get(
+            f"{GRAPH_BASE_URL}/me/messages/{email_id}/attachments",
+            headers=self._headers,
+            params={"$select": ATTACHMENT_FIELDS},
+        )
+
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to fetch attachments: {response.text}")
+
+        return [
+            item.get("size", 0) for item in response.json().get("value", []) if item.get("isInline")
+        ]
+
     def mark_as_read(self, email_id: str) -> bool:
         """Mark an email as read.
 
@@ -136,10 +589,40 @@ class EmailService:
         if not self._config.mark_as_read:
             return True
 
-        response = requests.patch(
+        response = self._session.patch(
             f"{GRAPH_BASE_URL}/me/messages/{email_id}",
             headers=self._headers,
             json={"isRead": True},
         )
 
         return response.status_code == 200
+
+
+def _odata_string(value: str) -> str:
+    """Escape a value for use inside a single-quoted OData string literal."""
+    return value.replace("'", "''")
+
+
+def _graph_time(value: datetime) -> str:
+    """Format a datetime for an OData filter (UTC)."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _attachments_to_fetch(items: List[dict], max_bytes: Optional[int]) -> List[str]:
+    """IDs of the inline attachments in a metadata listing within max_bytes."""
+    return [
+        item["id"]
+        for item in items
+        if item.get("isInline") and (max_bytes is None or item.get("size", 0) <= max_bytes)
+    ]
+
+
+def _inline_attachments(items: List[dict]) -> List[Attachment]:
+    """Keep inline file attachments that carry content and a content ID."""
+    # Filtered client-side: the attachments collection does not
+    # reliably support $filter on isInline
+    return [
+        Attachment.from_graph_response(item)
+        for item in items
+        if item.get("isInline") and item.get("contentId") and item.get("contentBytes")
+    ]
@@ -0,0 +1,148 @@
+"""Shared HTTP session for Microsoft Graph API calls."""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Pattern, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.services.cassette import Cassette, CassetteWriter, RecordingAdapter, ReplayAdapter
+from src.services.circuit_breaker import CircuitBreaker
+from src.utils.metrics import get_metrics, instrument_session
+
+
+# Graph answers throttled requests with 429 (or 503) and a Retry-After
+# header before doing any work, so retrying them is safe for every method.
+# Read errors and 504s are not retried: the backend may have finished the
+# work after the gateway gave up, so a POST may already have created a page.
+THROTTLE_RETRY = Retry(
+    total=8,
+    connect=3,
+    read=0,
+    status=8,
+    status_forcelist=(429, 503),
+    allowed_methods=None,
+    backoff_factor=1,
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# (connect, read) timeouts in seconds. Page writes upload images and OneNote
+# renders them before answering, so they get longer than lookups.
+DEFAULT_TIMEOUT = (10, 30)
+ENDPOINT_TIMEOUTS: List[Tuple[str, Pattern, Tuple[float, float]]] = [
+    ("POST", re.compile(r"/onenote/sections/[^/]+/pages$"), (10, 120)),
+    ("PATCH", re.compile(r"/onenote/pages/[^/]+/content$"), (10, 120)),
+    ("POST", re.compile(r"/\$batch$"), (10, 60)),
+    ("GET", re.compile(r"/messages/[^/]+/attachments$"), (10, 60)),
+]
+
+# Consecutive failures that open a dependency's circuit, and how long it
+# stays open before a probe request is let through
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 60
+
+
+def endpoint_timeout(method: str, url: str) -> Tuple[float, float]:
+    """(connect, read) timeout for a Graph request."""
+    path = urlsplit(url).path
+    for endpoint_method, pattern, timeout in ENDPOINT_TIMEOUTS:
+        if method.upper() == endpoint_method and pattern.search(path):
+            return timeout
+    return DEFAULT_TIMEOUT
+
+
+def dependency(url: str) -> str:
+    """Which Graph workload a request goes to: "onenote" or "mail"."""
+    return "onenote" if "/onenote/" in urlsplit(url).path else "mail"
+
+
+def _is_server_failure(response: requests.Response) -> bool:
+    """Responses that say the service is unhealthy, not that the request was bad."""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+class GraphSession(requests.Session):
+    """Session that bounds every Graph call and guards it with a circuit breaker.
+
+    Requests without an explicit timeout get their endpoint's timeout.
+    OneNote and mail have a circuit breaker each: after repeated errors,
+    timeouts or 5xx/429 answers (after throttling retries), further calls
+    to that workload fail at once with CircuitOpenError until a probe
+    request succeeds, so a degraded service costs seconds, not minutes.
+    """
+
+    def __init__(self):
+        """Initialize the session with closed circuits."""
+        super().__init__()
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                reset_seconds=BREAKER_RESET_SECONDS,
+            )
+            for name in ("onenote", "mail")
+        }
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = endpoint_timeout(method, url)
+        breaker = self.breakers[dependency(url)]
+        return breaker.call(
+            lambda: super(GraphSession, self).request(method, url, *args, **kwargs),
+            is_failure=_is_server_failure,
+        )
+
+
+def create_session(
+    record_to: Optional[Path] = None,
+    replay_from: Optional[Path] = None,
+    replay_speed: str = "original",
+    pool_size: int = 10,
+) -> requests.Session:
+    """Create the HTTP session shared by all Graph services.
+
+    Args:
+        record_to: If set, record all traffic to this cassette file.
+        replay_from: If set, serve all traffic from this cassette file.
+        replay_speed: "original" or "max" when replaying.
+        pool_size: Connections kept per host; at least the number of
+            threads sharing the session.
+
+    Returns:
+        Configured requests session.
+
+    Raises:
+        ValueError: If both recording and replay are requested.
+    """
+    if record_to and replay_from:
+        raise ValueError("Cannot record and replay in the same session")
+
+    session = GraphSession()
+    instrument_session(session, get_metrics())
+
+    pool = {"pool_connections": pool_size, "pool_maxsize": pool_size}
+    if record_to:
+        writer = CassetteWriter(record_to)
+        adapter = RecordingAdapter(writer, max_retries=THROTTLE_RETRY, **pool)
+        session.cassette_writer = writer
+    elif replay_from:
+        # Replayed responses are final; throttled attempts were never recorded
+        adapter = ReplayAdapter(Cassette.load(replay_from), speed=replay_speed, **pool)
+    else:
+        adapter = HTTPAdapter(max_retries=THROTTLE_RETRY, **pool)
+
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def close_session(session: requests.Session) -> None:
+    """Close a session and flush any cassette being recorded."""
+    writer = getattr(session, "cassette_writer", None)
+    if writer is not None:
+        writer.close()
+    session.close()
@@ -0,0 +1,132 @@
+"""Streaming multipart/form-data bodies for OneNote page creation."""
+
+import base64
+import uuid
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+
+# Base64 characters decoded per chunk; a multiple of 4 so chunks decode independently
+B64_CHUNK_CHARS = 64 * 1024
+
+
+def decoded_length(base64_data: str) -> int:
+    """Number of bytes a base64 string decodes to, without decoding it."""
+    return len(base64_data) // 4 * 3 - base64_data[-2:].count("=")
+
+
+@dataclass
+class MultipartPart:
+    """One named part of a multipart page-create request.
+
+    Binary parts are kept base64-encoded (as Graph returns attachment
+    content) and decoded chunk by chunk while the request is sent.
+    """
+
+    name: str
+    content_type: str
+    data: Optional[bytes] = None
+    base64_data: Optional[str] = None
+
+    def __len__(self) -> int:
+        if self.data is not None:
+            return len(self.data)
+        return decoded_length(self.base64_data or "")
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        """Yield the decoded payload in chunks."""
+        if self.data is not None:
+            yield self.data
+            return
+        b64 = self.base64_data or ""
+        for start in range(0, len(b64), B64_CHUNK_CHARS):
+            yield base64.b64decode(b64[start:start + B64_CHUNK_CHARS])
+
+
+class MultipartStream:
+    """File-like multipart/form-data body with a known length.
+
+    requests streams file-like bodies in blocks instead of building the
+    whole payload in memory, and sends Content-Length because __len__ is
+    defined, so OneNote gets a normal (non-chunked) upload.
+    """
+
+    def __init__(self, parts: List[MultipartPart], boundary: Optional[str] = None):
+        """Create the stream.
+
+        Args:
+            parts: Parts in order; the first is usually the "Presentation" HTML.
+            boundary: Multipart boundary. Generated if omitted.
+        """
+        self.boundary = boundary or f"NoteSummary{uuid.uuid4().hex}"
+        self._parts = parts
+        self._length = sum(len(chunk) for chunk in self._framing()) + sum(len(p) for p in parts)
+        self._chunks = self._iter_chunks()
+        self._buffer = b""
+        self._position = 0
+
+    @property
+    def content_type(self) -> str:
+        """Content-Type header value for this body."""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _part_header(self, part: MultipartPart) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{part.name}"\r\n'
+            f"Content-Type: {part.content_type}\r\n\r\n"
+        ).encode("utf-8")
+
+    def _framing(self) -> Iterator[bytes]:
+        """Yield every non-payload byte sequence, for length calculation."""
+        for part in self._parts:
+            yield self._part_header(part)
+            yield b"\r\n"
+        yield f"--{self.boundary}--\r\n".encode("utf-8")
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        for part in self._parts:
+            yield self._part_header(part)
+            yield from part.iter_bytes()
+            yield b"\r\n"
+        yield f"--{self.boundary}--\r\n".encode("utf-8")
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self._iter_chunks()
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes (all remaining bytes if size < 0)."""
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._position += len(data)
+        return data
+
+    def tell(self) -> int:
+        """Number of bytes read so far."""
+        return self._position
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """Rewind to an absolute position, so a throttled upload can be resent.
+
+        The body is regenerated from the parts and read up to offset.
+        """
+        if whence != 0:
+            raise OSError("MultipartStream only supports absolute seeks")
+        self._chunks = self._iter_chunks()
+        self._buffer = b""
+        self._position = 0
+        while self._position < offset:
+            if not self.read(min(offset - self._position, B64_CHUNK_CHARS)):
+                break
+        return self._position
+
@@ -1,53 +1,85 @@
 """OneNote service for creating pages via Microsoft Graph API."""
 
-from dataclasses import dataclass
-from typing import List, Optional
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
 
 import requests
 
+from src.services.multipart import MultipartPart, MultipartStream
 from src.utils.config import OneNoteConfig
 
 
 GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
 
+# Whole hierarchy in one request: sections, and section groups with theirs
+NOTEBOOK_TREE_EXPAND = "sections,sectionGroups($expand=sections)"
+# Concurrent per-notebook listings when $expand is refused; OneNote allows
+# at most 5 concurrent requests per user
+MAX_LISTING_WORKERS = 5
+
 
 @dataclass
-class Notebook:
-    """Represents a OneNote notebook."""
+class Section:
+    """Represents a OneNote section."""
 
     id: str
     display_name: str
+    notebook_id: str
 
 
 @dataclass
-class Section:
-    """Represents a OneNote section."""
+class SectionGroup:
+    """Represents a OneNote section group."""
 
     id: str
     display_name: str
-    notebook_id: str
+    sections: List[Section] = field(default_factory=list)
+
+
+@dataclass
+class Notebook:
+    """Represents a OneNote notebook."""
+
+    id: str
+    display_name: str
+    sections: List[Section] = field(default_factory=list)
+    section_groups: List[SectionGroup] = field(default_factory=list)
 
 
 class OneNoteService:
     """Service for interacting with OneNote via Graph API."""
 
-    def __init__(self, access_token: str, config: OneNoteConfig):
+    def __init__(
+        self,
+        access_token: str,
+        config: OneNoteConfig,
+        session: Optional[requests.Session] = None,
+    ):
         """Initialize OneNote service.
 
         Args:
             access_token: Microsoft Graph API access token.
             config: OneNote configuration.
+            session: Shared HTTP session. A private session is created if omitted.
         """
         self._access_token = access_token
         self._config = config
+        self._session = session or requests.Session()
         self._headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json",
         }
-        self._cached_section_id: Optional[str] = None
+        # Section name (lowercased) -> ID
+        self._section_ids: Dict[str, str] = {}
+        self._tree: Optional[List[Notebook]] = None
+        self._tree_lock = threading.Lock()
 
     def list_notebooks(self) -> List[Notebook]:
-        """List all notebooks.
+        """List all notebooks, without their sections.
 
         Returns:
             List of notebooks.
@@ -55,18 +87,9 @@ class OneNoteService:
         Raises:
             RuntimeError: If API call fails.
         """
-        response = requests.get(
-            f"{GRAPH_BASE_URL}/me/onenote/notebooks",
-            headers=self._headers,
-        )
-
-        if response.status_code != 200:
-            raise RuntimeError(f"Failed to list notebooks: {response.text}")
-
-        data = response.json()
         return [
             Notebook(id=nb["id"], display_name=nb["displayName"])
-            for nb in data.get("value", [])
+            for nb in self._get_all(f"{GRAPH_BASE_URL}/me/onenote/notebooks", "notebooks")
         ]
 
     def list_sections(self, notebook_id: str) -> List[Section]:
@@ -81,22 +104,114 @@ class OneNoteService:
         Raises:
             RuntimeError: If API call fails.
         """
-        response = requests.get(
-            f"{GRAPH_BASE_URL}/me/onenote/notebooks/{notebook_id}/sections",
-            headers=self._headers,
-        )
-
-        if response.status_code != 200:
-            raise RuntimeError(f"Failed to list sections: {response.text}")
-
-        data = response.json()
         return [
             Section(id=s["id"], display_name=s["displayName"], notebook_id=notebook_id)
-            for s in data.get("value", [])
+            for s in self._get_all(
+                f"{GRAPH_BASE_URL}/me/onenote/notebooks/{notebook_id}/sections", "sections"
+            )
         ]
 
-    def get_or_create_target_section(self) -> str:
-        """Get or create the target section for notes.
+    def get_notebook_tree(self, refresh: bool = False) -> List[Notebook]:
+        """Get every notebook with its sections and section groups.
+
+        The hierarchy comes from one $expand request (plus any further
+        pages). If Graph refuses the expansion, notebooks are listed and
+        their sections fetched concurrently instead. The tree is cached on
+        this service and reused by section resolution.
+
+        Args:
+            refresh: Ignore the cached tree.
+
+        Returns:
+            Notebooks with sections and section groups filled in.
+
+        Raises:
+            RuntimeError: If the notebooks cannot be listed.
+        """
+        with self._tree_lock:
+            if self._tree is None or refresh:
+                try:
+                    self._tree = self._fetch_expanded_tree()
+                except _ExpandUnsupported:
+                    self._tree = self._fetch_tree_concurrently()
+            return self._tree
+
+    def _fetch_expanded_tree(self) -> List[Notebook]:
+        """Fetch the hierarchy with $expand, following pagination."""
+        notebooks = []
+        for nb in self._get_all(
+            f"{GRAPH_BASE_URL}/me/onenote/notebooks",
+            "notebooks",
+            params={"$expand": NOTEBOOK_TREE_EXPAND},
+            expand=True,
+        ):
+            notebooks.append(Notebook(
+                id=nb["id"],
+                display_name=nb["displayName"],
+                sections=_sections(nb.get("sections", []), nb["id"]),
+                section_groups=[
+                    SectionGroup(
+                        id=g["id"],
+                        display_name=g["displayName"],
+                        sections=_sections(g.get("sections", []), nb["id"]),
+                    )
+                    for g in nb.get("sectionGroups", [])
+                ],
+            ))
+        return notebooks
+
+    def _fetch_tree_concurrently(self) -> List[Notebook]:
+        """Fetch notebooks, then each notebook's sections and groups in parallel."""
+        notebooks = self.list_notebooks()
+
+        def fill(notebook: Notebook) -> None:
+            notebook.sections = self.list_sections(notebook.id)
+            notebook.section_groups = [
+                SectionGroup(
+                    id=g["id"],
+                    display_name=g["displayName"],
+                    sections=_sections(g.get("sections", []), notebook.id),
+                )
+                for g in self._get_all(
+                    f"{GRAPH_BASE_URL}/me/onenote/notebooks/{notebook.id}/sectionGroups",
+                    "section groups",
+                    params={"$expand": "sections"},
+                )
+            ]
+
+        if notebooks:
+            workers = min(MAX_LISTING_WORKERS, len(notebooks))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="onenote") as pool:
+                # list() re-raises the first listing error
+                list(pool.map(fill, notebooks))
+        return notebooks
+
+    def _get_all(
+        self, url: str, what: str, params: Optional[dict] = None, expand: bool = False
+    ) -> Iterator[dict]:
+        """Yield every item of a collection, following @odata.nextLink.
+
+        Raises:
+            RuntimeError: If a request fails.
+        """
+        while url:
+            response = self._session.get(url, headers=self._headers, params=params)
+            if expand and response.status_code in (400, 501):
+                raise _ExpandUnsupported(response.text)
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to list {what}: {response.text}")
+
+            data = response.json()
+            yield from data.get("value", [])
+
+            # The next link already carries every query parameter
+            url, params = data.get("@odata.nextLink"), None
+
+    def get_or_create_target_section(self, section_name: Optional[str] = None) -> str:
+        """Get or create a section of the target notebook.
+
+        Args:
+            section_name: Section to use. Defaults to the configured section.
 
         Returns:
             Section ID.
@@ -104,16 +219,18 @@ class OneNoteService:
         Raises:
             RuntimeError: If unable to find or create section.
         """
-        if self._cached_section_id:
-            return self._cached_section_id
+        section_name = section_name or self._config.section_name
+        key = section_name.lower()
+        if key in self._section_ids:
+            return self._section_ids[key]
 
         # Find or create notebook
         notebook_id = self._get_or_create_notebook()
 
         # Find or create section
-        section_id = self._get_or_create_section(notebook_id)
+        section_id = self._get_or_create_section(notebook_id, section_name)
 
-        self._cached_section_id = section_id
+        self._section_ids[key] = section_id
         return section_id
 
     def _get_or_create_notebook(self) -> str:
@@ -122,15 +239,12 @@ class OneNoteService:
         Returns:
             Notebook ID.
         """
-        notebooks = self.list_notebooks()
-
-        # Look for existing notebook
-        for nb in notebooks:
-            if nb.display_name.lower() == self._config.notebook_name.lower():
-                return nb.id
+        notebook = self._find_notebook()
+        if notebook is not None:
+            return notebook.id
 
         # Create new notebook
-        response = requests.post(
+        response = self._session.post(
             f"{GRAPH_BASE_URL}/me/onenote/notebooks",
             headers=self._headers,
             json={"displayName": self._config.notebook_name},
@@ -139,42 +253,72 @@ class OneNoteService:
         if response.status_code not in (200, 201):
             raise RuntimeError(f"Failed to create notebook: {response.text}")
 
-        return response.json()["id"]
+        data = response.json()
+        with self._tree_lock:
+            if self._tree is not None:
+                self._tree.append(Notebook(id=data["id"], display_name=self._config.notebook_name))
+        return data["id"]
 
-    def _get_or_create_section(self, notebook_id: str) -> str:
-        """Get or create the target section.
+    def _get_or_create_section(self, notebook_id: str, section_name: str) -> str:
+        """Get or create a section in the target notebook.
 
         Args:
             notebook_id: The notebook ID.
+            section_name: Section display name.
 
         Returns:
             Section ID.
         """
-        sections = self.list_sections(notebook_id)
+        notebook = self._find_notebook()
+        sections = notebook.sections if notebook is not None else []
 
         # Look for existing section
         for section in sections:
-            if section.display_name.lower() == self._config.section_name.lower():
+            if section.display_name.lower() == section_name.lower():
                 return section.id
 
         # Create new section
-        response = requests.post(
+        response = self._session.post(
             f"{GRAPH_BASE_URL}/me/onenote/notebooks/{notebook_id}/sections",
             headers=self._headers,
-            json={"displayName": self._config.section_name},
+            json={"displayName": section_name},
         )
 
         if response.status_code not in (200, 201):
             raise RuntimeError(f"Failed to create section: {response.text}")
 
-        return response.json()["id"]
-
-    def create_page(self, title: str, html_content: str) -> str:
+        data = response.json()
+        if notebook is not None:
+            with self._tree_lock:
+                notebook.sections.append(
+                    Section(id=data["id"], display_name=section_name, notebook_id=notebook_id)
+                )
+        return data["id"]
+
+    def _find_notebook(self) -> Optional[Notebook]:
+        """The configured notebook in the cached tree, if it exists."""
+        for nb in self.get_notebook_tree():
+            if nb.display_name.lower() == self._config.notebook_name.lower():
+                return nb
+        return None
+
+    def create_page(
+        self,
+        title: str,
+        html_content: str,
+        parts: Optional[List[MultipartPart]] = None,
+        section_name: Optional[str] = None,
+    ) -> str:
         """Create a new page in the target section.
 
         Args:
             title: Page title.
             html_content: HTML content for the page body.
+            parts: Binary parts (e.g. images) referenced from the HTML as
+                ``name:<part name>``. When given, the page is created with a
+                single streamed multipart/form-data request.
+            section_name: Section of the target notebook to create it in.
+                Defaults to the configured section.
 
         Returns:
             The created page ID.
@@ -182,7 +326,7 @@ class OneNoteService:
         Raises:
             RuntimeError: If page creation fails.
         """
-        section_id = self.get_or_create_target_section()
+        section_id = self.get_or_create_target_section(section_name)
 
         # OneNote API requires specific HTML structure
         page_html = f"""<!DOCTYPE html>
@@ -195,19 +339,137 @@ class OneNoteService:
 </body>
 </html>"""
 
-        # OneNote pages endpoint requires text/html content type
+        if parts:
+            presentation = MultipartPart(
+                name="Presentation",
+                content_type="text/html",
+                data=page_html.encode("utf-8"),
+            )
+            body = MultipartStream([presentation, *parts])
+            content_type = body.content_type
+        else:
+            # OneNote pages endpoint requires text/html content type
+            body = page_html.encode("utf-8")
+            content_type = "text/html"
+
         headers = {
             "Authorization": f"Bearer {self._access_token}",
-            "Content-Type": "text/html",
+            "Content-Type": content_type,
         }
 
-        response = requests.post(
+        response = self._session.post(
             f"{GRAPH_BASE_URL}/me/onenote/sections/{section_id}/pages",
             headers=headers,
-            data=page_html.encode("utf-8"),
+            data=body,
         )
 
         if response.status_code not in (200, 201):
             raise RuntimeError(f"Failed to create page: {response.text}")
 
         return response.json()["id"]
+
+    def find_page(
+        self,
+        title: str,
+        section_name: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+    ) -> Optional[str]:
+        """Find the newest page with a title in a section of the target notebook.
+
+        Args:
+            title: Exact page title.
+            section_name: Section to look in. Defaults to the configured section.
+            created_after: Ignore pages created before this time.
+
+        Returns:
+            The page ID, or None if no page matches.
+
+        Raises:
+            RuntimeError: If the lookup fails.
+        """
+        section_id = self.get_or_create_target_section(section_name)
+        response = self._session.get(
+            f"{GRAPH_BASE_URL}/me/onenote/sections/{section_id}/pages",
+            headers=self._headers,
+            params={
+                "$filter": f"title eq '{_odata_string(title)}'",
+                "$select": "id,title,createdDateTime",
+                "$orderby": "createdDateTime desc",
+            },
+        )
+
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to find page: {response.text}")
+
+        for page in response.json().get("value", []):
+            if created_after is None or _parse_graph_time(page["createdDateTime"]) >= created_after:
+                return page["id"]
+        return None
+
+    def append_to_page(
+        self,
+        page_id: str,
+        html_content: str,
+        parts: Optional[List[MultipartPart]] = None,
+    ) -> bool:
+        """Append HTML to the end of an existing page's body.
+
+        Args:
+            page_id: The page ID.
+            html_content: HTML fragment to append.
+            parts: Binary parts referenced from the HTML as ``name:<part name>``,
+                sent alongside the PATCH commands in one multipart request.
+
+        Returns:
+            True if the content was appended, False if the page no longer exists.
+
+        Raises:
+            RuntimeError: If the update fails.
+        """
+        commands = [{"target": "body", "action": "append", "content": html_content}]
+        url = f"{GRAPH_BASE_URL}/me/onenote/pages/{page_id}/content"
+
+        if parts:
+            body = MultipartStream([
+                MultipartPart(
+                    name="Commands",
+                    content_type="application/json",
+                    data=json.dumps(commands).encode("utf-8"),
+                ),
+                *parts,
+            ])
+            headers = {
+                "Authorization": f"Bearer {self._access_token}",
+                "Content-Type": body.content_type,
+            }
+            response = self._session.patch(url, headers=headers, data=body)
+        else:
+            response = self._session.patch(url, headers=self._headers, json=commands)
+
+        if response.status_code == 404:
+            return False
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"Failed to update page: {response.text}")
+        return True
+
+
+class _ExpandUnsupported(Exception):
+    """Graph refused the $expand query."""
+
+
+def _odata_string(value: str) -> str:
+    """Escape a value for use inside a single-quoted OData string literal."""
+    return value.replace("'", "''")
+
+
+def _parse_graph_time(value: str) -> datetime:
+    """Parse a Graph timestamp such as 2026-10-19T09:00:00.1234567Z (UTC)."""
+    return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+
+
+def _sections(items: List[dict], notebook_id: str) -> List[Section]:
+    """Sections from Graph JSON."""
+    return [
+        Section(id=s["id"], display_name=s["displayName"], notebook_id=notebook_id)
+        for s in items
+    ]
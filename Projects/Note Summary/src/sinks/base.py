@@ -0,0 +1,79 @@
+"""Interface for the destinations notes are published to."""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src.services.circuit_breaker import CircuitOpenError
+from src.storage.note_store import StoredNote
+from src.utils.logging_setup import log_context, new_correlation_id
+
+
+@dataclass
+class PublishResult:
+    """Outcome of publishing one note to one sink."""
+
+    note: StoredNote
+    location: Optional[str] = None
+    error: Optional[str] = None
+    # The sink's service refused the call without trying it (circuit
+    # open), so the failure says nothing about the note
+    transient: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """Whether the note was published."""
+        return self.error is None
+
+
+class Sink(ABC):
+    """A destination for stored notes (OneNote, a Markdown vault, ...).
+
+    sync_notes hands each sink lanes of notes in received order. Notes in a
+    lane may depend on each other (same append group), so sinks publish them
+    in the order given.
+    """
+
+    # Name used in config (sinks.enabled) and in the tracker
+    name = ""
+
+    def open(self) -> None:
+        """Prepare to publish, e.g. resolve the target section.
+
+        Raises:
+            Exception: If the sink is unavailable; notes then stay in the store.
+        """
+
+    @abstractmethod
+    def publish(self, note: StoredNote) -> str:
+        """Publish one note.
+
+        Args:
+            note: Note from the local store.
+
+        Returns:
+            Where the note was written (page id, file path).
+
+        Raises:
+            Exception: If the note could not be published.
+        """
+
+    def publish_batch(self, notes: List[StoredNote]) -> List[PublishResult]:
+        """Publish a lane of notes, one result per note in the same order.
+
+        The default publishes one at a time; sinks that can combine writes
+        override this.
+        """
+        results = []
+        for note in notes:
+            with log_context(correlation_id=new_correlation_id(), email_id=note.email_id):
+                try:
+                    results.append(PublishResult(note, location=self.publish(note)))
+                except Exception as e:
+                    results.append(PublishResult(
+                        note, error=str(e), transient=isinstance(e, CircuitOpenError)
+                    ))
+        return results
+
+    def close(self) -> None:
+        """Release resources held by the sink."""
@@ -0,0 +1,272 @@
+"""Publish notes as Markdown files, e.g. into an Obsidian vault."""
+
+import base64
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.processors.grouping import subject_tag
+from src.processors.markdown import html_to_markdown
+from src.sinks.base import PublishResult, Sink
+from src.storage.note_store import StoredImage, StoredNote
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils.config import MarkdownConfig
+from src.utils.metrics import get_metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Characters Obsidian or common file systems reject in file names
+_UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|#^\[\]\x00-\x1f]')
+_TAG_UNSAFE_RE = re.compile(r"[^\w/-]+")
+MAX_NAME_LENGTH = 100
+# Marks each entry appended to a shared file, so re-publishing is a no-op
+ENTRY_MARKER = "<!-- note-summary: {} -->"
+
+
+def safe_file_name(title: str) -> str:
+    """Turn a note title into a file name stem."""
+    name = " ".join(_UNSAFE_NAME_RE.sub(" ", title).split())
+    return name[:MAX_NAME_LENGTH].strip(" .") or "Untitled"
+
+
+def obsidian_tag(subject: str) -> Optional[str]:
+    """Obsidian tag for a subject's leading [tag], e.g. "note/deal" for [Note:Deal]."""
+    tag = subject_tag(subject).lower().replace(":", "/")
+    tag = _TAG_UNSAFE_RE.sub("-", tag).strip("-/")
+    return tag or None
+
+
+def front_matter(fields: Dict[str, object]) -> str:
+    """YAML front matter block; values are JSON-quoted, which YAML accepts."""
+    lines = ["---"]
+    for key, value in fields.items():
+        if value is None or value == []:
+            continue
+        lines.append(f"{key}: {json.dumps(value, ensure_ascii=False)}")
+    lines.append("---")
+    return "\n".join(lines) + "\n"
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write a file so readers (and vault sync) never see it half written."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".note-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class MarkdownSink(Sink):
+    """Writes notes as Markdown files with YAML front matter.
+
+    A plain note becomes "<YYYY-MM-DD> <title>.md". Append-mode groups share
+    "<group title>.md", and "received again" entries go into the original
+    note's file. Files are written atomically, and all notes of a batch
+    that land in the same file are written with a single write. Notes
+    whose subject pattern has an entry in ``folders_by_pattern`` go to that
+    folder instead of the default one.
+    """
+
+    name = "markdown"
+
+    def __init__(self, config: MarkdownConfig, tracker: ProcessedTracker, base_dir: Path):
+        """Initialize the sink.
+
+        Args:
+            config: Markdown sink configuration.
+            tracker: Processed-email tracker (where earlier notes were written).
+            base_dir: Directory relative vault paths are resolved against.
+        """
+        vault = Path(config.vault_path).expanduser()
+        if not vault.is_absolute():
+            vault = base_dir / vault
+        self._vault = vault
+        self._folder = vault / config.folder
+        self._folders_by_pattern = {
+            pattern: vault / folder for pattern, folder in config.folders_by_pattern.items()
+        }
+        self._attachments = self._folder / config.attachments_folder
+        self._tracker = tracker
+
+    def open(self) -> None:
+        """Create the notes folder.
+
+        Raises:
+            RuntimeError: If the vault directory does not exist.
+        """
+        if not self._vault.is_dir():
+            raise RuntimeError(f"Vault directory not found: {self._vault}")
+        for folder in [self._folder, *self._folders_by_pattern.values()]:
+            folder.mkdir(parents=True, exist_ok=True)
+
+    def publish(self, note: StoredNote) -> str:
+        """Write one note.
+
+        Returns:
+            Vault-relative path of the file written.
+        """
+        result = self.publish_batch([note])[0]
+        if not result.ok:
+            raise RuntimeError(result.error)
+        return result.location
+
+    def publish_batch(self, notes: List[StoredNote]) -> List[PublishResult]:
+        """Write a lane of notes, combining notes that share a file.
+
+        Returns:
+            One result per note, in order.
+        """
+        # file -> its notes, in order; the first note of a new file supplies
+        # its front matter
+        by_file: "OrderedDict[Path, List[StoredNote]]" = OrderedDict()
+        placed: Dict[str, Path] = {}
+        for note in notes:
+            placed[note.email_id] = self._target(note, placed)
+            by_file.setdefault(placed[note.email_id], []).append(note)
+
+        locations: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        written = 0
+        with get_metrics().timer("note_summary_stage_seconds", stage="write_markdown"):
+            for path, file_notes in by_file.items():
+                try:
+                    self._write_file(path, file_notes)
+                except Exception as e:
+                    for note in file_notes:
+                        errors[note.email_id] = f"Failed to write {path}: {e}"
+                    continue
+                written += 1
+                location = path.relative_to(self._vault).as_posix()
+                for note in file_notes:
+                    locations[note.email_id] = location
+
+        if locations:
+            logger.info("  Wrote %s note(s) to %s file(s) in %s",
+                        len(locations), written, self._folder)
+        return [
+            PublishResult(note, location=locations.get(note.email_id),
+                          error=errors.get(note.email_id))
+            for note in notes
+        ]
+
+    def _target(self, note: StoredNote, placed: Dict[str, Path]) -> Path:
+        """Pick the file a note is written to.
+
+        Args:
+            note: Note to place.
+            placed: Files already picked for earlier notes of the batch.
+        """
+        previous = self._tracker.get_sink_location(note.email_id, self.name)
+        if previous:
+            return self._vault / previous
+
+        if note.append_to_email_id:
+            if note.append_to_email_id in placed:
+                return placed[note.append_to_email_id]
+            original = self._tracker.get_sink_location(note.append_to_email_id, self.name)
+            if original:
+                return self._vault / original
+            # The original predates this sink; fall through to a file of its own
+
+        folder = self._folders_by_pattern.get(note.pattern or "", self._folder)
+        if note.group_key:
+            return folder / f"{safe_file_name(note.group_title or note.title)}.md"
+
+        day = datetime.fromisoformat(note.received_at).strftime("%Y-%m-%d")
+        stem = f"{day} {safe_file_name(note.title)}"
+        path = folder / f"{stem}.md"
+        counter = 2
+        taken = set(placed.values())
+        while path in taken or (path.exists() and not self._holds(path, note)):
+            path = folder / f"{stem} {counter}.md"
+            counter += 1
+        return path
+
+    @staticmethod
+    def _holds(path: Path, note: StoredNote) -> bool:
+        """Whether an existing file is this note's (written before a crash)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                head = f.read(1024)
+        except OSError:
+            return False
+        return f"email_id: {json.dumps(note.email_id)}" in head
+
+    def _write_file(self, path: Path, notes: List[StoredNote]) -> None:
+        """Create or extend one file with the given notes, in one write."""
+        try:
+            existing = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            existing = None
+
+        text, rest = existing, notes
+        if text is None:
+            first = notes[0]
+            if first.group_key:
+                text = front_matter({
+                    "title": first.group_title or first.title,
+                    "created": first.received_at,
+                    "tags": [t for t in [obsidian_tag(first.subject)] if t],
+                })
+            else:
+                text = self._front_matter(first) + "\n" + self._body(first, path.parent)
+                rest = notes[1:]
+
+        for note in rest:
+            marker = ENTRY_MARKER.format(note.email_id)
+            if marker in text or f"email_id: {json.dumps(note.email_id)}" in text:
+                continue  # already written by an earlier attempt
+            text = text.rstrip("\n") + f"\n\n{marker}\n{self._body(note, path.parent)}"
+
+        if text != existing:
+            atomic_write(path, text.encode("utf-8"))
+
+    def _front_matter(self, note: StoredNote) -> str:
+        """Front matter of a note's own file."""
+        return front_matter({
+            "title": note.title,
+            "email_id": note.email_id,
+            "subject": note.subject,
+            "received": note.received_at,
+            "content_hash": note.content_hash or None,
+            "tags": [t for t in [obsidian_tag(note.subject)] if t],
+        })
+
+    def _body(self, note: StoredNote, folder: Path) -> str:
+        """Markdown for a note in the given folder, writing its images alongside."""
+        images = {image.name: image for image in note.images}
+
+        def image_src(src: str) -> str:
+            if src.startswith("cid:"):
+                return ""
+            if not src.startswith("name:"):
+                return src
+            image = images.get(src[len("name:"):])
+            if image is None:
+                return ""
+            return Path(os.path.relpath(self._write_image(image), folder)).as_posix()
+
+        return html_to_markdown(note.html_content, image_src=image_src)
+
+    def _write_image(self, image: StoredImage) -> Path:
+        """Write an inline image once; the name is derived from its content."""
+        data = base64.b64decode(image.content_base64)
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        extension = mimetypes.guess_extension(image.content_type) or ".bin"
+        path = self._attachments / f"{digest}{extension}"
+        if not path.exists():
+            self._attachments.mkdir(parents=True, exist_ok=True)
+            atomic_write(path, data)
+        return path
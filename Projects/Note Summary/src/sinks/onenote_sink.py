@@ -0,0 +1,180 @@
+"""Publish notes as OneNote pages."""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import requests
+
+from src.services.multipart import MultipartPart
+from src.services.onenote_service import OneNoteService
+from src.sinks.base import Sink
+from src.storage.note_store import StoredNote
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils.config import Config
+from src.utils.metrics import get_metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Tracker sync_state key marking a page create whose outcome is unknown
+CREATE_MARKER = "page_create:"
+# Allowance for the difference between our clock and OneNote's
+CLOCK_SKEW = timedelta(minutes=1)
+
+
+class OneNoteSink(Sink):
+    """Creates a page per note, or appends to group and original-note pages."""
+
+    name = "onenote"
+
+    def __init__(
+        self,
+        config: Config,
+        token: str,
+        tracker: ProcessedTracker,
+        session: Optional[requests.Session] = None,
+    ):
+        """Initialize the sink.
+
+        Args:
+            config: Application configuration.
+            token: Access token.
+            tracker: Processed-email tracker (page ids, group pages).
+            session: Shared HTTP session for Graph calls.
+        """
+        self._config = config
+        self._tracker = tracker
+        self._service = OneNoteService(token, config.onenote, session=session)
+
+    def open(self) -> None:
+        """Resolve the target sections once, before lanes race to create them."""
+        self._service.get_or_create_target_section()
+        for section_name in self._config.onenote.sections_by_pattern.values():
+            self._service.get_or_create_target_section(section_name)
+
+    def publish(self, note: StoredNote) -> str:
+        """Write a note to OneNote and record its page id.
+
+        Returns:
+            The page id written to, or "" if the page the note belonged to
+            was deleted.
+        """
+        parts = [
+            MultipartPart(image.name, image.content_type, base64_data=image.content_base64)
+            for image in note.images
+        ] or None
+
+        page_id = None
+        if note.append_to_email_id:
+            target = self._tracker.get_page_id(note.append_to_email_id)
+            if target is None:
+                raise RuntimeError("the note it belongs to has not been published yet")
+            if not self._append_page(target, note.title, note.html_content, parts):
+                logger.warning("  Page of the original note was deleted; nothing to append to")
+                return ""
+            page_id = target
+        elif note.group_key:
+            group_page = self._tracker.get_group_page(note.group_key)
+            max_notes = self._config.append.max_notes_per_page
+            if group_page and group_page["note_count"] < max_notes:
+                if self._append_page(
+                    group_page["page_id"], note.group_title, note.html_content, parts
+                ):
+                    page_id = group_page["page_id"]
+                else:
+                    logger.warning("  Group page was deleted; starting a new one")
+            if page_id is None:
+                page_id = self._create_page(
+                    note.email_id, note.group_title or note.title, note.html_content, parts,
+                    note.pattern,
+                )
+            self._tracker.record_group_note(note.group_key, page_id)
+        else:
+            page_id = self._create_page(
+                note.email_id, note.title, note.html_content, parts, note.pattern
+            )
+
+        self._tracker.mark_processed(
+            email_id=note.email_id,
+            subject=note.subject,
+            received_at=datetime.fromisoformat(note.received_at),
+            onenote_page_id=page_id,
+        )
+        return page_id
+
+    def _create_page(
+        self,
+        email_id: str,
+        title: str,
+        html_content: str,
+        parts: Optional[List[MultipartPart]],
+        pattern: Optional[str] = None,
+    ) -> str:
+        """Create a OneNote page in the section routed to by its pattern.
+
+        A create that got no response (e.g. a read timeout) may still have
+        made the page, so the next attempt for the note looks for it first
+        instead of posting a second copy.
+        """
+        section_name = self._config.onenote.sections_by_pattern.get(pattern or "")
+        marker = CREATE_MARKER + email_id
+        attempted = self._tracker.get_sync_state(marker)
+        if attempted is not None:
+            page_id = self._service.find_page(
+                title, section_name, created_after=datetime.fromisoformat(attempted) - CLOCK_SKEW
+            )
+            if page_id is not None:
+                logger.info("  Found page made by an earlier attempt: %s", title)
+                self._tracker.save_sync_state(marker, None)
+                return page_id
+
+        self._tracker.save_sync_state(marker, datetime.now(timezone.utc).isoformat())
+        started = time.perf_counter()
+        try:
+            with get_metrics().timer("note_summary_stage_seconds", stage="create_page"):
+                page_id = self._service.create_page(
+                    title, html_content, parts=parts, section_name=section_name
+                )
+        except requests.RequestException:
+            # No answer: keep the marker so the next attempt looks first
+            raise
+        except Exception:
+            self._tracker.save_sync_state(marker, None)
+            raise
+        self._tracker.save_sync_state(marker, None)
+        logger.info(
+            "  Created OneNote page: %s",
+            title,
+            extra={"stage": "create_page", "duration_ms": _elapsed_ms(started)},
+        )
+        return page_id
+
+    def _append_page(
+        self,
+        page_id: str,
+        title: Optional[str],
+        html_content: str,
+        parts: Optional[List[MultipartPart]],
+    ) -> bool:
+        """Append to a OneNote page, with timing and logging.
+
+        Returns:
+            False if the page no longer exists.
+        """
+        started = time.perf_counter()
+        with get_metrics().timer("note_summary_stage_seconds", stage="append_page"):
+            appended = self._service.append_to_page(page_id, html_content, parts=parts)
+        if appended:
+            logger.info(
+                "  Appended to OneNote page: %s",
+                title,
+                extra={"stage": "append_page", "duration_ms": _elapsed_ms(started)},
+            )
+        return appended
+
+
+def _elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.perf_counter() reading."""
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -0,0 +1,253 @@
+"""Queue of emails waiting to be ingested by worker processes.
+
+A fetcher lists new mail and enqueues it; workers claim emails under a
+lease, renew the lease while they work and remove the email once it is
+ingested. A worker that dies stops renewing, and its emails become
+claimable again when the lease runs out. Claims are atomic, so an email
+is only ever being processed by one worker at a time.
+"""
+
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Generator, Iterable, List, Optional
+
+from src.utils.config import get_data_dir
+
+
+@dataclass
+class Job:
+    """An email waiting to be ingested."""
+
+    email_id: str
+    subject: str
+    received_at: str
+    # Replies of one conversation are handed out oldest first, one at a
+    # time, so each finds its thread's first note already in
+    conversation_id: str = ""
+    # Times the email was claimed, including the current claim
+    attempts: int = 0
+
+
+class JobQueue(ABC):
+    """Interface of a job queue backend (see queue.backend)."""
+
+    @abstractmethod
+    def enqueue(self, jobs: Iterable[Job]) -> int:
+        """Add emails to the queue; emails already queued are left as they are.
+
+        Returns:
+            Number of emails newly queued.
+        """
+
+    @abstractmethod
+    def claim(
+        self, worker_id: str, lease_seconds: float, limit: int = 1,
+        now: Optional[datetime] = None,
+    ) -> List[Job]:
+        """Claim up to limit unclaimed (or abandoned) emails, oldest first.
+
+        Args:
+            worker_id: Identifies the claiming worker.
+            lease_seconds: How long the claim lasts without a heartbeat.
+            limit: Maximum emails to claim.
+            now: Current time (for testing). Defaults to now.
+
+        Returns:
+            The claimed jobs, with attempts counting this claim.
+        """
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, lease_seconds: float) -> int:
+        """Extend the leases of every email the worker holds.
+
+        Returns:
+            Number of leases extended.
+        """
+
+    @abstractmethod
+    def complete(self, email_id: str, worker_id: str) -> bool:
+        """Remove an email the worker has finished with.
+
+        Returns:
+            False if the worker no longer held it (its lease ran out and
+            another worker claimed it).
+        """
+
+    @abstractmethod
+    def release(self, worker_id: str) -> int:
+        """Give back every email the worker holds, e.g. when shutting down.
+
+        Returns:
+            Number of emails released.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of queued emails, claimed or not."""
+
+
+class SqliteJobQueue(JobQueue):
+    """Job queue kept in a table of the tracker database.
+
+    Claims run in an IMMEDIATE transaction, so concurrent worker processes
+    on this machine never claim the same email. The database must be on a
+    local disk; SQLite locking is not reliable over network filesystems.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Initialize the queue.
+
+        Args:
+            db_path: Path to SQLite database. Defaults to data/processed.db.
+        """
+        if db_path is None:
+            db_path = get_data_dir() / "processed.db"
+
+        self._db_path = db_path
+        self._init_database()
+
+    def _init_database(self) -> None:
+        """Initialize database schema."""
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS email_jobs (
+                    email_id TEXT PRIMARY KEY,
+                    subject TEXT NOT NULL,
+                    received_at TEXT NOT NULL,
+                    conversation_id TEXT NOT NULL DEFAULT '',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires_at TEXT,
+                    enqueued_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_email_jobs_received
+                ON email_jobs(received_at)
+            """)
+
+    @contextmanager
+    def _get_connection(self) -> Generator[sqlite3.Connection, None, None]:
+        """Get a database connection in autocommit mode."""
+        # Workers contend for the write lock; wait for it rather than fail
+        conn = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, jobs: Iterable[Job]) -> int:
+        """Add emails to the queue; see JobQueue.enqueue."""
+        now = _utcnow().isoformat()
+        rows = [
+            (job.email_id, job.subject, job.received_at, job.conversation_id, now)
+            for job in jobs
+        ]
+        with self._get_connection() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO email_jobs
+                (email_id, subject, received_at, conversation_id, enqueued_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            return conn.total_changes - before
+
+    def claim(
+        self, worker_id: str, lease_seconds: float, limit: int = 1,
+        now: Optional[datetime] = None,
+    ) -> List[Job]:
+        """Claim emails; see JobQueue.claim."""
+        now = now or _utcnow()
+        expires_at = (now + timedelta(seconds=lease_seconds)).isoformat()
+        with self._get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    """
+                    SELECT email_id, subject, received_at, conversation_id, attempts
+                    FROM email_jobs AS job
+                    WHERE (lease_owner IS NULL OR lease_expires_at <= ?)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM email_jobs AS earlier
+                          WHERE job.conversation_id != ''
+                            AND earlier.conversation_id = job.conversation_id
+                            AND earlier.received_at < job.received_at
+                      )
+                    ORDER BY received_at
+                    LIMIT ?
+                    """,
+                    (now.isoformat(), limit),
+                ).fetchall()
+                conn.executemany(
+                    """
+                    UPDATE email_jobs
+                    SET lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                    WHERE email_id = ?
+                    """,
+                    [(worker_id, expires_at, row["email_id"]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return [
+            Job(
+                email_id=row["email_id"],
+                subject=row["subject"],
+                received_at=row["received_at"],
+                conversation_id=row["conversation_id"],
+                attempts=row["attempts"] + 1,
+            )
+            for row in rows
+        ]
+
+    def heartbeat(self, worker_id: str, lease_seconds: float) -> int:
+        """Extend the worker's leases; see JobQueue.heartbeat."""
+        expires_at = (_utcnow() + timedelta(seconds=lease_seconds)).isoformat()
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                "UPDATE email_jobs SET lease_expires_at = ? WHERE lease_owner = ?",
+                (expires_at, worker_id),
+            )
+            return cursor.rowcount
+
+    def complete(self, email_id: str, worker_id: str) -> bool:
+        """Remove a finished email; see JobQueue.complete."""
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM email_jobs WHERE email_id = ? AND lease_owner = ?",
+                (email_id, worker_id),
+            )
+            return cursor.rowcount > 0
+
+    def release(self, worker_id: str) -> int:
+        """Give back the worker's emails; see JobQueue.release."""
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE email_jobs
+                SET lease_owner = NULL, lease_expires_at = NULL, attempts = attempts - 1
+                WHERE lease_owner = ?
+                """,
+                (worker_id,),
+            )
+            return cursor.rowcount
+
+    def count(self) -> int:
+        """Number of queued emails; see JobQueue.count."""
+        with self._get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM email_jobs").fetchone()[0]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
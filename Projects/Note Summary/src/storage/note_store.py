@@ -0,0 +1,197 @@
+"""Local store of processed notes waiting to be published (the outbox)."""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from src.utils.config import get_data_dir
+
+
+# Retry delays grow from RETRY_BASE_SECONDS, doubling per failed attempt
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before the next attempt after this many failures."""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+@dataclass
+class StoredImage:
+    """An inline image kept with a note until it is published."""
+
+    name: str
+    content_type: str
+    content_base64: str
+
+
+@dataclass
+class StoredNote:
+    """A processed note and its publishing state."""
+
+    email_id: str
+    subject: str
+    title: str
+    html_content: str
+    received_at: str
+    content_hash: str = ""
+    plain_text: str = ""
+    images: List[StoredImage] = field(default_factory=list)
+    # Append-mode group (see src.processors.grouping)
+    group_key: Optional[str] = None
+    group_title: Optional[str] = None
+    # Subject pattern the email matched (routes it to a section or folder)
+    pattern: Optional[str] = None
+    # Append to the page of this earlier email instead of creating a page
+    append_to_email_id: Optional[str] = None
+    attempts: int = 0
+    next_attempt_at: Optional[str] = None
+    last_error: Optional[str] = None
+    stored_at: str = ""
+    # Set when the note was given up on after too many failures
+    dead_lettered_at: Optional[str] = None
+
+    @property
+    def file_name(self) -> str:
+        """Store file name; sorts by received time."""
+        received = datetime.fromisoformat(self.received_at).strftime("%Y%m%dT%H%M%S")
+        digest = hashlib.sha1(self.email_id.encode("utf-8")).hexdigest()[:12]
+        return f"{received}-{digest}.json"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StoredNote":
+        """Create a StoredNote from its JSON form."""
+        images = [StoredImage(**image) for image in data.pop("images", [])]
+        return cls(images=images, **data)
+
+
+class NoteStore:
+    """Notes persisted in the data directory before publishing.
+
+    Each note is one JSON file, written atomically. Notes wait in
+    ``pending/`` until a sync publishes them, then move to ``synced/`` so
+    the local copy outlives the remote one. Notes that keep failing move to
+    ``dead/`` until they are requeued.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        """Initialize the store.
+
+        Args:
+            root: Store directory. Defaults to data/notes.
+        """
+        if root is None:
+            root = get_data_dir() / "notes"
+
+        self._pending = root / "pending"
+        self._synced = root / "synced"
+        self._dead = root / "dead"
+        for directory in (self._pending, self._synced, self._dead):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def put(self, note: StoredNote) -> None:
+        """Add a note to the pending queue (or rewrite it)."""
+        if not note.stored_at:
+            note.stored_at = datetime.now(timezone.utc).isoformat()
+        self._write(self._pending / note.file_name, note)
+
+    def pending(self, now: Optional[datetime] = None) -> List[StoredNote]:
+        """Pending notes that are due for an attempt, oldest first.
+
+        Args:
+            now: Current time (for testing). Defaults to now.
+
+        Returns:
+            Due notes in received order.
+        """
+        now = now or datetime.now(timezone.utc)
+        return [
+            note
+            for note in self._iter(self._pending)
+            if note.next_attempt_at is None or datetime.fromisoformat(note.next_attempt_at) <= now
+        ]
+
+    def pending_count(self) -> int:
+        """Number of notes waiting to be published, due or not."""
+        return sum(1 for _ in self._pending.glob("*.json"))
+
+    def complete(self, note: StoredNote) -> None:
+        """Move a published note out of the queue."""
+        note.last_error = None
+        note.next_attempt_at = None
+        self._write(self._synced / note.file_name, note)
+        (self._pending / note.file_name).unlink(missing_ok=True)
+
+    def record_failure(
+        self, note: StoredNote, error: str, max_attempts: Optional[int] = None
+    ) -> bool:
+        """Count a failed attempt and schedule the next one with backoff.
+
+        Args:
+            note: The note that failed.
+            error: Why it failed.
+            max_attempts: Dead-letter the note once it has failed this often.
+                None only reschedules it (e.g. when a sink is down, which
+                says nothing about the note).
+
+        Returns:
+            True if the note was moved to the dead letters.
+        """
+        note.attempts += 1
+        note.last_error = error
+        now = datetime.now(timezone.utc)
+        if max_attempts is not None and note.attempts >= max_attempts:
+            note.next_attempt_at = None
+            note.dead_lettered_at = now.isoformat()
+            self._write(self._dead / note.file_name, note)
+            (self._pending / note.file_name).unlink(missing_ok=True)
+            return True
+        note.next_attempt_at = (now + timedelta(seconds=retry_delay(note.attempts))).isoformat()
+        self.put(note)
+        return False
+
+    def dead_letters(self) -> List[StoredNote]:
+        """Notes given up on after too many failures, oldest first."""
+        return list(self._iter(self._dead))
+
+    def requeue(self, email_id: str) -> bool:
+        """Move a dead-lettered note back to the queue with a fresh attempt count.
+
+        Returns:
+            True if the note was found among the dead letters.
+        """
+        for note in self._iter(self._dead):
+            if note.email_id == email_id:
+                note.attempts = 0
+                note.next_attempt_at = None
+                note.dead_lettered_at = None
+                self.put(note)
+                (self._dead / note.file_name).unlink(missing_ok=True)
+                return True
+        return False
+
+    def _iter(self, directory: Path) -> Iterator[StoredNote]:
+        for path in sorted(directory.glob("*.json")):
+            try:
+                with open(path, "r") as f:
+                    yield StoredNote.from_dict(json.load(f))
+            except (OSError, ValueError, TypeError):
+                # Removed by a concurrent sync, or not a note file
+                continue
+
+    @staticmethod
+    def _write(path: Path, note: StoredNote) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".note-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(asdict(note), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
@@ -1,12 +1,21 @@
 """SQLite-based tracker for processed emails to prevent duplicates."""
 
+import re
 import sqlite3
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Generator, List, Optional
+from typing import Dict, Generator, Iterable, List, Optional, Set
 
+from src.processors.fingerprint import SIMHASH_BANDS, hamming_distance, simhash_bands
+from src.storage.note_store import retry_delay
 from src.utils.config import get_data_dir
+from src.utils.metrics import get_metrics
+
+
+# Search terms: runs of word characters; everything else is dropped so
+# user input can never be parsed as FTS5 query syntax
+_SEARCH_TERM_RE = re.compile(r"\w+")
 
 
 class ProcessedTracker:
@@ -22,6 +31,7 @@ class ProcessedTracker:
             db_path = get_data_dir() / "processed.db"
 
         self._db_path = db_path
+        self._fts_enabled = False
         self._init_database()
 
     def _init_database(self) -> None:
@@ -31,6 +41,10 @@ class ProcessedTracker:
         with self._get_connection() as conn:
             cursor = conn.cursor()
 
+            # Worker processes write concurrently; WAL lets readers carry on
+            # while one of them holds the write lock
+            cursor.execute("PRAGMA journal_mode=WAL")
+
             # Table for processed emails
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS processed_emails (
@@ -48,6 +62,149 @@ class ProcessedTracker:
                 ON processed_emails(processed_at)
             """)
 
+            # Content fingerprints for duplicate detection (added after v0.1)
+            self._ensure_columns(cursor, "processed_emails", {
+                "content_hash": "TEXT",
+                "simhash": "TEXT",
+                **{f"simhash_b{i}": "INTEGER" for i in range(SIMHASH_BANDS)},
+                "duplicate_of": "TEXT",
+                # Set for "link" duplicates, which take the original's page
+                "link_to_original": "INTEGER NOT NULL DEFAULT 0",
+            })
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_content_hash
+                ON processed_emails(content_hash)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_duplicate_of
+                ON processed_emails(duplicate_of)
+            """)
+            for i in range(SIMHASH_BANDS):
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_simhash_b{i} "
+                    f"ON processed_emails(simhash_b{i})"
+                )
+
+            # Content hashes of uploaded inline images, to spot recurring
+            # logos and signature images
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS image_hashes (
+                    sha256 TEXT PRIMARY KEY,
+                    seen_count INTEGER NOT NULL DEFAULT 0,
+                    first_seen_at TEXT NOT NULL,
+                    last_seen_at TEXT NOT NULL
+                )
+            """)
+
+            # Current page for each append-mode group
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS page_groups (
+                    group_key TEXT PRIMARY KEY,
+                    page_id TEXT NOT NULL,
+                    note_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+            # Emails that failed to process: retried with backoff, then set
+            # aside as dead letters so they stop costing calls every cycle
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS email_failures (
+                    email_id TEXT PRIMARY KEY,
+                    subject TEXT NOT NULL,
+                    received_at TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    next_attempt_at TEXT,
+                    dead_lettered_at TEXT,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+            # First note of each mail conversation, whose page its replies join
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    conversation_id TEXT PRIMARY KEY,
+                    email_id TEXT NOT NULL,
+                    message_count INTEGER NOT NULL DEFAULT 1,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+            # Delivery of each note to each output sink: where it was
+            # written (page id, file path), or why the last attempt failed
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sink_locations (
+                    email_id TEXT NOT NULL,
+                    sink TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (email_id, sink)
+                )
+            """)
+            self._ensure_columns(cursor, "sink_locations", {
+                "status": "TEXT NOT NULL DEFAULT 'delivered'",
+                "attempts": "INTEGER NOT NULL DEFAULT 0",
+                "last_error": "TEXT",
+            })
+
+            # Small named values kept between runs (mail folder ids, delta links)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+            # Resume points for --backfill runs, one row per date range
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                    run_key TEXT PRIMARY KEY,
+                    cursor TEXT NOT NULL,
+                    emails INTEGER NOT NULL DEFAULT 0,
+                    written INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL,
+                    completed_at TEXT
+                )
+            """)
+            # End of an open-ended run's range, fixed when it starts
+            self._ensure_columns(cursor, "backfill_checkpoints", {"until_at": "TEXT"})
+
+            # Full-text index of note titles and bodies for --search.
+            # Optional: some SQLite builds ship without FTS5.
+            try:
+                cursor.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                        email_id UNINDEXED,
+                        title,
+                        body,
+                        tokenize = 'porter unicode61 remove_diacritics 2'
+                    )
+                """)
+                self._fts_enabled = True
+            except sqlite3.OperationalError:
+                self._fts_enabled = False
+
+            # FTS rowid of each indexed note: email_id is UNINDEXED, so
+            # replacing a note looks its row up here rather than scanning
+            if self._fts_enabled:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts_rows'"
+                )
+                created = cursor.fetchone() is None
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS notes_fts_rows (
+                        email_id TEXT PRIMARY KEY,
+                        fts_rowid INTEGER NOT NULL
+                    )
+                """)
+                if created:
+                    cursor.execute("""
+                        INSERT INTO notes_fts_rows (email_id, fts_rowid)
+                        SELECT email_id, MAX(rowid) FROM notes_fts GROUP BY email_id
+                    """)
+
             # Future extension: tasks table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS tasks (
@@ -63,10 +220,20 @@ class ProcessedTracker:
 
             conn.commit()
 
+    @staticmethod
+    def _ensure_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> None:
+        """Add any missing columns to an existing table."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, decl in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
     @contextmanager
     def _get_connection(self) -> Generator[sqlite3.Connection, None, None]:
         """Get database connection context manager."""
-        conn = sqlite3.connect(self._db_path)
+        # Workers contend for the write lock; wait for it rather than fail
+        conn = sqlite3.connect(self._db_path, timeout=30)
         conn.row_factory = sqlite3.Row
         try:
             yield conn
@@ -82,7 +249,8 @@ class ProcessedTracker:
         Returns:
             True if the email has been processed.
         """
-        with self._get_connection() as conn:
+        with get_metrics().timer("note_summary_tracker_seconds", op="is_processed"), \
+                self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT 1 FROM processed_emails WHERE email_id = ?",
@@ -96,22 +264,49 @@ class ProcessedTracker:
         subject: str,
         received_at: datetime,
         onenote_page_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        simhash: Optional[int] = None,
+        duplicate_of: Optional[str] = None,
+        link_to_original: bool = False,
     ) -> None:
         """Mark an email as processed.
 
+        Marking an email again updates its record; optional fields passed
+        as None keep their stored values, so the note's ingest and its later
+        publish can be recorded in either order. Likewise a linked duplicate
+        gets the original's page whether the original is published before
+        or after the duplicate is recorded.
+
         Args:
             email_id: The email message ID.
             subject: Email subject.
             received_at: When the email was received.
             onenote_page_id: The created OneNote page ID.
+            content_hash: Exact content fingerprint of the note.
+            simhash: Near-duplicate fingerprint of the note.
+            duplicate_of: Email ID of the original if this was a duplicate.
+            link_to_original: Record the original's page against this
+                duplicate, now or once the original is published.
         """
-        with self._get_connection() as conn:
+        bands = simhash_bands(simhash) if simhash is not None else [None] * SIMHASH_BANDS
+        with get_metrics().timer("note_summary_tracker_seconds", op="mark_processed"), \
+                self._get_connection() as conn:
             cursor = conn.cursor()
+            keep = ["onenote_page_id", "content_hash", "simhash", "duplicate_of"]
+            keep += [f"simhash_b{i}" for i in range(SIMHASH_BANDS)]
+            merge = ", ".join(f"{col} = COALESCE(excluded.{col}, {col})" for col in keep)
             cursor.execute(
-                """
-                INSERT OR REPLACE INTO processed_emails
-                (email_id, subject, onenote_page_id, processed_at, received_at)
-                VALUES (?, ?, ?, ?, ?)
+                f"""
+                INSERT INTO processed_emails
+                (email_id, subject, onenote_page_id, processed_at, received_at,
+                 content_hash, simhash, simhash_b0, simhash_b1, simhash_b2, simhash_b3,
+                 duplicate_of, link_to_original)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(email_id) DO UPDATE SET
+                    subject = excluded.subject,
+                    processed_at = excluded.processed_at,
+                    received_at = excluded.received_at,
+                    {merge}
                 """,
                 (
                     email_id,
@@ -119,10 +314,100 @@ class ProcessedTracker:
                     onenote_page_id,
                     datetime.utcnow().isoformat(),
                     received_at.isoformat(),
+                    content_hash,
+                    f"{simhash:016x}" if simhash is not None else None,
+                    *bands,
+                    duplicate_of,
+                    int(link_to_original),
                 ),
             )
+            if link_to_original and duplicate_of:
+                cursor.execute(
+                    """
+                    UPDATE processed_emails SET onenote_page_id = (
+                        SELECT onenote_page_id FROM processed_emails WHERE email_id = ?
+                    )
+                    WHERE email_id = ? AND onenote_page_id IS NULL
+                    """,
+                    (duplicate_of, email_id),
+                )
+            if onenote_page_id:
+                cursor.execute(
+                    """
+                    UPDATE processed_emails SET onenote_page_id = ?
+                    WHERE duplicate_of = ? AND link_to_original = 1
+                    """,
+                    (onenote_page_id, email_id),
+                )
+            # A processed email is no longer failing
+            cursor.execute("DELETE FROM email_failures WHERE email_id = ?", (email_id,))
             conn.commit()
 
+    def get_page_id(self, email_id: str) -> Optional[str]:
+        """Get the OneNote page a processed email was written to.
+
+        Args:
+            email_id: The email message ID.
+
+        Returns:
+            The page ID, or None if the email is unknown or not yet published.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT onenote_page_id FROM processed_emails WHERE email_id = ?",
+                (email_id,),
+            )
+            row = cursor.fetchone()
+            return row["onenote_page_id"] if row else None
+
+    def find_duplicate(
+        self,
+        content_hash: str,
+        simhash: Optional[int] = None,
+        max_distance: int = 0,
+    ) -> Optional[dict]:
+        """Find an earlier, non-duplicate note with the same content.
+
+        Args:
+            content_hash: Exact content fingerprint.
+            simhash: Near-duplicate fingerprint; enables fuzzy matching.
+            max_distance: Maximum differing SimHash bits (at most SIMHASH_BANDS - 1).
+
+        Returns:
+            The original's record (email_id, subject, onenote_page_id), or None.
+        """
+        with get_metrics().timer("note_summary_tracker_seconds", op="find_duplicate"), \
+                self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT email_id, subject, onenote_page_id FROM processed_emails
+                WHERE content_hash = ? AND duplicate_of IS NULL
+                ORDER BY processed_at LIMIT 1
+                """,
+                (content_hash,),
+            )
+            row = cursor.fetchone()
+            if row is not None or simhash is None:
+                return dict(row) if row else None
+
+            # Any hash within max_distance bits shares at least one band exactly
+            bands = simhash_bands(simhash)
+            where = " OR ".join(f"simhash_b{i} = ?" for i in range(SIMHASH_BANDS))
+            cursor.execute(
+                f"""
+                SELECT email_id, subject, onenote_page_id, simhash FROM processed_emails
+                WHERE ({where}) AND duplicate_of IS NULL
+                ORDER BY processed_at
+                """,
+                bands,
+            )
+            for candidate in cursor.fetchall():
+                if hamming_distance(int(candidate["simhash"], 16), simhash) <= max_distance:
+                    return {k: candidate[k] for k in ("email_id", "subject", "onenote_page_id")}
+            return None
+
     def get_processed_count(self) -> int:
         """Get the total number of processed emails.
 
@@ -156,3 +441,550 @@ class ProcessedTracker:
                 (limit,),
             )
             return [dict(row) for row in cursor.fetchall()]
+
+    def get_repeated_images(self, hashes: Iterable[str], min_count: int) -> Set[str]:
+        """Get image hashes already uploaded with at least min_count notes.
+
+        Args:
+            hashes: Candidate image content hashes.
+            min_count: Threshold; values below 1 disable the check.
+
+        Returns:
+            Hashes at or above the threshold.
+        """
+        hashes = list(hashes)
+        if min_count < 1 or not hashes:
+            return set()
+
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ",".join("?" * len(hashes))
+            cursor.execute(
+                f"SELECT sha256 FROM image_hashes "
+                f"WHERE seen_count >= ? AND sha256 IN ({placeholders})",
+                (min_count, *hashes),
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def record_images(self, hashes: Iterable[str]) -> None:
+        """Count one more note for each uploaded image hash.
+
+        Args:
+            hashes: Content hashes of images uploaded with a page.
+        """
+        now = datetime.utcnow().isoformat()
+        rows = [(h, now, now) for h in set(hashes)]
+        if not rows:
+            return
+
+        with self._get_connection() as conn:
+            conn.executemany(
+                """
+                INSERT INTO image_hashes (sha256, seen_count, first_seen_at, last_seen_at)
+                VALUES (?, 1, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET
+                    seen_count = seen_count + 1,
+                    last_seen_at = excluded.last_seen_at
+                """,
+                rows,
+            )
+            conn.commit()
+
+    def get_email_failure(self, email_id: str) -> Optional[dict]:
+        """Get the failure record of an email that could not be processed.
+
+        Args:
+            email_id: The email message ID.
+
+        Returns:
+            Dict with attempts, last_error, next_attempt_at and
+            dead_lettered_at (UTC ISO times), or None if it never failed.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT attempts, last_error, next_attempt_at, dead_lettered_at
+                FROM email_failures WHERE email_id = ?
+                """,
+                (email_id,),
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def record_email_failure(
+        self,
+        email_id: str,
+        subject: str,
+        received_at: datetime,
+        error: str,
+        max_attempts: int,
+    ) -> dict:
+        """Count a failed attempt to process an email.
+
+        The next attempt is scheduled with exponential backoff; once
+        max_attempts is reached the email becomes a dead letter instead.
+
+        Args:
+            email_id: The email message ID.
+            subject: Email subject.
+            received_at: When the email was received.
+            error: Why processing failed.
+            max_attempts: Attempts before the email is dead-lettered.
+
+        Returns:
+            The updated failure record (see get_email_failure).
+        """
+        with self._get_connection() as conn:
+            # Read and update under one write lock so concurrent workers
+            # never lose an attempt
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT attempts FROM email_failures WHERE email_id = ?", (email_id,)
+            ).fetchone()
+            attempts = (row["attempts"] if row else 0) + 1
+            now = datetime.utcnow()
+            next_attempt_at = dead_lettered_at = None
+            if attempts >= max_attempts:
+                dead_lettered_at = now.isoformat()
+            else:
+                next_attempt_at = (now + timedelta(seconds=retry_delay(attempts))).isoformat()
+            conn.execute(
+                """
+                INSERT INTO email_failures
+                (email_id, subject, received_at, attempts, last_error, next_attempt_at,
+                 dead_lettered_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(email_id) DO UPDATE SET
+                    attempts = excluded.attempts,
+                    last_error = excluded.last_error,
+                    next_attempt_at = excluded.next_attempt_at,
+                    dead_lettered_at = excluded.dead_lettered_at,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    email_id, subject, received_at.isoformat(), attempts, error,
+                    next_attempt_at, dead_lettered_at, now.isoformat(),
+                ),
+            )
+            conn.commit()
+        return {
+            "attempts": attempts,
+            "last_error": error,
+            "next_attempt_at": next_attempt_at,
+            "dead_lettered_at": dead_lettered_at,
+        }
+
+    def is_dead_letter(self, email_id: str) -> bool:
+        """Check if an email was given up on after too many failures."""
+        failure = self.get_email_failure(email_id)
+        return failure is not None and failure["dead_lettered_at"] is not None
+
+    def get_dead_letters(self) -> List[dict]:
+        """Dead-lettered emails, oldest first.
+
+        Returns:
+            Dicts with email_id, subject, received_at, attempts, last_error
+            and dead_lettered_at.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT email_id, subject, received_at, attempts, last_error, dead_lettered_at
+                FROM email_failures
+                WHERE dead_lettered_at IS NOT NULL
+                ORDER BY received_at
+                """
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def clear_email_failure(self, email_id: str) -> bool:
+        """Forget an email's failures, so the next run processes it again.
+
+        Returns:
+            True if the email had a failure record.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.execute("DELETE FROM email_failures WHERE email_id = ?", (email_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def get_conversation(self, conversation_id: str) -> Optional[dict]:
+        """Get the note a mail conversation is collected under.
+
+        Args:
+            conversation_id: Graph conversationId of the thread.
+
+        Returns:
+            Dict with email_id (the thread's first note), page_id (None until
+            that note is published) and message_count, or None for a new thread.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT c.email_id, p.onenote_page_id AS page_id, c.message_count
+                FROM conversations c
+                LEFT JOIN processed_emails p ON p.email_id = c.email_id
+                WHERE c.conversation_id = ?
+                """,
+                (conversation_id,),
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def record_conversation_message(self, conversation_id: str, email_id: str) -> None:
+        """Count a message of a conversation.
+
+        The first message recorded becomes the note the thread is collected
+        under; later ones only raise the count.
+
+        Args:
+            conversation_id: Graph conversationId of the thread.
+            email_id: The email message ID.
+        """
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO conversations (conversation_id, email_id, message_count, updated_at)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(conversation_id) DO UPDATE SET
+                    message_count = message_count + 1,
+                    updated_at = excluded.updated_at
+                """,
+                (conversation_id, email_id, datetime.utcnow().isoformat()),
+            )
+            conn.commit()
+
+    def get_group_page(self, group_key: str) -> Optional[dict]:
+        """Get the current page of an append-mode group.
+
+        Args:
+            group_key: Group key from note_group().
+
+        Returns:
+            Dict with page_id and note_count, or None if the group has no page yet.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT page_id, note_count FROM page_groups WHERE group_key = ?",
+                (group_key,),
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def record_group_note(self, group_key: str, page_id: str) -> None:
+        """Count a note added to a group page.
+
+        A different page_id than the cached one replaces it (a new page was
+        started) and restarts the count.
+
+        Args:
+            group_key: Group key from note_group().
+            page_id: Page the note was written to.
+        """
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO page_groups (group_key, page_id, note_count, updated_at)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(group_key) DO UPDATE SET
+                    note_count = CASE WHEN page_id = excluded.page_id
+                        THEN note_count + 1 ELSE 1 END,
+                    page_id = excluded.page_id,
+                    updated_at = excluded.updated_at
+                """,
+                (group_key, page_id, datetime.utcnow().isoformat()),
+            )
+            conn.commit()
+
+    def get_sink_location(self, email_id: str, sink: str) -> Optional[str]:
+        """Get where a sink published a note.
+
+        Args:
+            email_id: Email ID of the note.
+            sink: Sink name, e.g. "markdown".
+
+        Returns:
+            Sink-specific location, or None if the sink has not published it.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT location FROM sink_locations "
+                "WHERE email_id = ? AND sink = ? AND status = 'delivered'",
+                (email_id, sink),
+            )
+            row = cursor.fetchone()
+            return row["location"] if row else None
+
+    def record_sink_location(self, email_id: str, sink: str, location: str) -> None:
+        """Remember where a sink published a note.
+
+        Args:
+            email_id: Email ID of the note.
+            sink: Sink name.
+            location: Sink-specific location (OneNote page id, vault-relative path).
+        """
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO sink_locations (email_id, sink, location, updated_at, status)
+                VALUES (?, ?, ?, ?, 'delivered')
+                ON CONFLICT(email_id, sink) DO UPDATE SET
+                    location = excluded.location,
+                    updated_at = excluded.updated_at,
+                    status = 'delivered',
+                    last_error = NULL
+                """,
+                (email_id, sink, location, datetime.utcnow().isoformat()),
+            )
+            conn.commit()
+
+    def record_sink_failure(self, email_id: str, sink: str, error: str) -> None:
+        """Count a failed attempt to publish a note to a sink.
+
+        Args:
+            email_id: Email ID of the note.
+            sink: Sink name.
+            error: Error message of the attempt.
+        """
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO sink_locations
+                    (email_id, sink, location, updated_at, status, attempts, last_error)
+                VALUES (?, ?, '', ?, 'failed', 1, ?)
+                ON CONFLICT(email_id, sink) DO UPDATE SET
+                    updated_at = excluded.updated_at,
+                    status = 'failed',
+                    attempts = attempts + 1,
+                    last_error = excluded.last_error
+                """,
+                (email_id, sink, datetime.utcnow().isoformat(), error),
+            )
+            conn.commit()
+
+    def get_delivered(self, email_ids: Iterable[str], sink: str) -> Set[str]:
+        """Which of the given notes a sink already has.
+
+        Args:
+            email_ids: Email IDs to check.
+            sink: Sink name.
+
+        Returns:
+            The email IDs delivered to the sink.
+        """
+        email_ids = list(email_ids)
+        if not email_ids:
+            return set()
+
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ",".join("?" * len(email_ids))
+            cursor.execute(
+                f"SELECT email_id FROM sink_locations "
+                f"WHERE sink = ? AND status = 'delivered' AND email_id IN ({placeholders})",
+                (sink, *email_ids),
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def get_deliveries(self, email_id: str) -> List[dict]:
+        """Get a note's delivery state in every sink that has seen it.
+
+        Args:
+            email_id: Email ID of the note.
+
+        Returns:
+            List of dicts with sink, status, location, attempts and last_error.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT sink, status, location, attempts, last_error FROM sink_locations "
+                "WHERE email_id = ? ORDER BY sink",
+                (email_id,),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_sync_state(self, key: str) -> Optional[str]:
+        """Get a value saved with save_sync_state.
+
+        Args:
+            key: State name, e.g. "mail_delta:<folder id>".
+
+        Returns:
+            The saved value, or None.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            return row["value"] if row else None
+
+    def save_sync_state(self, key: str, value: Optional[str]) -> None:
+        """Save a value between runs; None removes it.
+
+        Args:
+            key: State name.
+            value: Value to keep.
+        """
+        with self._get_connection() as conn:
+            if value is None:
+                conn.execute("DELETE FROM sync_state WHERE key = ?", (key,))
+            else:
+                conn.execute(
+                    """
+                    INSERT INTO sync_state (key, value, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value,
+                        updated_at = excluded.updated_at
+                    """,
+                    (key, value, datetime.utcnow().isoformat()),
+                )
+            conn.commit()
+
+    def clear_sync_state(self, prefix: str) -> None:
+        """Remove every saved value whose key starts with prefix.
+
+        Args:
+            prefix: Key prefix, e.g. "mail_delta:".
+        """
+        with self._get_connection() as conn:
+            conn.execute(
+                "DELETE FROM sync_state WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+            conn.commit()
+
+    def get_backfill_checkpoint(self, run_key: str) -> Optional[dict]:
+        """Get the resume point of a backfill run.
+
+        Args:
+            run_key: Identifies the backfill date range.
+
+        Returns:
+            Dict with cursor (ISO datetime), emails, written, completed_at and
+            until_at (end of the range, or None), or None if the run has not
+            started.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT cursor, emails, written, completed_at, until_at
+                FROM backfill_checkpoints WHERE run_key = ?
+                """,
+                (run_key,),
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def save_backfill_checkpoint(
+        self,
+        run_key: str,
+        cursor: datetime,
+        emails: int,
+        written: int,
+        completed: bool = False,
+        until: Optional[datetime] = None,
+    ) -> None:
+        """Record that a backfill run has covered its range up to cursor.
+
+        Args:
+            run_key: Identifies the backfill date range.
+            cursor: Everything received before this time is done.
+            emails: Total emails seen so far in the run.
+            written: Total notes written so far in the run.
+            completed: Whether the whole range is done.
+            until: End of the range, for runs whose key does not fix it.
+        """
+        now = datetime.utcnow().isoformat()
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO backfill_checkpoints
+                    (run_key, cursor, emails, written, updated_at, completed_at, until_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    run_key, cursor.isoformat(), emails, written, now,
+                    now if completed else None, until.isoformat() if until else None,
+                ),
+            )
+            conn.commit()
+
+    def index_note(self, email_id: str, title: str, body_text: str) -> None:
+        """Add or replace a note in the full-text index.
+
+        Does nothing if SQLite lacks FTS5.
+
+        Args:
+            email_id: The email message ID.
+            title: Note title.
+            body_text: Plain text of the note body.
+        """
+        if not self._fts_enabled:
+            return
+
+        with get_metrics().timer("note_summary_tracker_seconds", op="index_note"), \
+                self._get_connection() as conn:
+            row = conn.execute(
+                "SELECT fts_rowid FROM notes_fts_rows WHERE email_id = ?", (email_id,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (row["fts_rowid"],))
+            cursor = conn.execute(
+                "INSERT INTO notes_fts (email_id, title, body) VALUES (?, ?, ?)",
+                (email_id, title, body_text),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO notes_fts_rows (email_id, fts_rowid) VALUES (?, ?)",
+                (email_id, cursor.lastrowid),
+            )
+            conn.commit()
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Search indexed notes, best matches first.
+
+        Every word in the query must appear in the title or body; title
+        matches rank higher than body matches.
+
+        Args:
+            query: Words to search for.
+            limit: Maximum number of results.
+
+        Returns:
+            List of dicts with email_id, title, snippet, rank, received_at
+            and onenote_page_id.
+
+        Raises:
+            RuntimeError: If SQLite was built without FTS5.
+        """
+        if not self._fts_enabled:
+            raise RuntimeError("Full-text search needs SQLite with the FTS5 extension")
+
+        terms = _SEARCH_TERM_RE.findall(query)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"' for term in terms)
+
+        with get_metrics().timer("note_summary_tracker_seconds", op="search"), \
+                self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT f.email_id, f.title,
+                       snippet(notes_fts, 2, '[', ']', '...', 12) AS snippet,
+                       bm25(notes_fts, 0.0, 10.0, 1.0) AS rank,
+                       p.received_at, p.onenote_page_id
+                FROM notes_fts f
+                LEFT JOIN processed_emails p ON p.email_id = f.email_id
+                WHERE notes_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (match, limit),
+            )
+            return [dict(row) for row in cursor.fetchall()]
@@ -1,11 +1,17 @@
 """Configuration management for Note Summary."""
 
+import hashlib
+import json
+import logging
 import os
-from dataclasses import dataclass
+import re
+import tempfile
+from dataclasses import MISSING, asdict, dataclass, field, fields, is_dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-import yaml
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -16,13 +22,41 @@ class AzureConfig:
     tenant_id: str
 
 
+# Lines that start a signature: the footers mail apps add on phones. The
+# RFC 3676 "-- " delimiter is recognised separately (see ReplyStripper),
+# as a bare "--" is as likely to be a rule inside the note.
+DEFAULT_SIGNATURE_PATTERNS = [
+    r"^Sent from my \w+",
+    r"^Get Outlook for (iOS|Android)",
+    r"^Sent from (Mail|Outlook) for ",
+]
+
+
 @dataclass
 class EmailConfig:
     """Email processing configuration."""
 
     subject_pattern: str = "[Note]"
+    # Several prefixes, e.g. ["[Note]", "[DCN]"]; overrides subject_pattern
+    subject_patterns: List[str] = field(default_factory=list)
     lookback_hours: int = 24
     mark_as_read: bool = True
+    # Mail folder that an inbox rule moves notes into; polling then reads
+    # only that folder. Empty searches the whole mailbox.
+    folder_name: str = ""
+    # Drop quoted replies below the new text. Off by default: the quoted
+    # part can be the note itself. Forwards are never stripped.
+    strip_quoted_replies: bool = False
+    # Regular expressions for lines that start a signature or disclaimer;
+    # the line and everything after it is dropped
+    signature_patterns: List[str] = field(
+        default_factory=lambda: list(DEFAULT_SIGNATURE_PATTERNS)
+    )
+
+    @property
+    def patterns(self) -> List[str]:
+        """Every subject prefix that marks a note."""
+        return self.subject_patterns or [self.subject_pattern]
 
 
 @dataclass
@@ -31,6 +65,100 @@ class OneNoteConfig:
 
     notebook_name: str = "Email Notes"
     section_name: str = "Captured Notes"
+    embed_inline_images: bool = True
+    max_image_bytes: int = 4 * 1024 * 1024
+    max_page_image_bytes: int = 20 * 1024 * 1024
+    skip_repeated_images_after: int = 3
+    # Subject pattern -> section for notes with that prefix; others go to
+    # section_name
+    sections_by_pattern: Dict[str, str] = field(default_factory=dict)
+
+
+DEDUP_POLICIES = ("off", "skip", "link", "append")
+
+
+@dataclass
+class DedupConfig:
+    """Duplicate note detection configuration."""
+
+    # off: disabled; skip: drop duplicates; link: point the duplicate email at
+    # the existing page; append: add a "received again" entry to that page
+    policy: str = "off"
+    near_duplicates: bool = False
+    max_distance: int = 3
+
+
+APPEND_GROUP_KEYS = ("title", "day", "tag")
+
+
+@dataclass
+class AppendConfig:
+    """Append-to-existing-page configuration."""
+
+    # Notes sharing all of these keys go onto one page; empty means one page
+    # per email. title: note title; day: received date (UTC); tag: leading
+    # [bracketed] subject tag, e.g. [Note:Deal]
+    group_by: List[str] = field(default_factory=list)
+    # Start a fresh page once a group page holds this many notes
+    max_notes_per_page: int = 50
+    # Collapse a reply thread onto the page of its first note, appending only
+    # the new (non-quoted) part of each reply
+    conversations: bool = False
+
+
+SINK_NAMES = ("onenote", "markdown")
+
+
+@dataclass
+class SinksConfig:
+    """Output sink selection."""
+
+    # Where notes are published: onenote, markdown (or both). Sinks are
+    # written concurrently and a sink that fails is retried on its own.
+    enabled: List[str] = field(default_factory=lambda: ["onenote"])
+
+
+@dataclass
+class MarkdownConfig:
+    """Markdown (Obsidian vault) sink configuration."""
+
+    # Vault or any directory; ~ is expanded and relative paths are taken
+    # from the config file's directory
+    vault_path: str = ""
+    # Folder inside the vault that notes are written to
+    folder: str = "Email Notes"
+    # Images go here, relative to folder
+    attachments_folder: str = "attachments"
+    # Subject pattern -> folder inside the vault for notes with that prefix;
+    # others go to folder
+    folders_by_pattern: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class RetryConfig:
+    """Retry and dead-letter configuration."""
+
+    # Failed emails and notes are retried with exponential backoff; after
+    # this many failed attempts they are set aside as dead letters
+    max_attempts: int = 8
+
+
+QUEUE_BACKENDS = ("sqlite",)
+
+
+@dataclass
+class QueueConfig:
+    """Job queue for ingesting mail with several worker processes."""
+
+    # Where queued emails are kept; sqlite is a table in the tracker database
+    backend: str = "sqlite"
+    # 1 ingests in the fetching process (no queue). N > 1 starts N worker
+    # processes per check; 0 only queues emails, for workers started with
+    # --worker (e.g. on other machines sharing the data directory)
+    workers: int = 1
+    # A worker that stops heartbeating for this long loses its emails to
+    # other workers
+    lease_seconds: int = 300
 
 
 @dataclass
@@ -40,13 +168,27 @@ class Config:
     azure: AzureConfig
     email: EmailConfig
     onenote: OneNoteConfig
+    dedup: DedupConfig = field(default_factory=DedupConfig)
+    append: AppendConfig = field(default_factory=AppendConfig)
+    sinks: SinksConfig = field(default_factory=SinksConfig)
+    markdown: MarkdownConfig = field(default_factory=MarkdownConfig)
+    retry: RetryConfig = field(default_factory=RetryConfig)
+    queue: QueueConfig = field(default_factory=QueueConfig)
+    source_path: Optional[Path] = field(default=None, compare=False, repr=False)
 
     @classmethod
-    def load(cls, config_path: Optional[Path] = None) -> "Config":
+    def load(
+        cls,
+        config_path: Optional[Path] = None,
+        snapshot_path: Optional[Path] = None,
+    ) -> "Config":
         """Load configuration from YAML file.
 
         Args:
             config_path: Path to config file. If None, searches default locations.
+            snapshot_path: If set, reuse a validated JSON snapshot stored here
+                while the config file content is unchanged, and refresh it
+                otherwise. Skips YAML parsing on warm starts.
 
         Returns:
             Loaded configuration.
@@ -58,10 +200,34 @@ class Config:
         if config_path is None:
             config_path = cls._find_config_file()
 
-        with open(config_path, "r") as f:
-            data = yaml.safe_load(f)
+        with open(config_path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if snapshot_path is not None:
+            cached = _read_snapshot(snapshot_path, config_path, digest)
+            if cached is not None:
+                config = cls._parse_config(cached)
+                config.source_path = config_path
+                return config
+
+        # Deferred: PyYAML costs more to import than the rest of startup
+        import yaml
+
+        data = yaml.safe_load(raw)
+        config = cls._parse_config(data)
+        config.source_path = config_path
+
+        if snapshot_path is not None:
+            _write_snapshot(snapshot_path, config_path, digest, config)
+
+        return config
 
-        return cls._parse_config(data)
+    def to_dict(self) -> dict:
+        """Serialize settings in the same shape as the YAML file."""
+        return {
+            f.name: asdict(getattr(self, f.name)) for f in fields(self) if f.name != "source_path"
+        }
 
     @classmethod
     def _find_config_file(cls) -> Path:
@@ -109,10 +275,19 @@ class Config:
 
         # Email config with defaults
         email_data = data.get("email", {})
+        patterns = list(email_data.get("subject_patterns", []))
+        # subject_pattern mirrors the first pattern for code that needs just one
+        subject_pattern = patterns[0] if patterns else email_data.get("subject_pattern", "[Note]")
         email = EmailConfig(
-            subject_pattern=email_data.get("subject_pattern", "[Note]"),
+            subject_pattern=subject_pattern,
+            subject_patterns=patterns,
             lookback_hours=email_data.get("lookback_hours", 24),
             mark_as_read=email_data.get("mark_as_read", True),
+            folder_name=email_data.get("folder_name", ""),
+            strip_quoted_replies=email_data.get("strip_quoted_replies", False),
+            signature_patterns=list(
+                email_data.get("signature_patterns", DEFAULT_SIGNATURE_PATTERNS)
+            ),
         )
 
         # OneNote config with defaults
@@ -120,14 +295,236 @@ class Config:
         onenote = OneNoteConfig(
             notebook_name=onenote_data.get("notebook_name", "Email Notes"),
             section_name=onenote_data.get("section_name", "Captured Notes"),
+            embed_inline_images=onenote_data.get("embed_inline_images", True),
+            max_image_bytes=onenote_data.get("max_image_bytes", 4 * 1024 * 1024),
+            max_page_image_bytes=onenote_data.get("max_page_image_bytes", 20 * 1024 * 1024),
+            skip_repeated_images_after=onenote_data.get("skip_repeated_images_after", 3),
+            sections_by_pattern=dict(onenote_data.get("sections_by_pattern", {})),
         )
+        if not all(email.patterns):
+            raise ValueError("email.subject_patterns entries must not be empty")
+        for pattern in email.signature_patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"email.signature_patterns: invalid pattern {pattern!r}: {e}")
+        if set(onenote.sections_by_pattern) - set(email.patterns):
+            raise ValueError("onenote.sections_by_pattern keys must be subject patterns")
+
+        # Duplicate detection with defaults
+        dedup_data = data.get("dedup", {})
+        policy = dedup_data.get("policy", "off")
+        dedup = DedupConfig(
+            # YAML reads an unquoted off as False
+            policy="off" if policy is False else policy,
+            near_duplicates=dedup_data.get("near_duplicates", False),
+            max_distance=dedup_data.get("max_distance", 3),
+        )
+        if dedup.policy not in DEDUP_POLICIES:
+            raise ValueError(f"dedup.policy must be one of {', '.join(DEDUP_POLICIES)}")
+        if not 0 <= dedup.max_distance <= 3:
+            raise ValueError("dedup.max_distance must be between 0 and 3")
+
+        # Append mode with defaults (off)
+        append_data = data.get("append", {})
+        append = AppendConfig(
+            group_by=list(append_data.get("group_by", [])),
+            max_notes_per_page=append_data.get("max_notes_per_page", 50),
+            conversations=append_data.get("conversations", False),
+        )
+        unknown = set(append.group_by) - set(APPEND_GROUP_KEYS)
+        if unknown:
+            raise ValueError(
+                f"append.group_by entries must be among {', '.join(APPEND_GROUP_KEYS)}"
+            )
+        if append.max_notes_per_page < 1:
+            raise ValueError("append.max_notes_per_page must be at least 1")
+
+        # Output sinks with defaults (OneNote only)
+        sinks_data = data.get("sinks", {})
+        sinks = SinksConfig(enabled=list(sinks_data.get("enabled", ["onenote"])))
+        if not sinks.enabled:
+            raise ValueError("sinks.enabled must list at least one sink")
+        if set(sinks.enabled) - set(SINK_NAMES) or len(set(sinks.enabled)) != len(sinks.enabled):
+            raise ValueError(
+                f"sinks.enabled entries must be distinct among {', '.join(SINK_NAMES)}"
+            )
+
+        markdown_data = data.get("markdown", {})
+        markdown = MarkdownConfig(
+            vault_path=markdown_data.get("vault_path", ""),
+            folder=markdown_data.get("folder", "Email Notes"),
+            attachments_folder=markdown_data.get("attachments_folder", "attachments"),
+            folders_by_pattern=dict(markdown_data.get("folders_by_pattern", {})),
+        )
+        if set(markdown.folders_by_pattern) - set(email.patterns):
+            raise ValueError("markdown.folders_by_pattern keys must be subject patterns")
+        if "markdown" in sinks.enabled and not markdown.vault_path:
+            raise ValueError("markdown.vault_path is required when the markdown sink is enabled")
+
+        retry_data = data.get("retry", {})
+        retry = RetryConfig(max_attempts=retry_data.get("max_attempts", 8))
+        if retry.max_attempts < 1:
+            raise ValueError("retry.max_attempts must be at least 1")
+
+        queue_data = data.get("queue", {})
+        queue = QueueConfig(
+            backend=queue_data.get("backend", "sqlite"),
+            workers=queue_data.get("workers", 1),
+            lease_seconds=queue_data.get("lease_seconds", 300),
+        )
+        if queue.backend not in QUEUE_BACKENDS:
+            raise ValueError(f"queue.backend must be one of: {', '.join(QUEUE_BACKENDS)}")
+        if queue.workers < 0:
+            raise ValueError("queue.workers must not be negative")
+        if queue.lease_seconds < 30:
+            raise ValueError("queue.lease_seconds must be at least 30")
+
+        return cls(
+            azure=azure,
+            email=email,
+            onenote=onenote,
+            dedup=dedup,
+            append=append,
+            sinks=sinks,
+            markdown=markdown,
+            retry=retry,
+            queue=queue,
+        )
+
+
+def _schema_fingerprint(cls: type) -> str:
+    """Describe a settings dataclass by its fields' names and defaults."""
+    parts = []
+    for f in fields(cls):
+        if is_dataclass(f.type):
+            parts.append(f"{f.name}({_schema_fingerprint(f.type)})")
+        elif f.default is not MISSING:
+            parts.append(f"{f.name}={f.default!r}")
+        elif f.default_factory is not MISSING:
+            parts.append(f"{f.name}={f.default_factory()!r}")
+        else:
+            parts.append(f.name)
+    return ",".join(parts)
+
+
+# Snapshots hold every setting with defaults filled in, so one written
+# before a setting or default changed is stale even if the file is not
+SNAPSHOT_VERSION = hashlib.sha256(_schema_fingerprint(Config).encode()).hexdigest()[:16]
+
+
+def _read_snapshot(snapshot_path: Path, config_path: Path, digest: str) -> Optional[dict]:
+    """Return cached settings if the snapshot matches the config file."""
+    try:
+        with open(snapshot_path, "r") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (
+        snapshot.get("version") != SNAPSHOT_VERSION
+        or snapshot.get("source") != str(Path(config_path).resolve())
+        or snapshot.get("sha256") != digest
+    ):
+        return None
+    return snapshot.get("config")
+
+
+def _write_snapshot(snapshot_path: Path, config_path: Path, digest: str, config: Config) -> None:
+    """Atomically store a validated config snapshot. Failures are non-fatal."""
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "source": str(Path(config_path).resolve()),
+        "sha256": digest,
+        "config": config.to_dict(),
+    }
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=snapshot_path.parent, prefix=".config-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, snapshot_path)
+    except OSError as e:
+        logger.debug("Could not write config snapshot: %s", e)
+
+
+class ConfigWatcher:
+    """Detect config file changes and swap in the new settings.
+
+    Every section except azure is hot-swapped: email, onenote, dedup,
+    append, sinks, markdown, retry and queue settings apply from the next
+    check. Azure settings are bound into the MSAL application and token
+    cache, so changes to them are reported and ignored until restart.
+    """
+
+    def __init__(self, config: Config, snapshot_path: Optional[Path] = None):
+        """Initialize the watcher.
+
+        Args:
+            config: Currently active configuration; must have source_path set.
+            snapshot_path: Snapshot location passed through to Config.load.
+        """
+        if config.source_path is None:
+            raise ValueError("Config has no source file to watch")
+
+        self._snapshot_path = snapshot_path
+        self._signature = self._stat(config.source_path)
+        self.current = config
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def poll(self) -> bool:
+        """Reload the config if the file changed since the last poll.
+
+        Invalid or unreadable files are logged and the current config kept.
+
+        Returns:
+            True if a new config was swapped in.
+        """
+        path = self.current.source_path
+        signature = self._stat(path)
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+
+        try:
+            new_config = Config.load(path, snapshot_path=self._snapshot_path)
+        except Exception as e:
+            logger.error("Ignoring invalid config change in %s: %s", path, e)
+            return False
+
+        if new_config.azure != self.current.azure:
+            logger.warning("Azure settings changed; restart to apply them")
+            new_config.azure = self.current.azure
+
+        if new_config == self.current:
+            return False
+
+        # Single reference assignment: readers see either the old or the new config
+        self.current = new_config
+        logger.info("Reloaded configuration from %s", path)
+        return True
+
+
+# Set by use_data_dir(), e.g. to keep a --replay run off the real state
+_data_dir_override: Optional[Path] = None
+
 
-        return cls(azure=azure, email=email, onenote=onenote)
+def use_data_dir(path: Optional[Path]) -> None:
+    """Send everything get_data_dir() locates to path (None restores the default)."""
+    global _data_dir_override
+    _data_dir_override = path
 
 
 def get_data_dir() -> Path:
     """Get the data directory for storing tokens and database."""
-    project_root = Path(__file__).parent.parent.parent
-    data_dir = project_root / "data"
-    data_dir.mkdir(exist_ok=True)
+    data_dir = _data_dir_override or Path(__file__).parent.parent.parent / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
     return data_dir
@@ -0,0 +1,129 @@
+"""Dry-run cost estimation: payload sizes, Graph calls and expected run time."""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from src.utils.progress import format_duration
+
+
+# Published Microsoft Graph limits per app per user. OneNote is the
+# bottleneck for page writes; Outlook limits apply to the mail calls.
+ONENOTE_REQUESTS_PER_MINUTE = 120
+ONENOTE_REQUESTS_PER_HOUR = 400
+ONENOTE_MAX_CONCURRENT = 5
+OUTLOOK_REQUESTS_PER_10_MINUTES = 10_000
+OUTLOOK_MAX_CONCURRENT = 4
+
+# Typical latencies used when nothing better is known
+TYPICAL_CALL_SECONDS = {
+    "create_page": 1.5,
+    "append_page": 1.0,
+    "attachments": 0.4,
+    "mark_as_read": 0.2,
+    "list": 0.5,
+}
+
+ONENOTE_CALLS = ("create_page", "append_page", "section")
+
+
+@dataclass
+class NoteCost:
+    """Cost of writing one note in a real run."""
+
+    email_id: str
+    title: str
+    action: str
+    payload_bytes: int = 0
+    cpu_seconds: float = 0.0
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def call_count(self) -> int:
+        """Total Graph calls for this note."""
+        return sum(self.calls.values())
+
+    def describe(self) -> str:
+        """Short per-note summary for logging."""
+        return (
+            f"{self.payload_bytes / 1024:.1f} KB, {self.call_count} Graph call(s), "
+            f"{self.cpu_seconds * 1000:.1f} ms CPU"
+        )
+
+
+class CostEstimate:
+    """Aggregate note costs for a dry run.
+
+    Thread-safe, so backfill workers can add to one estimate.
+    """
+
+    def __init__(self):
+        """Start an empty estimate."""
+        self._lock = threading.Lock()
+        self.notes: List[NoteCost] = []
+        self.calls: Counter = Counter()
+
+    def add_calls(self, kind: str, count: int = 1) -> None:
+        """Count calls made once per run (listing, section lookup)."""
+        with self._lock:
+            self.calls[kind] += count
+
+    def add(self, cost: NoteCost) -> None:
+        """Add one note's cost."""
+        with self._lock:
+            self.notes.append(cost)
+            self.calls.update(cost.calls)
+
+    @property
+    def payload_bytes(self) -> int:
+        """Total bytes that would be uploaded."""
+        return sum(n.payload_bytes for n in self.notes)
+
+    @property
+    def cpu_seconds(self) -> float:
+        """Total processor CPU time."""
+        return sum(n.cpu_seconds for n in self.notes)
+
+    def estimated_seconds(self, workers: int = 1) -> float:
+        """Estimate wall-clock time for a real run.
+
+        Takes the slower of latency-bound time (calls spread over the usable
+        concurrency) and the time the OneNote and Outlook rate limits allow.
+
+        Args:
+            workers: Concurrent page writers the real run would use.
+
+        Returns:
+            Estimated seconds.
+        """
+        onenote = sum(self.calls[k] for k in ONENOTE_CALLS)
+        outlook = sum(v for k, v in self.calls.items() if k not in ONENOTE_CALLS)
+
+        latency = sum(
+            count * TYPICAL_CALL_SECONDS.get(kind, 0.5) for kind, count in self.calls.items()
+        )
+        latency_bound = latency / max(1, min(workers, ONENOTE_MAX_CONCURRENT))
+
+        onenote_bound = onenote * 60 / ONENOTE_REQUESTS_PER_MINUTE
+        if onenote > ONENOTE_REQUESTS_PER_HOUR:
+            onenote_bound = max(onenote_bound, (onenote // ONENOTE_REQUESTS_PER_HOUR) * 3600)
+        outlook_bound = outlook * 600 / OUTLOOK_REQUESTS_PER_10_MINUTES
+
+        return max(latency_bound, onenote_bound, outlook_bound) + self.cpu_seconds
+
+    def summary_lines(self, workers: int = 1) -> List[str]:
+        """Aggregate report lines."""
+        actions = Counter(n.action for n in self.notes)
+        return [
+            f"Notes: {len(self.notes)} ("
+            + ", ".join(f"{count} {action}" for action, count in sorted(actions.items()))
+            + ")",
+            f"Payload: {self.payload_bytes / 1024:.1f} KB",
+            f"Graph calls: {sum(self.calls.values())} ("
+            + ", ".join(f"{kind} {count}" for kind, count in sorted(self.calls.items()))
+            + ")",
+            f"Processor CPU: {self.cpu_seconds * 1000:.1f} ms",
+            f"Estimated time with {workers} worker(s): "
+            f"{format_duration(self.estimated_seconds(workers))}",
+        ]
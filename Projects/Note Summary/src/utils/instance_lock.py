@@ -0,0 +1,285 @@
+"""Single-instance lock shared by scheduled runs, the daemon and backfills.
+
+The lock is a small JSON file in the data directory naming the process
+that holds it. The holder rewrites its heartbeat while it runs. A lock
+whose process has exited is stale and taken over by the next run. A live
+process on this machine keeps its lock however long its heartbeat has been
+quiet (e.g. while the machine slept); the heartbeat only decides for
+holders whose process cannot be checked (another host, or Windows).
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+LOCK_FILENAME = "note-summary.lock"
+# How often the holder rewrites its heartbeat, and how long without one
+# before the lock counts as abandoned
+HEARTBEAT_SECONDS = 30
+STALE_SECONDS = 120
+# Sent by a one-shot run to make a running daemon check mail now
+WAKE_SIGNAL = getattr(signal, "SIGUSR1", None)
+
+
+@dataclass
+class LockHolder:
+    """The process named in a lock file."""
+
+    pid: int
+    mode: str
+    host: str
+    started_at: str
+    heartbeat_at: str
+
+
+class InstanceLock:
+    """Advisory lock that keeps runs from working on the same mail at once.
+
+    The file is created with os.link from a fully written temporary file,
+    so it never exists half-written and two runs cannot both create it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "run",
+        stale_seconds: float = STALE_SECONDS,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the lock (not yet acquired).
+
+        Args:
+            path: Lock file path.
+            mode: What this process does ("run", "daemon", "backfill",
+                "sync"), recorded for whoever finds the lock held.
+            stale_seconds: Heartbeat age after which the lock is abandoned.
+            heartbeat_seconds: Seconds between heartbeats while held.
+            clock: Wall-clock time source (for testing).
+        """
+        self.path = Path(path)
+        self.mode = mode
+        self._stale_seconds = stale_seconds
+        self._heartbeat_seconds = heartbeat_seconds
+        self._clock = clock
+        self._holder: Optional[LockHolder] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def held(self) -> bool:
+        """Whether this process holds the lock."""
+        return self._holder is not None
+
+    def acquire(self) -> bool:
+        """Take the lock, recovering it from a stale holder.
+
+        Returns:
+            True if this process now holds the lock, False if another live
+            process does (see read_holder()).
+        """
+        now = self._timestamp()
+        holder = LockHolder(
+            pid=os.getpid(), mode=self.mode, host=socket.gethostname(),
+            started_at=now, heartbeat_at=now,
+        )
+        # One retry: the second attempt follows removing a stale lock
+        for _ in range(2):
+            if self._create(holder):
+                self._holder = holder
+                self._start_heartbeat()
+                return True
+            current = self.read_holder()
+            if not self.is_stale(current):
+                return False
+            if not self._remove_stale(current):
+                return False
+        return False
+
+    def release(self) -> None:
+        """Stop the heartbeat and delete the lock file if it is still ours."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._holder is not None and self._owns(self.read_holder()):
+            self.path.unlink(missing_ok=True)
+        self._holder = None
+
+    def __enter__(self) -> "InstanceLock":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def read_holder(self) -> Optional[LockHolder]:
+        """The process named in the lock file, or None if absent or unreadable."""
+        try:
+            return LockHolder(**json.loads(self.path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def is_stale(self, holder: Optional[LockHolder]) -> bool:
+        """Whether a lock file's holder has exited or stopped heartbeating.
+
+        A holder on this machine is stale exactly when its process has
+        exited. Others, and an unreadable lock file (by its modification
+        time), are stale once quiet for longer than stale_seconds.
+        """
+        if holder is None:
+            try:
+                age = self._clock() - self.path.stat().st_mtime
+            except FileNotFoundError:
+                return True
+            return age > self._stale_seconds
+        if holder.host == socket.gethostname():
+            alive = _pid_alive(holder.pid)
+            if alive is not None:
+                return not alive
+        try:
+            heartbeat = datetime.fromisoformat(holder.heartbeat_at).timestamp()
+        except ValueError:
+            return True
+        return self._clock() - heartbeat > self._stale_seconds
+
+    def heartbeat(self) -> bool:
+        """Rewrite the heartbeat.
+
+        Returns:
+            False if the lock was taken over (e.g. by a run on another host
+            after this one went quiet for longer than stale_seconds), in
+            which case it is no longer held and the holder should stop.
+        """
+        if self._holder is None:
+            return False
+        if not self._owns(self.read_holder()):
+            logger.error("Lost the instance lock at %s to another process", self.path)
+            self._holder = None
+            return False
+        self._holder.heartbeat_at = self._timestamp()
+        temp = self._temp_path()
+        temp.write_text(json.dumps(asdict(self._holder)), encoding="utf-8")
+        os.replace(temp, self.path)
+        return True
+
+    def _owns(self, holder: Optional[LockHolder]) -> bool:
+        return (
+            holder is not None
+            and self._holder is not None
+            and (holder.pid, holder.host, holder.started_at)
+            == (self._holder.pid, self._holder.host, self._holder.started_at)
+        )
+
+    def _create(self, holder: LockHolder) -> bool:
+        temp = self._temp_path()
+        temp.write_text(json.dumps(asdict(holder)), encoding="utf-8")
+        try:
+            os.link(temp, self.path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            temp.unlink(missing_ok=True)
+
+    def _remove_stale(self, stale: Optional[LockHolder]) -> bool:
+        """Move a stale lock aside; False if another run replaced it first."""
+        aside = self.path.with_name(f"{self.path.name}.stale-{os.getpid()}")
+        try:
+            os.replace(self.path, aside)
+        except FileNotFoundError:
+            return True
+        try:
+            moved = InstanceLock(aside).read_holder()
+            if moved != stale:
+                # Another run recovered the lock between our read and the
+                # move; put its fresh lock back
+                try:
+                    os.link(aside, self.path)
+                except FileExistsError:
+                    pass
+                return False
+        finally:
+            aside.unlink(missing_ok=True)
+        logger.warning(
+            "Recovered stale instance lock%s",
+            f" from pid {stale.pid} ({stale.mode})" if stale else "",
+        )
+        return True
+
+    def _start_heartbeat(self) -> None:
+        self._stop.clear()
+
+        def beat() -> None:
+            while not self._stop.wait(self._heartbeat_seconds):
+                try:
+                    if not self.heartbeat():
+                        return
+                except OSError as e:
+                    logger.warning("Failed to write instance lock heartbeat: %s", e)
+
+        self._thread = threading.Thread(target=beat, name="lock-heartbeat", daemon=True)
+        self._thread.start()
+
+    def _temp_path(self) -> Path:
+        return self.path.with_name(
+            f"{self.path.name}.{os.getpid()}-{threading.get_ident()}.tmp"
+        )
+
+    def _timestamp(self) -> str:
+        return datetime.fromtimestamp(self._clock(), timezone.utc).isoformat()
+
+
+def _pid_alive(pid: int) -> Optional[bool]:
+    """Whether a process exists on this machine, or None if that cannot be checked."""
+    if os.name == "nt":
+        # os.kill would terminate it; rely on the heartbeat instead
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def wake(holder: LockHolder) -> bool:
+    """Ask the process holding the lock to check mail now.
+
+    Returns:
+        True if the signal was delivered. Only daemons on this machine can
+        be woken, and only where the platform has SIGUSR1.
+    """
+    if WAKE_SIGNAL is None or holder.host != socket.gethostname():
+        return False
+    try:
+        os.kill(holder.pid, WAKE_SIGNAL)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+def handle_wake_signal(event: threading.Event) -> Callable[[], None]:
+    """Set event whenever another run sends the wake signal.
+
+    Signal handlers can only be installed from the main thread; elsewhere
+    (and where SIGUSR1 does not exist) this does nothing.
+
+    Returns:
+        A function restoring the previous handler.
+    """
+    if WAKE_SIGNAL is None or threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    previous = signal.signal(WAKE_SIGNAL, lambda signum, frame: event.set())
+    return lambda: signal.signal(WAKE_SIGNAL, previous)
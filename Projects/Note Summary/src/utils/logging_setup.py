@@ -0,0 +1,149 @@
+"""Logging configuration: text or JSON lines, emitted off the processing path.
+
+Records are handed to a QueueHandler and formatted/written by a
+QueueListener thread, so a slow stdout or log file never blocks
+processing. Context fields (correlation ID, email ID, stage) set with
+log_context() are attached to every record logged inside the block.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+
+LOG_FORMATS = ("text", "json")
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+TEXT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Fields callers may pass via extra= that the JSON formatter should emit
+STRUCTURED_FIELDS = ("correlation_id", "email_id", "stage", "duration_ms")
+
+_context: ContextVar[Dict[str, str]] = ContextVar("log_context", default={})
+_listener: Optional[logging.handlers.QueueListener] = None
+# Arguments of the last configure_logging() call
+_options: Dict[str, object] = {"verbose": False, "log_format": "text"}
+
+
+def new_correlation_id() -> str:
+    """Generate a short correlation ID for one unit of work."""
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def log_context(**fields: str) -> Iterator[None]:
+    """Attach fields to every record logged inside the block.
+
+    Args:
+        **fields: Context fields, e.g. correlation_id and email_id.
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the current log context onto each record.
+
+    Runs on the calling thread before the record is queued, so the
+    context is captured from the thread that did the work.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _PreparedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers message formatting to the listener thread.
+
+    The stock prepare() formats the message on the calling thread; here
+    the record is queued as-is so %-style arguments are only rendered by
+    the listener, and only for records that passed the level check.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(verbose: bool = False, log_format: str = "text") -> None:
+    """Configure root logging.
+
+    Args:
+        verbose: Enable DEBUG level.
+        log_format: "text" for human-readable lines, "json" for JSON lines.
+    """
+    global _listener
+
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format}")
+    _options.update(verbose=verbose, log_format=log_format)
+
+    stream_handler = logging.StreamHandler()
+    if log_format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT))
+
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _PreparedQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def logging_options() -> Dict[str, object]:
+    """Arguments to configure_logging() that set up a child process like this one."""
+    return dict(_options)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
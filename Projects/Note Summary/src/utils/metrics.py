@@ -0,0 +1,288 @@
+"""In-process metrics with Prometheus text export.
+
+Metrics are disabled by default. While disabled every recording call
+returns immediately, so instrumentation can stay in hot paths.
+"""
+
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Metric name -> (type, help text)
+METRICS = {
+    "note_summary_cycle_seconds": ("histogram", "Duration of a full process_emails cycle"),
+    "note_summary_stage_seconds": ("histogram", "Time spent in each processing stage"),
+    "note_summary_emails_total": ("counter", "Emails seen, by outcome"),
+    "note_summary_graph_requests_total": ("counter", "Graph API requests, by endpoint and status"),
+    "note_summary_graph_request_seconds": ("histogram", "Graph API request latency"),
+    "note_summary_graph_response_bytes": ("histogram", "Graph API response body size"),
+    "note_summary_graph_request_bytes": ("histogram", "Graph API request body size"),
+    "note_summary_token_requests_total": ("counter", "Token acquisitions, by result"),
+    "note_summary_token_seconds": ("histogram", "Time spent acquiring tokens"),
+    "note_summary_tracker_seconds": ("histogram", "Time spent in tracker operations"),
+    "note_summary_processor_cpu_seconds": ("histogram", "CPU time spent in EmailProcessor"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_ID_SEGMENT = re.compile(r"^\$?[A-Za-z]+$")
+
+
+def normalize_endpoint(path: str) -> str:
+    """Collapse resource IDs in a Graph URL path to keep label cardinality low.
+
+    Args:
+        path: URL path, e.g. /v1.0/me/messages/AAMk...
+
+    Returns:
+        Normalized path, e.g. /me/messages/{id}.
+    """
+    segments = [s for s in path.split("/") if s]
+    if segments and segments[0] in ("v1.0", "beta"):
+        segments = segments[1:]
+    return "/" + "/".join(s if _ID_SEGMENT.match(s) else "{id}" for s in segments)
+
+
+class _Histogram:
+    """Cumulative histogram for one label set."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters and histograms."""
+
+    def __init__(self, enabled: bool = False):
+        """Initialize the registry.
+
+        Args:
+            enabled: Whether recording calls have any effect.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def reset(self) -> None:
+        """Drop all recorded values."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Increment a counter."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        **labels: str,
+    ) -> None:
+        """Record a histogram observation."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels: str):
+        """Context manager observing elapsed seconds into a histogram."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name, labels)
+
+    def cpu_timer(self, name: str, **labels: str):
+        """Context manager observing the calling thread's CPU seconds."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name, labels, clock=time.thread_time)
+
+    @contextmanager
+    def _timer(
+        self, name: str, labels: Dict[str, str], clock: Callable[[], float] = time.perf_counter
+    ) -> Iterator[None]:
+        started = clock()
+        try:
+            yield
+        finally:
+            self.observe(name, clock() - started, **labels)
+
+    def histogram_sum(self, name: str, **labels: str) -> float:
+        """Total of all observations for a histogram, filtered by labels."""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(
+                h.sum
+                for key, h in self._histograms.get(name, {}).items()
+                if wanted.issubset(key)
+            )
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        """Total of a counter, filtered by labels."""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(
+                v for key, v in self._counters.get(name, {}).items() if wanted.issubset(key)
+            )
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                self._render_header(lines, name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                self._render_header(lines, name, "histogram")
+                for key, h in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        le = (("le", _format_value(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(key + le)} {cumulative}")
+                    inf = (("le", "+Inf"),)
+                    lines.append(f"{name}_bucket{_format_labels(key + inf)} {h.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(h.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_header(lines: List[str], name: str, kind: str) -> None:
+        _, help_text = METRICS.get(name, (kind, name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def write_prometheus(self, path: Path) -> None:
+        """Atomically write metrics to a Prometheus textfile-collector file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in key
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def instrument_session(session, registry: "MetricsRegistry") -> None:
+    """Record status, latency and size of every request made through a session.
+
+    Args:
+        session: requests session shared by the Graph services.
+        registry: Registry to record into.
+    """
+
+    def _on_response(response, *args, **kwargs):
+        if not registry.enabled:
+            return response
+        request = response.request
+        endpoint = normalize_endpoint(request.path_url.split("?", 1)[0])
+        labels = {"method": request.method, "endpoint": endpoint}
+        registry.inc(
+            "note_summary_graph_requests_total", status=str(response.status_code), **labels
+        )
+        registry.observe(
+            "note_summary_graph_request_seconds", response.elapsed.total_seconds(), **labels
+        )
+        if isinstance(request.body, (bytes, str)):
+            registry.observe(
+                "note_summary_graph_request_bytes", len(request.body), BYTES_BUCKETS, **labels
+            )
+        if not kwargs.get("stream"):
+            registry.observe(
+                "note_summary_graph_response_bytes", len(response.content), BYTES_BUCKETS, **labels
+            )
+        return response
+
+    session.hooks["response"].append(_on_response)
+
+
+def start_http_server(registry: "MetricsRegistry", port: int, host: str = "127.0.0.1"):
+    """Serve metrics at http://host:port/metrics from a background thread.
+
+    Returns:
+        The running ThreadingHTTPServer; call shutdown() to stop it.
+    """
+    # Imported here so one-shot runs never load http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            # Keep scrapes out of the application log
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
+
+
+# Process-wide registry used by the services and the CLI
+metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return metrics
@@ -0,0 +1,205 @@
+"""Profiling support for processing cycles.
+
+Runs a callable under cProfile and/or a lightweight stack sampler and
+writes a text report plus a collapsed-stack file that flamegraph tools
+(flamegraph.pl, speedscope, inferno) can load directly.
+"""
+
+import io
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple, TypeVar
+
+from src.utils.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+T = TypeVar("T")
+
+
+class StackSampler:
+    """Periodically sample one thread's stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """Initialize the sampler.
+
+        Args:
+            thread_id: Identifier of the thread to sample.
+            interval: Seconds between samples.
+        """
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples: Counter = Counter()
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Render samples in Brendan Gregg's collapsed-stack format."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def top_frames(self, limit: int = 25) -> Dict[str, int]:
+        """Leaf frames with the most samples."""
+        leaves: Counter = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return dict(leaves.most_common(limit))
+
+
+@dataclass
+class ProfileResult:
+    """Files and timings produced by a profiled run."""
+
+    report_path: Path
+    collapsed_path: Path
+    stats_path: Optional[Path]
+    wall_seconds: float
+    network_seconds: float
+    processor_cpu_seconds: float
+
+
+def profile_call(
+    func: Callable[[], T],
+    output_dir: Path,
+    mode: str = "cprofile",
+    interval: float = 0.005,
+) -> Tuple[T, ProfileResult]:
+    """Run a callable under the profiler and write its reports.
+
+    Metrics are enabled for the duration of the call so that Graph
+    request latency (network wait) and EmailProcessor CPU time can be
+    separated from the rest of the wall time.
+
+    Args:
+        func: Zero-argument callable, e.g. one processing cycle.
+        output_dir: Directory to write reports into.
+        mode: "cprofile" for deterministic profiling plus sampling, or
+            "sampling" for sampling only (lower overhead).
+        interval: Sampling interval in seconds.
+
+    Returns:
+        The callable's return value and the profile result.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    import cProfile
+
+    metrics = get_metrics()
+    was_enabled = metrics.enabled
+    metrics.enabled = True
+    network_before = metrics.histogram_sum("note_summary_graph_request_seconds")
+    cpu_before = metrics.histogram_sum("note_summary_processor_cpu_seconds")
+
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+    sampler = StackSampler(threading.get_ident(), interval=interval)
+
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        if profiler is not None:
+            result = profiler.runcall(func)
+        else:
+            result = func()
+    finally:
+        wall = time.perf_counter() - started
+        sampler.stop()
+        metrics.enabled = was_enabled
+
+    network = metrics.histogram_sum("note_summary_graph_request_seconds") - network_before
+    processor_cpu = metrics.histogram_sum("note_summary_processor_cpu_seconds") - cpu_before
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+
+    collapsed_path = output_dir / f"{stem}.collapsed"
+    collapsed_path.write_text(sampler.collapsed())
+
+    stats_path = None
+    if profiler is not None:
+        stats_path = output_dir / f"{stem}.prof"
+        profiler.dump_stats(str(stats_path))
+
+    report_path = output_dir / f"{stem}.txt"
+    report_path.write_text(
+        _render_report(mode, wall, network, processor_cpu, sampler, profiler)
+    )
+
+    return result, ProfileResult(
+        report_path=report_path,
+        collapsed_path=collapsed_path,
+        stats_path=stats_path,
+        wall_seconds=wall,
+        network_seconds=network,
+        processor_cpu_seconds=processor_cpu,
+    )
+
+
+def _render_report(
+    mode: str,
+    wall: float,
+    network: float,
+    processor_cpu: float,
+    sampler: StackSampler,
+    profiler: Optional["cProfile.Profile"],
+) -> str:
+    """Build the human-readable profile report."""
+    import pstats
+
+    other = max(wall - network - processor_cpu, 0.0)
+
+    def pct(value: float) -> str:
+        return f"{(value / wall * 100) if wall else 0.0:5.1f}%"
+
+    out = io.StringIO()
+    out.write(f"Note Summary profile ({mode})\n")
+    out.write("=" * 50 + "\n")
+    out.write(f"Wall time:               {wall:9.3f}s\n")
+    out.write(f"  Network wait (Graph):  {network:9.3f}s  {pct(network)}\n")
+    out.write(f"  EmailProcessor CPU:    {processor_cpu:9.3f}s  {pct(processor_cpu)}\n")
+    out.write(f"  Other:                 {other:9.3f}s  {pct(other)}\n")
+    out.write(f"Stack samples:           {sum(sampler.samples.values()):9d}\n\n")
+
+    out.write("Hottest frames (sampled)\n")
+    out.write("-" * 50 + "\n")
+    for frame, count in sampler.top_frames().items():
+        out.write(f"{count:8d}  {frame}\n")
+
+    if profiler is not None:
+        out.write("\ncProfile (top 40 by cumulative time)\n")
+        out.write("-" * 50 + "\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(40)
+
+    return out.getvalue()
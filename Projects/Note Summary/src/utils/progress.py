@@ -0,0 +1,73 @@
+"""Progress and ETA reporting for long-running jobs."""
+
+import time
+from datetime import datetime
+from typing import Optional
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as a short human-readable duration (e.g. "1h 05m")."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+class RangeProgress:
+    """Track progress through a date range walked in order.
+
+    The ETA assumes the remaining part of the range holds notes at the same
+    density as the part already covered in this run.
+    """
+
+    def __init__(self, start: datetime, end: datetime, resumed_at: Optional[datetime] = None):
+        """Start tracking.
+
+        Args:
+            start: Start of the whole range.
+            end: End of the whole range.
+            resumed_at: Position already covered by an earlier run, if resuming.
+        """
+        self._start = start
+        self._end = end
+        self._resumed_at = resumed_at or start
+        self._cursor = self._resumed_at
+        self._started = time.monotonic()
+        self.emails = 0
+        self.written = 0
+        self.failed = 0
+
+    def advance(self, cursor: datetime) -> None:
+        """Record that the range is covered up to cursor."""
+        self._cursor = cursor
+
+    @property
+    def fraction(self) -> float:
+        """Fraction of the whole range covered so far."""
+        total = (self._end - self._start).total_seconds()
+        if total <= 0:
+            return 1.0
+        return min(1.0, (self._cursor - self._start).total_seconds() / total)
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds remaining, or None before any of this run's range is covered."""
+        covered = (self._cursor - self._resumed_at).total_seconds()
+        remaining = (self._end - self._cursor).total_seconds()
+        if covered <= 0:
+            return None
+        return (time.monotonic() - self._started) * remaining / covered
+
+    def summary(self) -> str:
+        """One-line progress summary for logging."""
+        elapsed = time.monotonic() - self._started
+        rate = self.emails / elapsed if elapsed > 0 else 0.0
+        eta = self.eta_seconds()
+        return (
+            f"{self.fraction:.1%} of range (up to {self._cursor:%Y-%m-%d}), "
+            f"{self.emails} email(s), {self.written} written, {self.failed} failed, "
+            f"{rate:.1f}/s, ETA {format_duration(eta) if eta is not None else 'unknown'}"
+        )
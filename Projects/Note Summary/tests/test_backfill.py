@@ -0,0 +1,339 @@
+"""Tests for historical backfill: paging, batching, throttling and progress."""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+from src.main import run_backfill
+from src.processors.email_processor import EmailProcessor
+from src.services.cassette import CassetteWriter
+from src.services.email_service import Email, EmailService
+from src.services.http_session import close_session, create_session
+from src.services.multipart import MultipartPart, MultipartStream
+from src.storage.note_store import NoteStore
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils.config import Config, EmailConfig
+from src.utils.instance_lock import InstanceLock
+from src.utils.progress import RangeProgress, format_duration
+
+
+GRAPH = "https://graph.microsoft.com/v1.0"
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _response(method: str, url: str, payload: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps(payload).encode("utf-8")
+    response.request = requests.Request(method, url).prepare()
+    response.url = url
+    return response
+
+
+def _message(message_id: str) -> dict:
+    return {
+        "id": message_id,
+        "subject": f"[Note] {message_id}",
+        "body": {"content": "Hello", "contentType": "text"},
+        "receivedDateTime": "2026-01-02T10:30:00Z",
+        "from": {"emailAddress": {"address": "me@example.com"}},
+        "isRead": True,
+    }
+
+
+def _replay_service(temp_dir: Path, *responses: requests.Response) -> EmailService:
+    path = temp_dir / "backfill.jsonl.gz"
+    writer = CassetteWriter(path)
+    writer.record(_response("GET", f"{GRAPH}/me", {"mail": "me@example.com"}), elapsed=0)
+    for response in responses:
+        writer.record(response, elapsed=0)
+    writer.close()
+    session = create_session(replay_from=path, replay_speed="max")
+    return EmailService("token", EmailConfig(), session=session)
+
+
+class TestPagedFetch:
+    """Tests for EmailService.iter_note_emails()."""
+
+    def test_follows_next_link(self, temp_dir: Path):
+        """Test that every page of a range is fetched."""
+        service = _replay_service(
+            temp_dir,
+            _response("GET", f"{GRAPH}/me/messages", {
+                "value": [_message("a"), _message("b")],
+                "@odata.nextLink": f"{GRAPH}/me/messages?$skip=2",
+            }),
+            _response("GET", f"{GRAPH}/me/messages?$skip=2", {"value": [_message("c")]}),
+        )
+
+        pages = list(service.iter_note_emails(START, START + timedelta(days=7)))
+
+        assert [[e.id for e in page] for page in pages] == [["a", "b"], ["c"]]
+
+    def test_batched_attachments_are_cached(self, temp_dir: Path):
+        """Test that $batch calls serve later per-message lookups."""
+        inline = {
+            "id": "att", "isInline": True, "contentId": "<logo>", "contentBytes": "AAAA",
+            "contentType": "image/png", "size": 3,
+        }
+        service = _replay_service(
+            temp_dir,
+            _response("POST", f"{GRAPH}/$batch", {"responses": [
+                {"id": "0", "status": 200, "body": {"value": [
+                    {"id": "att", "isInline": True, "size": 3},
+                    {"id": "photo", "isInline": True, "size": 5_000_000},
+                ]}},
+                {"id": "1", "status": 429, "body": {}},
+            ]}),
+            _response("POST", f"{GRAPH}/$batch", {"responses": [
+                {"id": "0", "status": 200, "body": inline},
+            ]}),
+        )
+
+        assert service.prefetch_inline_attachments(["m1", "m2"], max_bytes=1024) == 1
+        assert [a.content_id for a in service.fetch_inline_attachments("m1")] == ["logo"]
+
+    def test_oversized_attachment_not_downloaded(
+        self, temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that only attachments within the size cap are fetched, in one $batch call."""
+        listing = f"{GRAPH}/me/messages/m1/attachments"
+        service = _replay_service(
+            temp_dir,
+            _response("GET", listing, {"value": [
+                {"id": "photo", "isInline": True, "size": 5_000_000},
+                {"id": "logo", "isInline": True, "size": 3},
+                {"id": "report", "isInline": False, "size": 3},
+            ]}),
+            _response("POST", f"{GRAPH}/$batch", {"responses": [
+                {"id": "0", "status": 200, "body": {
+                    "id": "logo", "isInline": True, "contentId": "<logo>",
+                    "contentBytes": "AAAA", "contentType": "image/png", "size": 3,
+                }},
+            ]}),
+        )
+
+        batches = []
+        post = service._session.post
+
+        def record_post(url, **kwargs):
+            batches.append([request["url"] for request in kwargs["json"]["requests"]])
+            return post(url, **kwargs)
+
+        monkeypatch.setattr(service._session, "post", record_post)
+
+        attachments = service.fetch_inline_attachments("m1", max_bytes=1024)
+
+        assert [a.content_id for a in attachments] == ["logo"]
+        assert batches == [["/me/messages/m1/attachments/logo"]]
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers the first POST with first_status, then echoes the body length."""
+
+    calls = 0
+    first_status = 429
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).calls += 1
+        if type(self).calls == 1:
+            self.send_response(self.first_status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps({"received": len(body)}).encode()
+        self.send_response(201)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestThrottling:
+    """Tests for Retry-After handling on the shared session."""
+
+    @pytest.fixture
+    def server_url(self):
+        _ThrottlingHandler.calls = 0
+        _ThrottlingHandler.first_status = 429
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottlingHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def test_throttled_upload_is_resent(self, server_url: str):
+        """Test that a 429 is retried with the full streamed body."""
+        stream = MultipartStream([MultipartPart("Presentation", "text/html", data=b"x" * 5000)])
+        session = create_session()
+
+        response = session.post(
+            f"{server_url}/pages", data=stream, headers={"Content-Type": stream.content_type}
+        )
+        close_session(session)
+
+        assert response.status_code == 201
+        assert response.json() == {"received": len(stream)}
+        assert _ThrottlingHandler.calls == 2
+
+    def test_gateway_timeout_not_resent(self, server_url: str):
+        """Test that a 504 POST is not repeated, as the page may already exist."""
+        _ThrottlingHandler.first_status = 504
+        session = create_session()
+
+        response = session.post(f"{server_url}/pages", data=b"x" * 10)
+        close_session(session)
+
+        assert response.status_code == 504
+        assert _ThrottlingHandler.calls == 1
+
+
+class TestProgress:
+    """Tests for range progress and ETA."""
+
+    def test_format_duration(self):
+        """Test duration formatting."""
+        assert format_duration(42) == "42s"
+        assert format_duration(125) == "2m 05s"
+        assert format_duration(3900) == "1h 05m"
+
+    def test_fraction_and_eta(self):
+        """Test progress through a range, including a resumed start."""
+        progress = RangeProgress(START, START + timedelta(days=10), START + timedelta(days=5))
+        assert progress.fraction == pytest.approx(0.5)
+        assert progress.eta_seconds() is None
+
+        progress.advance(START + timedelta(days=6))
+
+        assert progress.fraction == pytest.approx(0.6)
+        assert progress.eta_seconds() is not None
+
+
+class TestCheckpoints:
+    """Tests for backfill checkpoints in the tracker."""
+
+    def test_save_and_resume(self, temp_dir: Path):
+        """Test that checkpoints round-trip and record completion."""
+        tracker = ProcessedTracker(db_path=temp_dir / "test.db")
+        assert tracker.get_backfill_checkpoint("run") is None
+
+        tracker.save_backfill_checkpoint("run", START + timedelta(days=7), 12, 10)
+        checkpoint = tracker.get_backfill_checkpoint("run")
+        assert datetime.fromisoformat(checkpoint["cursor"]) == START + timedelta(days=7)
+        assert checkpoint["completed_at"] is None
+
+        tracker.save_backfill_checkpoint("run", START + timedelta(days=14), 20, 18, completed=True)
+        assert tracker.get_backfill_checkpoint("run")["completed_at"] is not None
+
+
+class TestRunBackfill:
+    """End-to-end tests for run_backfill() checkpoints."""
+
+    def test_open_ended_run_resumes(
+        self, temp_dir: Path, minimal_config_data: dict, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that an open-ended backfill resumes its own range and then completes."""
+        (temp_dir / "vault").mkdir()
+        config = Config._parse_config({
+            **minimal_config_data,
+            "sinks": {"enabled": ["markdown"]},
+            "markdown": {"vault_path": str(temp_dir / "vault")},
+        })
+        tracker = ProcessedTracker(db_path=temp_dir / "test.db")
+        store = NoteStore(temp_dir / "notes")
+        since = datetime.now(timezone.utc) - timedelta(days=20)
+        emails = {
+            message_id: Email.from_graph_response({
+                **_message(message_id),
+                "receivedDateTime": (since + timedelta(days=days)).isoformat(),
+            })
+            for message_id, days in (("a", 1), ("b", 9), ("c", 16))
+        }
+        listed = []
+
+        def iter_note_emails(self, start, end):
+            listed.append(start)
+            yield [e for e in emails.values() if start <= e.received_datetime < end]
+
+        monkeypatch.setattr(EmailService, "iter_note_emails", iter_note_emails)
+        process_email = EmailProcessor.process_email
+        broken = {"b"}
+
+        def flaky_process_email(self, email):
+            if email.id in broken:
+                raise ValueError("malformed HTML")
+            return process_email(self, email)
+
+        monkeypatch.setattr(EmailProcessor, "process_email", flaky_process_email)
+
+        def backfill() -> int:
+            return run_backfill(config, "token", since, tracker=tracker, store=store,
+                                chunk_days=7)
+
+        assert backfill() == 2
+        assert listed == [since, since + timedelta(days=7), since + timedelta(days=14)]
+        until = datetime.fromisoformat(
+            tracker.get_backfill_checkpoint(f"{since.isoformat()}/open")["until_at"]
+        )
+
+        # The checkpoint stayed at the failed chunk; the retry starts there
+        broken.clear()
+        tracker.clear_email_failure("b")
+        listed.clear()
+        assert backfill() == 1
+        assert listed == [since + timedelta(days=7), since + timedelta(days=14)]
+        checkpoint = tracker.get_backfill_checkpoint(f"{since.isoformat()}/open")
+        assert checkpoint["completed_at"] is not None
+        assert datetime.fromisoformat(checkpoint["until_at"]) == until
+
+        listed.clear()
+        assert backfill() == 0
+        assert listed == []
+
+    def test_stops_when_lock_taken_over(
+        self, temp_dir: Path, minimal_config_data: dict, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that a backfill whose instance lock was taken over stops between chunks."""
+        (temp_dir / "vault").mkdir()
+        config = Config._parse_config({
+            **minimal_config_data,
+            "sinks": {"enabled": ["markdown"]},
+            "markdown": {"vault_path": str(temp_dir / "vault")},
+        })
+        lock = InstanceLock(temp_dir / "app.lock", mode="backfill", heartbeat_seconds=3600)
+        assert lock.acquire()
+        listed = []
+
+        def iter_note_emails(self, start, end):
+            listed.append(start)
+            # Another instance takes the lock over during the first chunk
+            lock.path.write_text(json.dumps({
+                "pid": os.getpid() + 1, "mode": "run", "host": "other-host",
+                "started_at": "", "heartbeat_at": "",
+            }))
+            lock.heartbeat()
+            yield []
+
+        monkeypatch.setattr(EmailService, "iter_note_emails", iter_note_emails)
+        since = datetime.now(timezone.utc) - timedelta(days=20)
+
+        run_backfill(
+            config, "token", since, tracker=ProcessedTracker(db_path=temp_dir / "test.db"),
+            store=NoteStore(temp_dir / "notes"), chunk_days=7, lock=lock,
+        )
+
+        assert listed == [since]
+        lock.release()
@@ -0,0 +1,175 @@
+"""Tests for Graph traffic record/replay cassettes."""
+
+import gzip
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+import yaml
+
+from src.services.cassette import (
+    REDACTED_VALUE,
+    Cassette,
+    CassetteMissError,
+    CassetteWriter,
+    interaction_key,
+)
+from src.services.email_service import EmailService
+from src.services.http_session import close_session, create_session
+from src import main as main_module
+from src.main import main
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils import config as config_module
+from src.utils.config import EmailConfig, get_data_dir
+
+
+def _fake_response(method: str, url: str, status: int, payload: dict) -> requests.Response:
+    """Build a completed response as the recording adapter would see it."""
+    request = requests.Request(
+        method, url, headers={"Authorization": "Bearer secret-token"}
+    ).prepare()
+    response = requests.Response()
+    response.status_code = status
+    response.reason = "OK"
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps(payload).encode("utf-8")
+    response.request = request
+    response.url = url
+    return response
+
+
+@pytest.fixture
+def cassette_path(temp_dir: Path) -> Path:
+    """Record a small cassette covering a fetch cycle."""
+    path = temp_dir / "cycle.jsonl.gz"
+    writer = CassetteWriter(path)
+    writer.record(
+        _fake_response(
+            "GET", "https://graph.microsoft.com/v1.0/me", 200, {"mail": "me@example.com"}
+        ),
+        elapsed=0.25,
+    )
+    writer.record(
+        _fake_response(
+            "GET",
+            "https://graph.microsoft.com/v1.0/me/messages?$top=50",
+            200,
+            {
+                "value": [
+                    {
+                        "id": "msg-1",
+                        "subject": "[Note] Replayed",
+                        "body": {"content": "Hello", "contentType": "text"},
+                        "receivedDateTime": "2024-01-15T10:30:00Z",
+                        "from": {"emailAddress": {"address": "me@example.com"}},
+                        "isRead": False,
+                    }
+                ]
+            },
+        ),
+        elapsed=0.5,
+    )
+    writer.close()
+    return path
+
+
+class TestCassetteWriter:
+    """Tests for recording interactions."""
+
+    def test_tokens_are_redacted(self, cassette_path: Path):
+        """Test that Authorization headers never reach disk."""
+        with gzip.open(cassette_path, "rt") as f:
+            raw = f.read()
+
+        assert "secret-token" not in raw
+        assert REDACTED_VALUE in raw
+
+    def test_header_line_and_interactions(self, cassette_path: Path):
+        """Test that the file has a header followed by one line per interaction."""
+        with gzip.open(cassette_path, "rt") as f:
+            lines = [json.loads(line) for line in f]
+
+        assert lines[0]["version"] == 1
+        assert len(lines) == 3
+        assert lines[1]["elapsed"] == 0.25
+
+
+class TestCassetteReplay:
+    """Tests for serving interactions back."""
+
+    def test_interaction_key_ignores_query(self):
+        """Test that query strings do not affect matching."""
+        a = interaction_key("get", "https://graph.microsoft.com/v1.0/me/messages?$top=1")
+        b = interaction_key("GET", "https://graph.microsoft.com/v1.0/me/messages?$top=2")
+        assert a == b
+
+    def test_missing_interaction_raises(self, cassette_path: Path):
+        """Test that unrecorded requests fail loudly."""
+        cassette = Cassette.load(cassette_path)
+
+        with pytest.raises(CassetteMissError):
+            cassette.next_interaction("POST", "https://graph.microsoft.com/v1.0/me")
+
+    def test_interactions_consumed_in_order(self, cassette_path: Path):
+        """Test that each interaction is served once."""
+        cassette = Cassette.load(cassette_path)
+        assert cassette.remaining() == 2
+
+        cassette.next_interaction("GET", "https://graph.microsoft.com/v1.0/me")
+
+        assert cassette.remaining() == 1
+
+    def test_email_service_replays_offline(self, cassette_path: Path):
+        """Test that a service runs end-to-end against a cassette."""
+        session = create_session(replay_from=cassette_path, replay_speed="max")
+        service = EmailService("replay", EmailConfig(), session=session)
+
+        emails = service.fetch_note_emails()
+        close_session(session)
+
+        assert len(emails) == 1
+        assert emails[0].id == "msg-1"
+        assert emails[0].subject == "[Note] Replayed"
+
+    def test_record_and_replay_are_exclusive(self, cassette_path: Path, temp_dir: Path):
+        """Test that recording and replaying together is rejected."""
+        with pytest.raises(ValueError):
+            create_session(record_to=temp_dir / "out.jsonl.gz", replay_from=cassette_path)
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_cli_replay_leaves_real_state_alone(
+        self, cassette_path: Path, temp_dir: Path, monkeypatch: pytest.MonkeyPatch, workers: int
+    ):
+        """Test that --replay works in-process on a throwaway data directory and vault."""
+        real_data = temp_dir / "data"
+        real_vault = temp_dir / "vault"
+        real_vault.mkdir()
+        config_path = temp_dir / "config.yaml"
+        config_path.write_text(yaml.safe_dump({
+            "azure": {"client_id": "id", "tenant_id": "tenant"},
+            "email": {"mark_as_read": False},
+            "sinks": {"enabled": ["markdown"]},
+            "markdown": {"vault_path": str(real_vault)},
+            "queue": {"workers": workers},
+        }))
+        monkeypatch.setattr(config_module, "_data_dir_override", real_data)
+
+        def no_workers(config, count):
+            raise AssertionError("worker processes cannot replay the cassette")
+
+        monkeypatch.setattr(main_module, "_run_worker_processes", no_workers)
+        monkeypatch.setattr(
+            sys, "argv",
+            ["note-summary", "--config", str(config_path), "--replay", str(cassette_path)],
+        )
+
+        main()
+
+        replay_dir = get_data_dir()
+        assert replay_dir != real_data
+        assert list(real_vault.iterdir()) == []
+        assert not (real_data / "processed.db").exists()
+        assert ProcessedTracker(replay_dir / "processed.db").is_processed("msg-1")
+        assert list((replay_dir / "vault").rglob("*.md"))
@@ -0,0 +1,153 @@
+"""Tests for the circuit breaker and per-endpoint timeouts of the Graph session."""
+
+from typing import List
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from src.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from src.services.http_session import (
+    BREAKER_FAILURE_THRESHOLD,
+    DEFAULT_TIMEOUT,
+    GraphSession,
+    endpoint_timeout,
+)
+
+
+GRAPH = "https://graph.microsoft.com/v1.0"
+
+
+class FakeClock:
+    """Monotonic clock moved by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StatusAdapter(BaseAdapter):
+    """Answers every request with the next queued status code."""
+
+    def __init__(self, *statuses: int):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.timeouts: List[object] = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response.request = request
+        response.url = request.url
+        response._content = b"{}"
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker("onenote", failure_threshold=2, reset_seconds=60, clock=clock)
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker state changes."""
+
+    def test_opens_after_consecutive_failures(self, breaker: CircuitBreaker):
+        """Test that only consecutive failures open the circuit."""
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError, match="onenote circuit open"):
+            breaker.before_call()
+
+    def test_half_open_allows_one_probe(self, breaker: CircuitBreaker, clock: FakeClock):
+        """Test that after the reset time a single probe goes through."""
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now = 61
+
+        breaker.before_call()
+
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError, match="probe"):
+            breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        breaker.before_call()
+
+    def test_failed_probe_reopens(self, breaker: CircuitBreaker, clock: FakeClock):
+        """Test that a failing probe opens the circuit for another reset period."""
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now = 61
+        breaker.before_call()
+
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        clock.now = 100
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+
+class TestGraphSession:
+    """Tests for GraphSession."""
+
+    def test_endpoint_timeouts(self):
+        """Test that page writes get a longer timeout than lookups."""
+        pages = f"{GRAPH}/me/onenote/sections/s1/pages"
+
+        assert endpoint_timeout("POST", pages)[1] > DEFAULT_TIMEOUT[1]
+        assert endpoint_timeout("GET", pages) == DEFAULT_TIMEOUT
+        assert endpoint_timeout("GET", f"{GRAPH}/me/messages") == DEFAULT_TIMEOUT
+
+    def test_default_timeout_applied(self):
+        """Test that requests without a timeout get their endpoint's."""
+        session = GraphSession()
+        adapter = StatusAdapter(200, 200)
+        session.mount("https://", adapter)
+
+        session.get(f"{GRAPH}/me/messages")
+        session.get(f"{GRAPH}/me/messages", timeout=5)
+
+        assert adapter.timeouts == [DEFAULT_TIMEOUT, 5]
+
+    def test_server_failures_short_circuit_one_workload(self):
+        """Test that failing OneNote calls stop OneNote traffic but not mail."""
+        session = GraphSession()
+        adapter = StatusAdapter(*[503] * BREAKER_FAILURE_THRESHOLD, 200)
+        session.mount("https://", adapter)
+
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            assert session.post(f"{GRAPH}/me/onenote/sections/s1/pages").status_code == 503
+
+        with pytest.raises(CircuitOpenError):
+            session.post(f"{GRAPH}/me/onenote/sections/s1/pages")
+        assert session.get(f"{GRAPH}/me/messages").status_code == 200
+        assert len(adapter.timeouts) == BREAKER_FAILURE_THRESHOLD + 1
+
+    def test_client_errors_do_not_count(self):
+        """Test that 4xx answers (a bad request, not a bad service) keep it closed."""
+        session = GraphSession()
+        session.mount("https://", StatusAdapter(*[400] * (BREAKER_FAILURE_THRESHOLD + 1)))
+
+        for _ in range(BREAKER_FAILURE_THRESHOLD + 1):
+            session.post(f"{GRAPH}/me/onenote/sections/s1/pages")
+
+        assert session.breakers["onenote"].state == CLOSED
@@ -1,12 +1,22 @@
 """Tests for configuration loading and validation."""
 
+import json
 import os
+from dataclasses import dataclass
 from pathlib import Path
 
 import pytest
 import yaml
 
-from src.utils.config import AzureConfig, Config, EmailConfig, OneNoteConfig
+from src.utils.config import (
+    SNAPSHOT_VERSION,
+    AzureConfig,
+    Config,
+    ConfigWatcher,
+    EmailConfig,
+    OneNoteConfig,
+    _schema_fingerprint,
+)
 
 
 class TestConfigLoad:
@@ -147,6 +157,7 @@ class TestConfigParseConfig:
                 "subject_pattern": "[Task]",
                 "lookback_hours": 48,
                 "mark_as_read": False,
+                "folder_name": "Captured",
             },
         }
 
@@ -155,6 +166,7 @@ class TestConfigParseConfig:
         assert config.email.subject_pattern == "[Task]"
         assert config.email.lookback_hours == 48
         assert config.email.mark_as_read is False
+        assert config.email.folder_name == "Captured"
 
     def test_parse_custom_onenote_settings(self):
         """Test parsing custom OneNote configuration values."""
@@ -171,6 +183,93 @@ class TestConfigParseConfig:
         assert config.onenote.notebook_name == "My Notes"
         assert config.onenote.section_name == "Emails"
 
+    def test_parse_dedup_settings(self):
+        """Test parsing and validating the dedup section."""
+        base = {"azure": {"client_id": "id", "tenant_id": "tenant"}}
+
+        assert Config._parse_config(base).dedup.policy == "off"
+        # An unquoted YAML off
+        assert Config._parse_config({**base, "dedup": {"policy": False}}).dedup.policy == "off"
+
+        config = Config._parse_config({**base, "dedup": {"policy": "link", "near_duplicates": True}})
+        assert config.dedup.policy == "link"
+        assert config.dedup.near_duplicates is True
+
+        with pytest.raises(ValueError, match="dedup.policy"):
+            Config._parse_config({**base, "dedup": {"policy": "merge"}})
+
+    def test_parse_append_settings(self):
+        """Test parsing and validating the append section."""
+        base = {"azure": {"client_id": "id", "tenant_id": "tenant"}}
+
+        assert Config._parse_config(base).append.group_by == []
+
+        config = Config._parse_config({**base, "append": {"group_by": ["tag", "day"]}})
+        assert config.append.group_by == ["tag", "day"]
+
+        with pytest.raises(ValueError, match="append.group_by"):
+            Config._parse_config({**base, "append": {"group_by": ["sender"]}})
+
+    def test_parse_sink_settings(self):
+        """Test parsing and validating the sinks and markdown sections."""
+        base = {"azure": {"client_id": "id", "tenant_id": "tenant"}}
+
+        assert Config._parse_config(base).sinks.enabled == ["onenote"]
+
+        config = Config._parse_config({
+            **base,
+            "sinks": {"enabled": ["markdown"]},
+            "markdown": {"vault_path": "~/Vault"},
+        })
+        assert config.sinks.enabled == ["markdown"]
+        assert config.markdown.folder == "Email Notes"
+
+        with pytest.raises(ValueError, match="markdown.vault_path"):
+            Config._parse_config({**base, "sinks": {"enabled": ["markdown"]}})
+        with pytest.raises(ValueError, match="sinks.enabled"):
+            Config._parse_config({**base, "sinks": {"enabled": ["evernote"]}})
+        with pytest.raises(ValueError, match="sinks.enabled"):
+            Config._parse_config({**base, "sinks": {"enabled": []}})
+
+    def test_parse_subject_patterns(self):
+        """Test that subject_patterns overrides and mirrors subject_pattern."""
+        base = {"azure": {"client_id": "id", "tenant_id": "tenant"}}
+
+        assert Config._parse_config(base).email.patterns == ["[Note]"]
+
+        config = Config._parse_config({
+            **base,
+            "email": {"subject_patterns": ["[DCN]", "[Note]"]},
+            "onenote": {"sections_by_pattern": {"[DCN]": "Changes"}},
+        })
+        assert config.email.patterns == ["[DCN]", "[Note]"]
+        assert config.email.subject_pattern == "[DCN]"
+        assert config.onenote.sections_by_pattern == {"[DCN]": "Changes"}
+
+        with pytest.raises(ValueError, match="subject_patterns"):
+            Config._parse_config({**base, "email": {"subject_patterns": ["[A]", ""]}})
+        with pytest.raises(ValueError, match="signature_patterns"):
+            Config._parse_config({**base, "email": {"signature_patterns": ["(unclosed"]}})
+        with pytest.raises(ValueError, match="sections_by_pattern"):
+            Config._parse_config({**base, "onenote": {"sections_by_pattern": {"[X]": "S"}}})
+
+    def test_parse_queue(self):
+        """Test job queue settings and their validation."""
+        base = {"azure": {"client_id": "id", "tenant_id": "tenant"}}
+
+        assert Config._parse_config(base).queue.workers == 1
+
+        config = Config._parse_config({**base, "queue": {"workers": 4, "lease_seconds": 60}})
+        assert (config.queue.backend, config.queue.workers) == ("sqlite", 4)
+        assert config.queue.lease_seconds == 60
+
+        with pytest.raises(ValueError, match="queue.backend"):
+            Config._parse_config({**base, "queue": {"backend": "redis"}})
+        with pytest.raises(ValueError, match="queue.workers"):
+            Config._parse_config({**base, "queue": {"workers": -1}})
+        with pytest.raises(ValueError, match="queue.lease_seconds"):
+            Config._parse_config({**base, "queue": {"lease_seconds": 5}})
+
     def test_parse_none_data_raises_error(self):
         """Test that None data raises ValueError."""
         with pytest.raises(ValueError, match="Configuration is empty"):
@@ -180,3 +279,133 @@ class TestConfigParseConfig:
         """Test that empty dict raises ValueError."""
         with pytest.raises(ValueError, match="Configuration is empty"):
             Config._parse_config({})
+
+
+class TestConfigSnapshot:
+    """Tests for the compiled config snapshot."""
+
+    def test_snapshot_written_on_first_load(self, config_file: Path, temp_dir: Path):
+        """Test that loading with a snapshot path stores the validated config."""
+        snapshot = temp_dir / "config.snapshot.json"
+
+        Config.load(config_file, snapshot_path=snapshot)
+
+        assert snapshot.exists()
+
+    def test_snapshot_used_when_unchanged(self, config_file: Path, temp_dir: Path, monkeypatch):
+        """Test that a warm load does not parse YAML."""
+        snapshot = temp_dir / "config.snapshot.json"
+        first = Config.load(config_file, snapshot_path=snapshot)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("YAML should not be parsed")
+
+        monkeypatch.setattr(yaml, "safe_load", fail)
+        second = Config.load(config_file, snapshot_path=snapshot)
+
+        assert second == first
+        assert second.source_path == config_file
+
+    def test_snapshot_invalidated_on_change(self, config_file: Path, temp_dir: Path, valid_config_data: dict):
+        """Test that editing the config file bypasses a stale snapshot."""
+        snapshot = temp_dir / "config.snapshot.json"
+        Config.load(config_file, snapshot_path=snapshot)
+
+        valid_config_data["email"]["lookback_hours"] = 72
+        with open(config_file, "w") as f:
+            yaml.dump(valid_config_data, f)
+
+        config = Config.load(config_file, snapshot_path=snapshot)
+
+        assert config.email.lookback_hours == 72
+
+    def test_snapshot_from_older_schema_ignored(self, config_file: Path, temp_dir: Path):
+        """Test that a snapshot written before the settings changed is not used."""
+        snapshot = temp_dir / "config.snapshot.json"
+        Config.load(config_file, snapshot_path=snapshot)
+        stored = json.loads(snapshot.read_text())
+        stored["version"] = 1
+        stored["config"]["dedup"]["policy"] = "skip"
+        snapshot.write_text(json.dumps(stored))
+
+        config = Config.load(config_file, snapshot_path=snapshot)
+
+        assert config.dedup.policy == "off"
+        assert json.loads(snapshot.read_text())["version"] == SNAPSHOT_VERSION
+
+    def test_schema_version_follows_defaults(self):
+        """Test that the snapshot version changes with a field or its default."""
+
+        @dataclass
+        class Before:
+            policy: str = "skip"
+
+        @dataclass
+        class After:
+            policy: str = "off"
+
+        @dataclass
+        class Added:
+            policy: str = "skip"
+            workers: int = 0
+
+        assert _schema_fingerprint(Before) != _schema_fingerprint(After)
+        assert _schema_fingerprint(Before) != _schema_fingerprint(Added)
+
+
+class TestConfigWatcher:
+    """Tests for config hot reload."""
+
+    def _rewrite(self, path: Path, data: dict) -> None:
+        with open(path, "w") as f:
+            yaml.dump(data, f)
+        # Ensure the change is visible even on coarse mtime filesystems
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_no_change_returns_false(self, config_file: Path):
+        """Test that polling an unchanged file does nothing."""
+        watcher = ConfigWatcher(Config.load(config_file))
+
+        assert watcher.poll() is False
+
+    def test_swaps_email_settings(self, config_file: Path, valid_config_data: dict):
+        """Test that pattern changes are applied."""
+        watcher = ConfigWatcher(Config.load(config_file))
+
+        valid_config_data["email"]["subject_pattern"] = "[Task]"
+        self._rewrite(config_file, valid_config_data)
+
+        assert watcher.poll() is True
+        assert watcher.current.email.subject_pattern == "[Task]"
+
+    def test_swaps_non_azure_sections(self, config_file: Path, valid_config_data: dict):
+        """Test that sections beyond email and OneNote are hot-swapped too."""
+        watcher = ConfigWatcher(Config.load(config_file))
+
+        valid_config_data["queue"] = {"workers": 3}
+        valid_config_data["retry"] = {"max_attempts": 9}
+        self._rewrite(config_file, valid_config_data)
+
+        assert watcher.poll() is True
+        assert watcher.current.queue.workers == 3
+        assert watcher.current.retry.max_attempts == 9
+
+    def test_azure_changes_require_restart(self, config_file: Path, valid_config_data: dict):
+        """Test that Azure settings are not hot-swapped."""
+        watcher = ConfigWatcher(Config.load(config_file))
+
+        valid_config_data["azure"]["client_id"] = "other-client"
+        self._rewrite(config_file, valid_config_data)
+
+        assert watcher.poll() is False
+        assert watcher.current.azure.client_id == "test-client-id"
+
+    def test_invalid_change_keeps_current(self, config_file: Path):
+        """Test that a broken edit does not replace the running config."""
+        watcher = ConfigWatcher(Config.load(config_file))
+
+        self._rewrite(config_file, {"azure": {}})
+
+        assert watcher.poll() is False
+        assert watcher.current.azure.client_id == "test-client-id"
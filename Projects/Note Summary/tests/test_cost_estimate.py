@@ -0,0 +1,61 @@
+"""Tests for dry-run cost estimation."""
+
+import pytest
+
+from src.utils.cost_estimate import (
+    ONENOTE_REQUESTS_PER_HOUR,
+    CostEstimate,
+    NoteCost,
+)
+
+
+def _cost(action: str = "create_page", **calls) -> NoteCost:
+    return NoteCost(
+        email_id="id",
+        title="Title",
+        action=action,
+        payload_bytes=2048,
+        cpu_seconds=0.001,
+        calls={action: 1, **calls},
+    )
+
+
+class TestCostEstimate:
+    """Tests for CostEstimate aggregation."""
+
+    def test_aggregates_notes_and_calls(self):
+        """Test totals across notes and per-run calls."""
+        estimate = CostEstimate()
+        estimate.add_calls("list", 2)
+        estimate.add(_cost(mark_as_read=1))
+        estimate.add(_cost(attachments=1))
+
+        assert estimate.payload_bytes == 4096
+        assert estimate.cpu_seconds == pytest.approx(0.002)
+        assert estimate.calls == {
+            "list": 2, "create_page": 2, "mark_as_read": 1, "attachments": 1,
+        }
+        assert _cost(mark_as_read=1).call_count == 2
+
+    def test_more_workers_is_faster_until_throttled(self):
+        """Test that concurrency helps small runs but not rate-limited ones."""
+        small = CostEstimate()
+        for _ in range(10):
+            small.add(_cost())
+        assert small.estimated_seconds(workers=4) < small.estimated_seconds(workers=1)
+
+        large = CostEstimate()
+        for _ in range(ONENOTE_REQUESTS_PER_HOUR * 2):
+            large.add(_cost())
+        assert large.estimated_seconds(workers=8) >= 2 * 3600
+
+    def test_summary_lines(self):
+        """Test the aggregate report."""
+        estimate = CostEstimate()
+        estimate.add(_cost())
+        estimate.add(NoteCost(email_id="dup", title="Title", action="duplicate"))
+
+        lines = estimate.summary_lines(workers=2)
+
+        assert lines[0] == "Notes: 2 (1 create_page, 1 duplicate)"
+        assert lines[-1].startswith("Estimated time with 2 worker(s): ")
@@ -6,6 +6,7 @@ from datetime import datetime, timezone
 import pytest
 
 from src.processors.email_processor import EmailProcessor, ProcessedNote
+from src.processors.subject_matcher import SubjectMatcher
 from src.services.email_service import Email
 from src.utils.config import EmailConfig
 
@@ -76,6 +77,32 @@ class TestExtractTitle:
         assert processor.extract_title("[Task] Do Something") == "Do Something"
         assert processor.extract_title("[Note] Different Pattern") == "[Note] Different Pattern"
 
+    def test_extract_title_several_patterns(self):
+        """Test that the longest matching pattern is stripped."""
+        config = EmailConfig(subject_patterns=["[Note]", "[Note:Deal]", "[DCN]"])
+        processor = EmailProcessor(config)
+
+        assert processor.extract_title("[dcn] Change 7") == "Change 7"
+        assert processor.extract_title("[Note:Deal] Acme") == "Acme"
+        assert processor.extract_title("[Note] Plain") == "Plain"
+
+
+class TestSubjectMatcher:
+    """Tests for SubjectMatcher."""
+
+    def test_match_returns_longest_pattern(self):
+        """Test that overlapping prefixes resolve to the longest one."""
+        matcher = SubjectMatcher(["[Note]", "[Note:Deal]", "[DCN]"])
+
+        assert matcher.match("[note:deal] Acme") == "[Note:Deal]"
+        assert matcher.match("[NOTE] x") == "[Note]"
+        assert matcher.match("[Note:Other] x") is None
+        assert matcher.match("Re: [Note] x") is None
+
+    def test_duplicates_and_empty_patterns_ignored(self):
+        """Test that the configured pattern list is cleaned up."""
+        assert SubjectMatcher(["[A]", "", "[A]", "[B]"]).patterns == ["[A]", "[B]"]
+
 
 class TestCleanHtmlContent:
     """Tests for EmailProcessor.clean_html_content() method."""
@@ -209,3 +236,107 @@ class TestProcessEmail:
 
         assert "<p>Formatted <strong>content</strong></p>" in result.html_content
         assert result.title == "HTML Email"
+
+    def test_process_email_strips_quoted_reply(self, email_config: EmailConfig):
+        """Test that quoted history is dropped and counted when enabled."""
+        email_config.strip_quoted_replies = True
+        processor = EmailProcessor(email_config)
+        email = Email(
+            id="reply-email",
+            subject="[Note] Reply",
+            body_content='<div>New text</div><div class="gmail_quote">Old thread</div>',
+            body_content_type="html",
+            received_datetime=datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc),
+            sender_email="test@example.com",
+            is_read=False,
+        )
+
+        result = processor.process_email(email)
+
+        assert "New text" in result.html_content
+        assert "Old thread" not in result.html_content
+        assert result.stripped_bytes == len('<div class="gmail_quote">Old thread</div>')
+
+    def test_process_email_keeps_quotes_by_default(self, processor: EmailProcessor):
+        """Test that quote stripping is opt-in."""
+        email = Email(
+            id="reply-email",
+            subject="[Note] Reply",
+            body_content='<div>New text</div><div class="gmail_quote">Old thread</div>',
+            body_content_type="html",
+            received_datetime=datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc),
+            sender_email="test@example.com",
+            is_read=False,
+        )
+
+        result = processor.process_email(email)
+
+        assert "Old thread" in result.html_content
+        assert result.stripped_bytes == 0
+
+    def test_process_email_mobile_reply_keeps_quote(self, processor: EmailProcessor):
+        """Test that by default a mobile signature goes but the quoted reply stays."""
+        email = Email(
+            id="reply-email",
+            subject="[Note] Reply",
+            body_content=(
+                "<div>See below</div><div><br></div><div>Sent from my iPhone</div>"
+                "<div>On Mon, 19 Oct 2026, Jane wrote:</div>"
+                '<blockquote type="cite"><div>Old thread</div></blockquote>'
+            ),
+            body_content_type="html",
+            received_datetime=datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc),
+            sender_email="test@example.com",
+            is_read=False,
+        )
+
+        result = processor.process_email(email)
+
+        assert "See below" in result.html_content
+        assert "Old thread" in result.html_content
+        assert "Sent from my iPhone" not in result.html_content
+
+    def test_process_email_forward_keeps_signature(self, processor: EmailProcessor):
+        """Test that by default a forward keeps everything, signatures included."""
+        email = Email(
+            id="forward-email",
+            subject="[Note] FW: Contract",
+            body_content=(
+                '<div>Keep this</div><div id="divRplyFwdMsg"><b>From:</b> Jane</div>'
+                "<div>Terms below</div><div>Sent from my iPhone</div>"
+                "<div>The contract terms</div>"
+            ),
+            body_content_type="html",
+            received_datetime=datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc),
+            sender_email="test@example.com",
+            is_read=False,
+        )
+
+        result = processor.process_email(email)
+
+        assert "Sent from my iPhone" in result.html_content
+        assert "The contract terms" in result.html_content
+        assert result.stripped_bytes == 0
+
+    @pytest.mark.parametrize("subject", ["[Note] FW: Contract", "Fwd: [Note] Contract"])
+    def test_process_email_keeps_forwarded_note(self, email_config: EmailConfig, subject: str):
+        """Test that a forward keeps the forwarded message, which is the note."""
+        email_config.strip_quoted_replies = True
+        processor = EmailProcessor(email_config)
+        email = Email(
+            id="forward-email",
+            subject=subject,
+            body_content=(
+                '<div>Keep this</div><div id="divRplyFwdMsg"><b>From:</b> Jane</div>'
+                "<div>The contract terms</div>"
+            ),
+            body_content_type="html",
+            received_datetime=datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc),
+            sender_email="test@example.com",
+            is_read=False,
+        )
+
+        result = processor.process_email(email)
+
+        assert "The contract terms" in result.html_content
+        assert result.stripped_bytes == 0
@@ -0,0 +1,190 @@
+"""Tests for folder-scoped polling in EmailService."""
+
+import json
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import pytest
+import requests
+
+from src.main import _fetch_folder_emails, _folder_key
+from src.services.email_service import (
+    GRAPH_BASE_URL,
+    NOTE_RULE_NAME,
+    EmailService,
+    MailFolderNotFound,
+)
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils.config import Config, EmailConfig
+
+
+RULES_URL = f"{GRAPH_BASE_URL}/me/mailFolders/inbox/messageRules"
+DELTA_URL = f"{GRAPH_BASE_URL}/me/mailFolders/f1/messages/delta"
+
+
+def _response(status: int, payload: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(payload).encode("utf-8")
+    return response
+
+
+def _message(message_id: str, subject: str) -> dict:
+    return {
+        "id": message_id,
+        "subject": subject,
+        "body": {"content": "Hello", "contentType": "text"},
+        "receivedDateTime": "2026-10-19T09:00:00Z",
+        "from": {"emailAddress": {"address": "me@example.com"}},
+        "isRead": False,
+    }
+
+
+class FakeSession:
+    """Replays queued responses in order and records the requests made."""
+
+    def __init__(self, *responses: Tuple[int, dict]):
+        self.responses = list(responses)
+        self.calls: List[Tuple[str, str, Optional[dict]]] = []
+
+    def _next(self, method: str, url: str, body: Optional[dict]) -> requests.Response:
+        self.calls.append((method, url, body))
+        status, payload = self.responses.pop(0)
+        return _response(status, payload)
+
+    def get(self, url, headers=None, params=None):
+        return self._next("GET", url, params)
+
+    def post(self, url, headers=None, json=None):
+        return self._next("POST", url, json)
+
+    def patch(self, url, headers=None, json=None):
+        return self._next("PATCH", url, json)
+
+
+def _service(session: FakeSession) -> EmailService:
+    service = EmailService("token", EmailConfig(folder_name="Notes"), session=session)
+    service._user_email = "me@example.com"
+    return service
+
+
+class TestNoteFolder:
+    """Tests for provisioning the folder and inbox rule."""
+
+    def test_existing_folder_is_reused(self):
+        """Test that a folder with the name is found, not created."""
+        session = FakeSession((200, {"value": [{"id": "f1", "displayName": "Notes"}]}))
+
+        assert _service(session).ensure_note_folder("Notes") == "f1"
+        assert [c[0] for c in session.calls] == ["GET"]
+
+    def test_missing_folder_is_created(self):
+        """Test that the folder is created when the lookup finds nothing."""
+        session = FakeSession((200, {"value": []}), (201, {"id": "f2"}))
+
+        assert _service(session).ensure_note_folder("Notes") == "f2"
+        assert session.calls[1] == ("POST", f"{GRAPH_BASE_URL}/me/mailFolders",
+                                    {"displayName": "Notes"})
+
+    def test_rule_created_with_conditions(self):
+        """Test that the rule moves self-sent notes to the folder."""
+        session = FakeSession((200, {"value": []}), (201, {"id": "r1"}))
+
+        assert _service(session).ensure_note_rule("f1") == "r1"
+
+        method, url, rule = session.calls[1]
+        assert (method, url) == ("POST", RULES_URL)
+        assert rule["conditions"]["subjectContains"] == ["[Note]"]
+        assert rule["conditions"]["fromAddresses"][0]["emailAddress"]["address"] == (
+            "me@example.com"
+        )
+        assert rule["actions"]["moveToFolder"] == "f1"
+
+    def test_stale_rule_is_updated(self):
+        """Test that an existing rule pointing elsewhere is patched, not duplicated."""
+        session = FakeSession(
+            (200, {"value": [{
+                "id": "r1", "displayName": NOTE_RULE_NAME, "isEnabled": True,
+                "conditions": {"subjectContains": ["[Note]"]},
+                "actions": {"moveToFolder": "old"},
+            }]}),
+            (200, {"id": "r1"}),
+        )
+
+        assert _service(session).ensure_note_rule("f1") == "r1"
+        assert session.calls[1][:2] == ("PATCH", f"{RULES_URL}/r1")
+
+
+class TestNoteFilter:
+    """Tests for the server-side note filter."""
+
+    def test_patterns_are_ored_in_one_filter(self):
+        """Test that every pattern is pushed to Graph in a single query."""
+        service = EmailService(
+            "token", EmailConfig(subject_patterns=["[Note]", "[Bob's]"]), session=FakeSession()
+        )
+        service._user_email = "me@example.com"
+
+        query = service._note_filter(datetime(2026, 10, 19, tzinfo=timezone.utc))
+
+        assert (
+            "and (startsWith(subject, '[Note]') or startsWith(subject, '[Bob''s]')) "
+            "and from/emailAddress/address eq 'me@example.com'"
+        ) in query
+
+
+class TestFolderDelta:
+    """Tests for EmailService.fetch_folder_emails()."""
+
+    def test_pages_until_delta_link(self):
+        """Test that pages are followed and only matching, present messages return."""
+        session = FakeSession(
+            (200, {
+                "value": [_message("a", "[Note] one"), _message("b", "Lunch?")],
+                "@odata.nextLink": f"{DELTA_URL}?$skiptoken=1",
+            }),
+            (200, {
+                "value": [{"id": "c", "@removed": {"reason": "deleted"}},
+                          _message("d", "[note] two")],
+                "@odata.deltaLink": f"{DELTA_URL}?$deltatoken=2",
+            }),
+        )
+
+        emails, delta_link = _service(session).fetch_folder_emails("f1")
+
+        assert [e.id for e in emails] == ["a", "d"]
+        assert delta_link == f"{DELTA_URL}?$deltatoken=2"
+        assert "receivedDateTime ge" in session.calls[0][2]["$filter"]
+
+    def test_expired_delta_link_lists_again(self, temp_dir):
+        """Test that an expired delta link is dropped and the folder re-listed."""
+        tracker = ProcessedTracker(db_path=temp_dir / "test.db")
+        tracker.save_sync_state("mail_delta:f1", f"{DELTA_URL}?$deltatoken=old")
+        session = FakeSession(
+            (410, {"error": {"code": "SyncStateNotFound"}}),
+            (200, {"value": [], "@odata.deltaLink": f"{DELTA_URL}?$deltatoken=new"}),
+        )
+        config = Config._parse_config({"azure": {"client_id": "id", "tenant_id": "t"}})
+
+        emails, delta_link = _fetch_folder_emails(
+            config, _service(session), tracker, "f1", "mail_delta:f1"
+        )
+
+        assert emails == []
+        assert delta_link.endswith("deltatoken=new")
+        assert session.calls[1][1] == DELTA_URL
+
+    def test_missing_folder_is_provisioned_again(self, temp_dir):
+        """Test that a deleted folder clears the cached folder ID."""
+        tracker = ProcessedTracker(db_path=temp_dir / "test.db")
+        config = Config._parse_config({
+            "azure": {"client_id": "id", "tenant_id": "t"},
+            "email": {"folder_name": "Notes"},
+        })
+        tracker.save_sync_state(_folder_key(config), "f1")
+        session = FakeSession((404, {"error": {"code": "ErrorItemNotFound"}}))
+
+        with pytest.raises(MailFolderNotFound):
+            _fetch_folder_emails(config, _service(session), tracker, "f1", "mail_delta:f1")
+
+        assert tracker.get_sync_state(_folder_key(config)) is None
@@ -0,0 +1,57 @@
+"""Tests for content fingerprints."""
+
+from src.processors.fingerprint import (
+    MAX_SIMHASH_DISTANCE,
+    content_fingerprint,
+    hamming_distance,
+    html_to_text,
+    simhash,
+    simhash_bands,
+)
+
+
+class TestContentFingerprint:
+    """Tests for exact-match fingerprints."""
+
+    def test_ignores_case_and_whitespace(self):
+        """Test that formatting differences do not change the fingerprint."""
+        a = content_fingerprint("Meeting Notes", "Discuss  the\nbudget")
+        b = content_fingerprint("meeting notes", "discuss the budget ")
+
+        assert a == b
+
+    def test_different_content_differs(self):
+        """Test that different bodies produce different fingerprints."""
+        assert content_fingerprint("T", "one") != content_fingerprint("T", "two")
+
+    def test_html_to_text(self):
+        """Test tag and entity stripping."""
+        assert html_to_text("<p>Fish &amp; chips</p>\n<br/><b>today</b>") == "Fish & chips today"
+
+
+class TestSimhash:
+    """Tests for near-duplicate fingerprints."""
+
+    TEXT = (
+        "Quarterly planning notes: review the hiring plan, confirm the budget "
+        "for the new office, and agree on the launch date for the mobile app."
+    )
+
+    def test_identical_text_identical_hash(self):
+        """Test that SimHash is deterministic."""
+        assert simhash(self.TEXT) == simhash(self.TEXT.upper())
+
+    def test_small_edit_is_close(self):
+        """Test that a one-word change moves the hash only a few bits."""
+        edited = self.TEXT.replace("mobile", "iOS")
+
+        assert hamming_distance(simhash(self.TEXT), simhash(edited)) < 16
+
+    def test_bands_share_one_when_within_distance(self):
+        """Test the pigeonhole property the band index relies on."""
+        value = simhash(self.TEXT)
+        flipped = value ^ 0b1011  # Three bits, all in the lowest band
+
+        assert hamming_distance(value, flipped) == MAX_SIMHASH_DISTANCE
+        shared = sum(a == b for a, b in zip(simhash_bands(value), simhash_bands(flipped)))
+        assert shared >= 1
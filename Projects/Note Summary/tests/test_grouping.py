@@ -0,0 +1,48 @@
+"""Tests for append-mode note grouping."""
+
+from datetime import datetime, timezone
+
+from src.processors.email_processor import ProcessedNote
+from src.processors.grouping import entry_html, note_group, subject_tag
+
+
+def _note(title: str, day: int = 19) -> ProcessedNote:
+    return ProcessedNote(
+        email_id="id",
+        title=title,
+        html_content="<p>body</p>",
+        received_datetime=datetime(2026, 10, day, 9, 30, tzinfo=timezone.utc),
+    )
+
+
+class TestNoteGroup:
+    """Tests for note_group()."""
+
+    def test_off_without_keys(self):
+        """Test that an empty rule disables grouping."""
+        assert note_group("[Note] Standup", _note("Standup"), []) is None
+
+    def test_subject_tag(self):
+        """Test leading tag extraction."""
+        assert subject_tag("[Note:Deal] Acme renewal") == "Note:Deal"
+        assert subject_tag("Acme [Deal]") == ""
+
+    def test_same_tag_and_day_share_group(self):
+        """Test that notes matching every key share a group."""
+        a = note_group("[Note:Deal] Acme", _note("Acme"), ["tag", "day"])
+        b = note_group("[note:deal] Globex", _note("Globex"), ["tag", "day"])
+        c = note_group("[Note:Deal] Acme", _note("Acme", day=20), ["tag", "day"])
+
+        assert a.key == b.key
+        assert a.key != c.key
+        assert a.page_title == "[Note:Deal] 2026-10-19"
+
+    def test_title_grouping_keeps_note_title(self):
+        """Test that title groups are named after the note."""
+        group = note_group("[Note] Daily log", _note("Daily log"), ["title"])
+
+        assert group.page_title == "Daily log"
+
+    def test_entry_html_has_heading(self):
+        """Test that each appended entry starts with its escaped title."""
+        assert entry_html(_note("Q&A")).startswith("<h2>Q&amp;A</h2>")
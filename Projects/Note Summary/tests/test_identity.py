@@ -0,0 +1,91 @@
+"""Tests for the persisted /me identity."""
+
+import json
+from pathlib import Path
+from typing import List
+
+import pytest
+import requests
+
+from src.auth.identity import IdentityCache
+from src.services.email_service import EmailService
+from src.utils.config import EmailConfig
+
+
+@pytest.fixture
+def cache(temp_dir: Path) -> IdentityCache:
+    """An IdentityCache in a temp directory."""
+    return IdentityCache(temp_dir / "identity.json")
+
+
+class MeSession:
+    """Answers /me and counts the requests."""
+
+    def __init__(self):
+        self.urls: List[str] = []
+
+    def get(self, url, headers=None, params=None):
+        self.urls.append(url)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({
+            "id": "oid-1", "mail": "felix@example.com", "userPrincipalName": "felix@corp.example",
+        }).encode("utf-8")
+        return response
+
+
+class TestIdentityCache:
+    """Tests for IdentityCache."""
+
+    def test_claims_fill_identity(self, cache: IdentityCache):
+        """Test that ID-token claims give the UPN, object ID and email."""
+        cache.set_current("acct-1", {
+            "oid": "oid-1",
+            "preferred_username": "felix@corp.example",
+            "email": "felix@example.com",
+        })
+
+        identity = cache.current()
+        assert identity.account_id == "acct-1"
+        assert identity.address == "felix@example.com"
+        assert identity.object_id == "oid-1"
+
+    def test_known_mail_kept_and_accounts_separate(self, cache: IdentityCache):
+        """Test that /me details survive token refreshes and don't leak across accounts."""
+        cache.set_current("acct-1", {"preferred_username": "felix@corp.example"})
+        cache.update_current("felix@example.com", "felix@corp.example", "oid-1")
+        cache.set_current("acct-1", {"preferred_username": "felix@corp.example"})
+        assert cache.current().mail == "felix@example.com"
+
+        cache.set_current("acct-2", {"preferred_username": "other@corp.example"})
+        assert cache.current().mail == ""
+
+        cache.set_current("acct-1")
+        assert cache.current().mail == "felix@example.com"
+
+
+class TestEmailServiceIdentity:
+    """Tests for EmailService.get_current_user_email() with a cache."""
+
+    def test_me_called_once_across_instances(self, cache: IdentityCache):
+        """Test that only the first service of a session hits /me."""
+        cache.set_current("acct-1", {"preferred_username": "felix@corp.example"})
+        session = MeSession()
+
+        first = EmailService("token", EmailConfig(), session=session, identity_cache=cache)
+        second = EmailService("token", EmailConfig(), session=session, identity_cache=cache)
+
+        assert first.get_current_user_email() == "felix@example.com"
+        assert second.get_current_user_email() == "felix@example.com"
+        assert len(session.urls) == 1
+        assert cache.current().user_principal_name == "felix@corp.example"
+
+    def test_email_claim_skips_me(self, cache: IdentityCache):
+        """Test that an email claim from sign-in avoids /me entirely."""
+        cache.set_current("acct-1", {"email": "felix@example.com"})
+        session = MeSession()
+
+        service = EmailService("token", EmailConfig(), session=session, identity_cache=cache)
+
+        assert service.get_current_user_email() == "felix@example.com"
+        assert session.urls == []
@@ -0,0 +1,137 @@
+"""Tests for inline image embedding and multipart page bodies."""
+
+import base64
+from pathlib import Path
+
+import pytest
+import requests
+
+from src.processors.inline_images import content_hash, has_inline_images, prepare_inline_images
+from src.services.email_service import Attachment
+from src.services.multipart import MultipartPart, MultipartStream
+from src.storage.processed_tracker import ProcessedTracker
+
+
+def _attachment(content_id: str, payload: bytes) -> Attachment:
+    return Attachment(
+        id=f"att-{content_id}",
+        name=f"{content_id}.png",
+        content_type="image/png",
+        content_id=content_id,
+        size=len(payload),
+        content_base64=base64.b64encode(payload).decode("ascii"),
+    )
+
+
+@pytest.fixture
+def logo() -> Attachment:
+    """Small inline image."""
+    return _attachment("logo@01", b"\x89PNG logo bytes")
+
+
+class TestPrepareInlineImages:
+    """Tests for prepare_inline_images()."""
+
+    def test_detects_cid_images(self):
+        """Test cid: reference detection."""
+        assert has_inline_images('<p><img src="cid:logo@01"></p>')
+        assert not has_inline_images('<p><img src="https://example.com/a.png"></p>')
+
+    def test_rewrites_cid_to_part_name(self, logo: Attachment):
+        """Test that cid: references become name: references."""
+        result = prepare_inline_images(
+            '<p><img alt="x" src="cid:logo@01"></p>', [logo], 10_000, 10_000, set()
+        )
+
+        assert 'src="name:image1"' in result.html_content
+        assert len(result.parts) == 1
+        assert result.parts[0].name == "image1"
+        assert result.uploaded_hashes == [content_hash(logo)]
+
+    def test_duplicate_references_share_one_part(self, logo: Attachment):
+        """Test that the same image referenced twice is uploaded once."""
+        html = '<img src="cid:logo@01"><img src="CID:logo@01">'
+        result = prepare_inline_images(html, [logo], 10_000, 10_000, set())
+
+        assert len(result.parts) == 1
+        assert result.html_content.count("name:image1") == 2
+
+    def test_oversized_and_missing_images_dropped(self, logo: Attachment):
+        """Test size caps and unknown content IDs."""
+        big = _attachment("big@01", b"x" * 5000)
+        html = '<img src="cid:big@01"><img src="cid:missing"><img src="cid:logo@01">'
+
+        result = prepare_inline_images(html, [big, logo], 1000, 10_000, set())
+
+        assert result.dropped == 2
+        assert "cid:" not in result.html_content
+        assert [p.name for p in result.parts] == ["image1"]
+
+    def test_skip_hashes_dropped(self, logo: Attachment):
+        """Test that recurring images are not re-uploaded."""
+        result = prepare_inline_images(
+            '<img src="cid:logo@01">', [logo], 10_000, 10_000, {content_hash(logo)}
+        )
+
+        assert result.parts == []
+        assert result.html_content == ""
+
+
+class TestMultipartStream:
+    """Tests for the streaming multipart body."""
+
+    def test_length_matches_content(self):
+        """Test that the advertised length equals the bytes produced."""
+        payload = bytes(range(256)) * 1000
+        parts = [
+            MultipartPart("Presentation", "text/html", data=b"<html></html>"),
+            MultipartPart(
+                "image1", "image/png", base64_data=base64.b64encode(payload).decode()
+            ),
+        ]
+        stream = MultipartStream(parts, boundary="B")
+
+        body = b"".join(iter(stream))
+
+        assert len(stream) == len(body)
+        assert payload in body
+        assert body.endswith(b"--B--\r\n")
+
+    def test_read_in_blocks(self):
+        """Test file-like reads return the same bytes as iteration."""
+        parts = [MultipartPart("Presentation", "text/html", data=b"<p>hi</p>" * 100)]
+        expected = b"".join(iter(MultipartStream(parts, boundary="B")))
+        stream = MultipartStream(parts, boundary="B")
+
+        chunks = []
+        while True:
+            chunk = stream.read(100)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+        assert b"".join(chunks) == expected
+
+    def test_requests_sends_content_length(self):
+        """Test that requests streams the body with a fixed length."""
+        stream = MultipartStream([MultipartPart("Presentation", "text/html", data=b"<p/>")])
+        prepared = requests.Request(
+            "POST", "https://example.com", data=stream,
+            headers={"Content-Type": stream.content_type},
+        ).prepare()
+
+        assert prepared.headers["Content-Length"] == str(len(stream))
+        assert "Transfer-Encoding" not in prepared.headers
+
+
+class TestImageHashCache:
+    """Tests for the tracker's repeat-image cache."""
+
+    def test_repeated_after_threshold(self, temp_dir: Path):
+        """Test that images count as repeated once seen min_count times."""
+        tracker = ProcessedTracker(db_path=temp_dir / "test.db")
+        tracker.record_images(["a", "b"])
+        tracker.record_images(["a"])
+
+        assert tracker.get_repeated_images(["a", "b", "c"], min_count=2) == {"a"}
+        assert tracker.get_repeated_images(["a", "b"], min_count=0) == set()
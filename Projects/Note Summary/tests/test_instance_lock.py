@@ -0,0 +1,168 @@
+"""Tests for the single-instance lock."""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from src import main
+from src.utils import config as config_module
+from src.utils.config import Config
+from src.utils.instance_lock import WAKE_SIGNAL, InstanceLock, handle_wake_signal
+
+
+NOW = 1_800_000_000.0
+
+
+def _write_holder(path: Path, pid: int, mode: str = "run", heartbeat: float = NOW) -> None:
+    path.write_text(json.dumps({
+        "pid": pid,
+        "mode": mode,
+        "host": socket.gethostname(),
+        "started_at": "2027-01-15T08:00:00+00:00",
+        "heartbeat_at": datetime.fromtimestamp(heartbeat, timezone.utc).isoformat(),
+    }))
+
+
+def _exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+class _Auth:
+    """Stands in for GraphAuth."""
+
+    def get_access_token(self, interactive: bool = True) -> str:
+        return "token"
+
+
+class TestInstanceLock:
+    """Tests for InstanceLock."""
+
+    def test_second_acquire_fails_until_release(self, temp_dir: Path):
+        """Test that only one lock is held at a time."""
+        first = InstanceLock(temp_dir / "app.lock", mode="daemon")
+        second = InstanceLock(temp_dir / "app.lock")
+
+        assert first.acquire()
+        try:
+            assert not second.acquire()
+            assert second.read_holder().mode == "daemon"
+            assert second.read_holder().pid == os.getpid()
+        finally:
+            first.release()
+
+        assert not (temp_dir / "app.lock").exists()
+        assert second.acquire()
+        second.release()
+
+    def test_recovers_lock_of_exited_process(self, temp_dir: Path):
+        """Test that a lock left behind by a crashed run is taken over."""
+        _write_holder(temp_dir / "app.lock", _exited_pid())
+        lock = InstanceLock(temp_dir / "app.lock", clock=lambda: NOW)
+
+        assert lock.acquire()
+
+        assert lock.read_holder().pid == os.getpid()
+        lock.release()
+
+    def test_live_local_holder_never_stale(self, temp_dir: Path):
+        """Test that a running process keeps its lock after a long silence (e.g. sleep)."""
+        _write_holder(temp_dir / "app.lock", os.getpid(), heartbeat=NOW - 3600)
+        lock = InstanceLock(temp_dir / "app.lock", stale_seconds=120, clock=lambda: NOW)
+
+        assert not lock.acquire()
+
+    def test_recovers_quiet_lock_of_other_host(self, temp_dir: Path):
+        """Test that a holder that cannot be checked is stale once its heartbeat stops."""
+        path = temp_dir / "app.lock"
+        _write_holder(path, os.getpid(), heartbeat=NOW - 60)
+        path.write_text(path.read_text().replace(socket.gethostname(), "other-host"))
+        fresh = InstanceLock(path, stale_seconds=120, clock=lambda: NOW)
+        later = InstanceLock(path, stale_seconds=120, clock=lambda: NOW + 61)
+
+        assert not fresh.acquire()
+        assert later.acquire()
+        later.release()
+
+    def test_heartbeat_notices_takeover(self, temp_dir: Path):
+        """Test that a holder whose lock was taken over stops claiming it."""
+        lock = InstanceLock(temp_dir / "app.lock", heartbeat_seconds=3600)
+        assert lock.acquire()
+
+        assert lock.heartbeat()
+        _write_holder(temp_dir / "app.lock", os.getpid() + 1)
+
+        assert not lock.heartbeat()
+        assert not lock.held
+        lock.release()
+        assert (temp_dir / "app.lock").exists()
+
+
+@pytest.mark.skipif(WAKE_SIGNAL is None, reason="platform has no SIGUSR1")
+class TestWakeDaemon:
+    """Tests for acquire_instance_lock() handing work to a running daemon."""
+
+    @pytest.fixture(autouse=True)
+    def data_dir(self, temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+        monkeypatch.setattr(main, "get_data_dir", lambda: temp_dir)
+        return temp_dir
+
+    def test_run_wakes_daemon(self, data_dir: Path):
+        """Test that a one-shot run signals the daemon instead of working."""
+        woken = threading.Event()
+        restore = handle_wake_signal(woken)
+        daemon = InstanceLock(data_dir / "note-summary.lock", mode="daemon")
+        assert daemon.acquire()
+        try:
+            assert main.acquire_instance_lock("run") is None
+            assert woken.wait(5)
+        finally:
+            daemon.release()
+            restore()
+
+    def test_run_skips_while_other_run_works(self, data_dir: Path):
+        """Test that an overlapping scheduled run skips its turn."""
+        earlier = InstanceLock(data_dir / "note-summary.lock")
+        assert earlier.acquire()
+        try:
+            assert main.acquire_instance_lock("run") is None
+            with pytest.raises(SystemExit):
+                main.acquire_instance_lock("backfill")
+        finally:
+            earlier.release()
+
+        lock = main.acquire_instance_lock("backfill")
+        assert lock is not None
+        lock.release()
+
+
+class TestLostLock:
+    """Tests for long-running modes giving way when the lock is taken over."""
+
+    def test_daemon_stops(
+        self, temp_dir: Path, minimal_config_data: dict, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that the daemon stops checking mail once another instance holds the lock."""
+        monkeypatch.setattr(config_module, "_data_dir_override", temp_dir)
+        monkeypatch.setattr(main, "_graph_auth", lambda config: _Auth())
+        checks = []
+        monkeypatch.setattr(main, "process_emails", lambda *args, **kwargs: checks.append(1))
+        lock = InstanceLock(temp_dir / "app.lock", mode="daemon", heartbeat_seconds=3600)
+        assert lock.acquire()
+        _write_holder(temp_dir / "app.lock", os.getpid() + 1)
+        lock.heartbeat()
+
+        main.run_daemon(
+            Config._parse_config(minimal_config_data), "token", interval=0, max_ticks=3, lock=lock
+        )
+
+        assert checks == []
+        lock.release()
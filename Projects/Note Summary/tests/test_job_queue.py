@@ -0,0 +1,244 @@
+"""Tests for the job queue and queue workers."""
+
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+
+from src import main
+from src.main import _ingest_with_workers, _worker_process, run_worker
+from src.services.email_service import Email, EmailService
+from src.storage.job_queue import Job, SqliteJobQueue
+from src.storage.note_store import NoteStore
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils import config as config_module
+from src.utils.config import Config, get_data_dir
+
+
+RECEIVED = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+
+
+def _job(email_id: str, minutes: int = 0, conversation_id: str = "") -> Job:
+    return Job(
+        email_id=email_id,
+        subject=f"[Note] {email_id}",
+        received_at=(RECEIVED + timedelta(minutes=minutes)).isoformat(),
+        conversation_id=conversation_id,
+    )
+
+
+def _email(email_id: str, minutes: int = 0, conversation_id: str = "") -> Email:
+    return Email(
+        id=email_id,
+        subject=f"[Note] {email_id}",
+        body_content=f"Body of {email_id}",
+        body_content_type="text",
+        received_datetime=RECEIVED + timedelta(minutes=minutes),
+        sender_email="me@example.com",
+        is_read=True,
+        conversation_id=conversation_id,
+    )
+
+
+@pytest.fixture
+def queue(temp_dir: Path) -> SqliteJobQueue:
+    """Create a job queue in a temp database."""
+    return SqliteJobQueue(temp_dir / "test.db")
+
+
+@pytest.fixture
+def tracker(temp_dir: Path) -> ProcessedTracker:
+    """Create a ProcessedTracker sharing the queue's database."""
+    return ProcessedTracker(db_path=temp_dir / "test.db")
+
+
+@pytest.fixture
+def store(temp_dir: Path) -> NoteStore:
+    """Create a NoteStore in a temp directory."""
+    return NoteStore(temp_dir / "notes")
+
+
+@pytest.fixture
+def mailbox(monkeypatch: pytest.MonkeyPatch) -> Dict[str, Email]:
+    """Serve EmailService.fetch_email from a dict."""
+    messages: Dict[str, Email] = {}
+
+    def fetch_email(self, email_id: str) -> Optional[Email]:
+        return messages.get(email_id)
+
+    monkeypatch.setattr(EmailService, "fetch_email", fetch_email)
+    return messages
+
+
+class TestSqliteJobQueue:
+    """Tests for SqliteJobQueue."""
+
+    def test_enqueue_ignores_queued_emails(self, queue: SqliteJobQueue):
+        """Test that re-listing a queued email does not queue it twice."""
+        assert queue.enqueue([_job("a"), _job("b")]) == 2
+        queue.claim("w1", lease_seconds=60)
+
+        assert queue.enqueue([_job("a"), _job("c")]) == 1
+        assert queue.count() == 3
+
+    def test_claims_are_exclusive(self, queue: SqliteJobQueue):
+        """Test that two workers never get the same email."""
+        queue.enqueue([_job("a", 0), _job("b", 1)])
+
+        [first] = queue.claim("w1", lease_seconds=60)
+        [second] = queue.claim("w2", lease_seconds=60)
+
+        assert (first.email_id, second.email_id) == ("a", "b")
+        assert first.attempts == 1
+        assert queue.claim("w3", lease_seconds=60) == []
+
+    def test_expired_lease_is_reclaimed(self, queue: SqliteJobQueue):
+        """Test that a dead worker's email goes to another once its lease runs out."""
+        queue.enqueue([_job("a")])
+        queue.claim("w1", lease_seconds=60)
+        later = datetime.now(timezone.utc) + timedelta(seconds=61)
+
+        [job] = queue.claim("w2", lease_seconds=60, now=later)
+
+        assert job.attempts == 2
+        assert not queue.complete("a", "w1")
+        assert queue.complete("a", "w2")
+        assert queue.count() == 0
+
+    def test_heartbeat_keeps_lease(self, queue: SqliteJobQueue):
+        """Test that a renewed lease is not handed to another worker."""
+        queue.enqueue([_job("a")])
+        queue.claim("w1", lease_seconds=1)
+
+        assert queue.heartbeat("w1", lease_seconds=3600) == 1
+        soon = datetime.now(timezone.utc) + timedelta(seconds=60)
+        assert queue.claim("w2", lease_seconds=60, now=soon) == []
+
+    def test_release_returns_emails(self, queue: SqliteJobQueue):
+        """Test that released emails can be claimed at once without using an attempt."""
+        queue.enqueue([_job("a")])
+        queue.claim("w1", lease_seconds=60)
+
+        assert queue.release("w1") == 1
+
+        [job] = queue.claim("w2", lease_seconds=60)
+        assert job.attempts == 1
+
+    def test_conversation_handed_out_in_order(self, queue: SqliteJobQueue):
+        """Test that a reply waits until its conversation's earlier email is done."""
+        queue.enqueue([
+            _job("first", 0, "conv"), _job("reply", 5, "conv"), _job("other", 10),
+        ])
+
+        claimed = [job.email_id for job in queue.claim("w1", lease_seconds=60, limit=3)]
+        assert claimed == ["first", "other"]
+
+        queue.complete("first", "w1")
+        assert [job.email_id for job in queue.claim("w2", lease_seconds=60)] == ["reply"]
+
+    def test_created_from_config_backend(self, minimal_config_data: dict, temp_dir: Path):
+        """Test that the queue follows queue.backend and rejects unknown backends."""
+        config = Config._parse_config(minimal_config_data)
+
+        assert isinstance(main._create_job_queue(config, temp_dir / "q.db"), SqliteJobQueue)
+
+        config = replace(config, queue=replace(config.queue, backend="redis"))
+        with pytest.raises(ValueError, match="redis"):
+            main._create_job_queue(config, temp_dir / "q.db")
+
+
+class TestRunWorker:
+    """Tests for run_worker() and queueing from the fetcher."""
+
+    def test_worker_drains_queue(
+        self, minimal_config_data: dict, queue: SqliteJobQueue, tracker: ProcessedTracker,
+        store: NoteStore, mailbox: Dict[str, Email],
+    ):
+        """Test that queued emails become stored notes and leave the queue."""
+        config = Config._parse_config({**minimal_config_data, "queue": {"workers": 0}})
+        for email in (_email("a", 0), _email("b", 1)):
+            mailbox[email.id] = email
+
+        assert _ingest_with_workers(config, list(mailbox.values()), tracker, queue) == 0
+        assert queue.count() == 2
+
+        processed = run_worker(
+            config, lambda: "token", tracker=tracker, store=store, queue=queue, worker_id="w1"
+        )
+
+        assert processed == 2
+        assert queue.count() == 0
+        assert tracker.is_processed("a") and tracker.is_processed("b")
+        assert store.pending_count() == 2
+
+        # Processed emails are not queued again
+        _ingest_with_workers(config, list(mailbox.values()), tracker, queue)
+        assert queue.count() == 0
+
+    def test_deleted_email_dropped(
+        self, minimal_config_data: dict, queue: SqliteJobQueue, tracker: ProcessedTracker,
+        store: NoteStore, mailbox: Dict[str, Email],
+    ):
+        """Test that an email deleted after queueing is removed from the queue."""
+        config = Config._parse_config(minimal_config_data)
+        queue.enqueue([_job("gone")])
+
+        assert run_worker(config, lambda: "token", tracker=tracker, store=store, queue=queue) == 0
+        assert queue.count() == 0
+        assert not tracker.is_processed("gone")
+
+    def test_email_crashing_workers_dead_lettered(
+        self, minimal_config_data: dict, queue: SqliteJobQueue, tracker: ProcessedTracker,
+        store: NoteStore, mailbox: Dict[str, Email], monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that an email whose lease keeps running out stops being handed out."""
+        config = Config._parse_config({**minimal_config_data, "retry": {"max_attempts": 1}})
+        mailbox["a"] = _email("a")
+        queue.enqueue([_job("a")])
+        queue.claim("crashed", lease_seconds=60)
+        later = datetime.now(timezone.utc) + timedelta(seconds=61)
+
+        def claim_after_lease(worker_id, lease_seconds, limit=1, now=None):
+            return SqliteJobQueue.claim(queue, worker_id, lease_seconds, limit, now=later)
+
+        monkeypatch.setattr(queue, "claim", claim_after_lease)
+
+        assert run_worker(config, lambda: "token", tracker=tracker, store=store, queue=queue) == 0
+
+        assert tracker.is_dead_letter("a")
+        assert queue.count() == 0
+        assert store.pending_count() == 0
+
+    def test_expired_token_releases_claim(
+        self, minimal_config_data: dict, queue: SqliteJobQueue, tracker: ProcessedTracker,
+        store: NoteStore,
+    ):
+        """Test that a worker that cannot sign in gives its email back."""
+        config = Config._parse_config(minimal_config_data)
+        queue.enqueue([_job("a")])
+
+        assert run_worker(config, lambda: None, tracker=tracker, store=store, queue=queue) == 0
+
+        [job] = queue.claim("w2", lease_seconds=60)
+        assert job.attempts == 1
+
+    def test_worker_process_uses_parent_data_dir(
+        self, minimal_config_data: dict, temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that a spawned worker opens the parent's tracker, store and queue."""
+        config = Config._parse_config(minimal_config_data)
+        seen = []
+
+        class Auth:
+            def get_access_token(self, interactive=True):
+                return "token"
+
+        monkeypatch.setattr(config_module, "_data_dir_override", None)
+        monkeypatch.setattr(main, "_graph_auth", lambda config: Auth())
+        monkeypatch.setattr(main, "run_worker", lambda *args, **kwargs: seen.append(get_data_dir()))
+
+        _worker_process(config, {"verbose": False, "log_format": "text"}, temp_dir / "replay")
+
+        assert seen == [temp_dir / "replay"]
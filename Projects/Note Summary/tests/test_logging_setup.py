@@ -0,0 +1,99 @@
+"""Tests for structured logging configuration."""
+
+import json
+import logging
+
+import pytest
+
+from src.utils.logging_setup import (
+    ContextFilter,
+    JsonFormatter,
+    configure_logging,
+    log_context,
+    shutdown_logging,
+)
+
+
+def _make_record(msg: str = "Processing: %s", args: tuple = ("[Note] Title",)) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+
+
+class TestJsonFormatter:
+    """Tests for JsonFormatter."""
+
+    def test_emits_single_json_line(self):
+        """Test that output is one parseable JSON object."""
+        output = JsonFormatter().format(_make_record())
+
+        entry = json.loads(output)
+        assert "\n" not in output
+        assert entry["level"] == "INFO"
+        assert entry["msg"] == "Processing: [Note] Title"
+
+    def test_includes_structured_extras(self):
+        """Test that stage and duration fields are emitted when present."""
+        record = _make_record()
+        record.stage = "create_page"
+        record.duration_ms = 12.5
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["stage"] == "create_page"
+        assert entry["duration_ms"] == 12.5
+
+
+class TestLogContext:
+    """Tests for log_context() and ContextFilter."""
+
+    def test_context_fields_attached(self):
+        """Test that context fields are copied onto records."""
+        record = _make_record()
+        with log_context(correlation_id="abc123", email_id="msg-1"):
+            ContextFilter().filter(record)
+
+        assert record.correlation_id == "abc123"
+        assert record.email_id == "msg-1"
+
+    def test_context_is_scoped(self):
+        """Test that fields do not leak outside the block."""
+        with log_context(correlation_id="abc123"):
+            pass
+        record = _make_record()
+        ContextFilter().filter(record)
+
+        assert not hasattr(record, "correlation_id")
+
+    def test_explicit_extra_wins(self):
+        """Test that extra= values are not overwritten by context."""
+        record = _make_record()
+        record.stage = "fetch"
+        with log_context(stage="process"):
+            ContextFilter().filter(record)
+
+        assert record.stage == "fetch"
+
+
+class TestConfigureLogging:
+    """Tests for configure_logging()."""
+
+    def test_json_output_through_queue(self, capsys):
+        """Test that records flow through the queue listener as JSON."""
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        configure_logging(log_format="json")
+        try:
+            with log_context(correlation_id="cid-1"):
+                logging.getLogger("test").info("Found %s matching email(s)", 3)
+        finally:
+            shutdown_logging()
+            root.handlers[:] = saved_handlers
+            root.setLevel(saved_level)
+
+        entry = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+        assert entry["msg"] == "Found 3 matching email(s)"
+        assert entry["correlation_id"] == "cid-1"
+
+    def test_rejects_unknown_format(self):
+        """Test validation of the log format."""
+        with pytest.raises(ValueError):
+            configure_logging(log_format="xml")
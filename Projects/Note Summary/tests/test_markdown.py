@@ -0,0 +1,50 @@
+"""Tests for the HTML to Markdown converter."""
+
+from src.processors.markdown import html_to_markdown
+
+
+class TestHtmlToMarkdown:
+    """Tests for html_to_markdown()."""
+
+    def test_inline_formatting(self):
+        """Test paragraphs, emphasis, links and line breaks."""
+        markdown = html_to_markdown(
+            '<p>Call <b>Acme</b> re <i>renewal</i></p>'
+            '<p>See <a href="https://example.com">deck</a><br>line two</p>'
+        )
+
+        assert markdown == (
+            "Call **Acme** re *renewal*\n\n"
+            "See [deck](https://example.com)  \nline two\n"
+        )
+
+    def test_lists_and_headings(self):
+        """Test headings and nested ordered/unordered lists."""
+        markdown = html_to_markdown(
+            "<h2>Actions</h2><ul><li>one</li><li>two<ol><li>a</li><li>b</li></ol></li></ul>"
+        )
+
+        assert markdown == "## Actions\n\n- one\n- two\n    1. a\n    2. b\n"
+
+    def test_table(self):
+        """Test that tables get a header separator row."""
+        markdown = html_to_markdown(
+            "<table><tr><th>Deal</th><th>Stage</th></tr><tr><td>Acme</td><td>NBO</td></tr></table>"
+        )
+
+        assert markdown == "| Deal | Stage |\n| --- | --- |\n| Acme | NBO |\n"
+
+    def test_escapes_markdown_characters_and_skips_styles(self):
+        """Test that text can't turn into formatting and style blocks are dropped."""
+        markdown = html_to_markdown("<style>p {}</style><p>file_name *draft*</p>")
+
+        assert markdown == "file\\_name \\*draft\\*\n"
+
+    def test_image_src_mapping(self):
+        """Test that image sources go through the mapping and can be dropped."""
+        markdown = html_to_markdown(
+            '<p><img src="name:image1" alt="chart"><img src="cid:gone"></p>',
+            image_src=lambda src: "attachments/chart.png" if src == "name:image1" else "",
+        )
+
+        assert markdown == "![chart](attachments/chart.png)\n"
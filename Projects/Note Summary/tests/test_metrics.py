@@ -0,0 +1,121 @@
+"""Tests for in-process metrics and Prometheus export."""
+
+import sys
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from src.main import main
+from src.utils.metrics import MetricsRegistry, normalize_endpoint, start_http_server
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    """Create an enabled registry."""
+    return MetricsRegistry(enabled=True)
+
+
+class TestDisabledRegistry:
+    """Tests for the disabled (default) state."""
+
+    def test_disabled_records_nothing(self):
+        """Test that a disabled registry ignores all calls."""
+        registry = MetricsRegistry()
+
+        registry.inc("note_summary_emails_total", outcome="processed")
+        registry.observe("note_summary_stage_seconds", 0.5, stage="fetch")
+        with registry.timer("note_summary_cycle_seconds"):
+            pass
+
+        assert registry.render_prometheus() == "\n"
+
+
+class TestRecording:
+    """Tests for counters, histograms and timers."""
+
+    def test_counter_accumulates_per_label(self, registry: MetricsRegistry):
+        """Test that counters are tracked per label set."""
+        registry.inc("note_summary_emails_total", outcome="processed")
+        registry.inc("note_summary_emails_total", outcome="processed")
+        registry.inc("note_summary_emails_total", outcome="failed")
+
+        assert registry.counter_value("note_summary_emails_total", outcome="processed") == 2
+        assert registry.counter_value("note_summary_emails_total") == 3
+
+    def test_timer_observes_histogram(self, registry: MetricsRegistry):
+        """Test that the timer context records one observation."""
+        with registry.timer("note_summary_stage_seconds", stage="fetch"):
+            pass
+
+        output = registry.render_prometheus()
+        assert 'note_summary_stage_seconds_count{stage="fetch"} 1' in output
+
+    def test_histogram_buckets_are_cumulative(self, registry: MetricsRegistry):
+        """Test Prometheus bucket semantics."""
+        registry.observe("note_summary_stage_seconds", 0.02, stage="process")
+        registry.observe("note_summary_stage_seconds", 3.0, stage="process")
+
+        output = registry.render_prometheus()
+        assert 'note_summary_stage_seconds_bucket{stage="process",le="0.025"} 1' in output
+        assert 'note_summary_stage_seconds_bucket{stage="process",le="5"} 2' in output
+        assert 'note_summary_stage_seconds_bucket{stage="process",le="+Inf"} 2' in output
+        assert registry.histogram_sum("note_summary_stage_seconds") == pytest.approx(3.02)
+
+    def test_render_includes_help_and_type(self, registry: MetricsRegistry):
+        """Test exposition headers."""
+        registry.inc("note_summary_emails_total", outcome="processed")
+
+        output = registry.render_prometheus()
+        assert "# TYPE note_summary_emails_total counter" in output
+        assert "# HELP note_summary_emails_total" in output
+
+
+class TestExport:
+    """Tests for file and HTTP export."""
+
+    def test_write_prometheus_file(self, registry: MetricsRegistry, temp_dir: Path):
+        """Test writing a textfile-collector file."""
+        registry.inc("note_summary_emails_total", outcome="processed")
+        path = temp_dir / "metrics" / "note_summary.prom"
+
+        registry.write_prometheus(path)
+
+        assert 'note_summary_emails_total{outcome="processed"} 1' in path.read_text()
+
+    def test_http_endpoint(self, registry: MetricsRegistry):
+        """Test serving metrics over HTTP."""
+        registry.inc("note_summary_emails_total", outcome="processed")
+        server = start_http_server(registry, port=0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                body = resp.read().decode("utf-8")
+        finally:
+            server.shutdown()
+
+        assert "note_summary_emails_total" in body
+
+    def test_metrics_port_requires_daemon(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+    ):
+        """Test that --metrics-port is refused outside daemon mode."""
+        monkeypatch.setattr(sys, "argv", ["note-summary", "--metrics-port", "9464"])
+
+        with pytest.raises(SystemExit):
+            main()
+
+        assert "--metrics-port requires --daemon" in capsys.readouterr().err
+
+
+class TestNormalizeEndpoint:
+    """Tests for Graph endpoint label normalization."""
+
+    def test_collapses_ids(self):
+        """Test that resource IDs become placeholders."""
+        path = "/v1.0/me/onenote/sections/1-abc123!42/pages"
+        assert normalize_endpoint(path) == "/me/onenote/sections/{id}/pages"
+
+    def test_keeps_named_segments(self):
+        """Test that plain collection names are kept."""
+        assert normalize_endpoint("/v1.0/me/messages") == "/me/messages"
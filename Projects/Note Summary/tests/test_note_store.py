@@ -0,0 +1,522 @@
+"""Tests for the local note store and OneNote sync."""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+import requests
+
+from src.main import _ingest_one, sync_notes
+from src.processors.email_processor import EmailProcessor
+from src.services.circuit_breaker import CircuitOpenError
+from src.services.email_service import Email
+from src.services.onenote_service import OneNoteService
+from src.storage.note_store import NoteStore, StoredImage, StoredNote
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils.config import Config
+
+
+RECEIVED = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+
+
+def _note(email_id: str, minutes: int = 0, **kwargs) -> StoredNote:
+    return StoredNote(
+        email_id=email_id,
+        subject=f"[Note] {email_id}",
+        title=email_id,
+        html_content=f"<p>{email_id}</p>",
+        received_at=(RECEIVED + timedelta(minutes=minutes)).isoformat(),
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def store(temp_dir: Path) -> NoteStore:
+    """Create a NoteStore in a temp directory."""
+    return NoteStore(temp_dir / "notes")
+
+
+@pytest.fixture
+def tracker(temp_dir: Path) -> ProcessedTracker:
+    """Create a ProcessedTracker with a temp database."""
+    return ProcessedTracker(db_path=temp_dir / "test.db")
+
+
+@pytest.fixture
+def config(minimal_config_data: dict) -> Config:
+    """Default configuration."""
+    return Config._parse_config(minimal_config_data)
+
+
+class FakeOneNote:
+    """Records page writes made through OneNoteService."""
+
+    def __init__(self, monkeypatch: pytest.MonkeyPatch):
+        self.down = False
+        # Create the next page, but time out before the response arrives
+        self.time_out = False
+        self.created: List[str] = []
+        self.sections: List[Optional[str]] = []
+        self.appended: List[str] = []
+        fake = self
+
+        def create_page(self, title, html_content, parts=None, section_name=None):
+            if fake.down:
+                raise RuntimeError("Service unavailable")
+            fake.created.append(title)
+            fake.sections.append(section_name)
+            if fake.time_out:
+                fake.time_out = False
+                raise requests.ReadTimeout("Read timed out")
+            return f"page-{len(fake.created)}"
+
+        def find_page(self, title, section_name=None, created_after=None):
+            matches = [n for n, created in enumerate(fake.created, 1) if created == title]
+            return f"page-{matches[-1]}" if matches else None
+
+        def append_to_page(self, page_id, html_content, parts=None):
+            fake.appended.append(page_id)
+            return True
+
+        monkeypatch.setattr(OneNoteService, "create_page", create_page)
+        monkeypatch.setattr(OneNoteService, "append_to_page", append_to_page)
+        monkeypatch.setattr(OneNoteService, "find_page", find_page)
+        monkeypatch.setattr(OneNoteService, "get_or_create_target_section",
+                            lambda self, section_name=None: "s")
+
+
+@pytest.fixture
+def onenote(monkeypatch: pytest.MonkeyPatch) -> FakeOneNote:
+    """Replace OneNote page writes with an in-memory fake."""
+    return FakeOneNote(monkeypatch)
+
+
+class TestNoteStore:
+    """Tests for NoteStore."""
+
+    def test_pending_in_received_order(self, store: NoteStore):
+        """Test that notes come back oldest first with their images."""
+        store.put(_note("later", minutes=5))
+        store.put(_note("earlier", images=[StoredImage("image1", "image/png", "AAAA")]))
+
+        pending = store.pending()
+
+        assert [n.email_id for n in pending] == ["earlier", "later"]
+        assert pending[0].images[0].name == "image1"
+        assert store.pending_count() == 2
+
+    def test_failure_backs_off(self, store: NoteStore):
+        """Test that a failed note is not due again until its retry time."""
+        note = _note("a")
+        store.put(note)
+
+        store.record_failure(note, "boom")
+
+        assert store.pending() == []
+        later = datetime.now(timezone.utc) + timedelta(hours=1)
+        [retry] = store.pending(now=later)
+        assert retry.attempts == 1
+        assert retry.last_error == "boom"
+
+    def test_dead_letter_and_requeue(self, store: NoteStore):
+        """Test that a note failing max_attempts times is set aside until requeued."""
+        note = _note("a")
+        store.put(note)
+
+        assert not store.record_failure(note, "413 Payload Too Large", max_attempts=2)
+        assert store.record_failure(note, "413 Payload Too Large", max_attempts=2)
+
+        assert store.pending_count() == 0
+        [dead] = store.dead_letters()
+        assert (dead.email_id, dead.attempts) == ("a", 2)
+        assert dead.dead_lettered_at is not None
+
+        assert store.requeue("a")
+        assert not store.requeue("a")
+        [retry] = store.pending()
+        assert retry.attempts == 0
+        assert store.dead_letters() == []
+
+    def test_complete_removes_from_queue(self, store: NoteStore, temp_dir: Path):
+        """Test that published notes are kept, but not pending."""
+        note = _note("a")
+        store.put(note)
+
+        store.complete(note)
+
+        assert store.pending_count() == 0
+        assert (temp_dir / "notes" / "synced" / note.file_name).exists()
+
+
+class TestSyncNotes:
+    """Tests for publishing the store with sync_notes()."""
+
+    def test_publishes_and_records_page(
+        self, config: Config, store: NoteStore, tracker: ProcessedTracker, onenote: FakeOneNote
+    ):
+        """Test that publishing fills in the page ID recorded at ingest."""
+        tracker.mark_processed("a", "[Note] a", RECEIVED, content_hash="h")
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 1
+
+        assert onenote.created == ["a"]
+        assert tracker.get_page_id("a") == "page-1"
+        assert tracker.find_duplicate("h")["onenote_page_id"] == "page-1"
+
+    def test_routes_pattern_to_section(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote,
+    ):
+        """Test that a note's subject pattern picks its section."""
+        config = Config._parse_config({
+            **minimal_config_data,
+            "email": {"subject_patterns": ["[Note]", "[DCN]"]},
+            "onenote": {"sections_by_pattern": {"[DCN]": "Changes"}},
+        })
+        store.put(_note("a", pattern="[DCN]"))
+        store.put(_note("b", minutes=1, pattern="[Note]"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 2
+
+        assert dict(zip(onenote.created, onenote.sections)) == {"a": "Changes", "b": None}
+
+    def test_outage_keeps_notes(
+        self, config: Config, store: NoteStore, tracker: ProcessedTracker, onenote: FakeOneNote
+    ):
+        """Test that OneNote failures leave notes in the store for retry."""
+        onenote.down = True
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+
+        assert store.pending_count() == 1
+        assert tracker.get_page_id("a") is None
+
+    def test_timed_out_create_not_repeated(
+        self, config: Config, store: NoteStore, tracker: ProcessedTracker, onenote: FakeOneNote
+    ):
+        """Test that a page made by a create that timed out is found, not made again."""
+        onenote.time_out = True
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+        later = datetime.now(timezone.utc) + timedelta(hours=1)
+        [note] = store.pending(now=later)
+        note.next_attempt_at = None
+        store.put(note)
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 1
+
+        assert onenote.created == ["a"]
+        assert tracker.get_page_id("a") == "page-1"
+        assert tracker.get_sync_state("page_create:a") is None
+
+    def test_failed_create_leaves_no_marker(
+        self, config: Config, store: NoteStore, tracker: ProcessedTracker, onenote: FakeOneNote
+    ):
+        """Test that a create OneNote answered with an error is simply retried."""
+        onenote.down = True
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+
+        assert tracker.get_sync_state("page_create:a") is None
+
+    def test_append_waits_for_original(
+        self, config: Config, store: NoteStore, tracker: ProcessedTracker, onenote: FakeOneNote
+    ):
+        """Test that an append to an unpublished note is retried, not lost."""
+        store.put(_note("dup", minutes=5, append_to_email_id="orig"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+        assert store.pending_count() == 1
+
+        tracker.mark_processed("orig", "[Note] orig", RECEIVED, "page-orig")
+        later = datetime.now(timezone.utc) + timedelta(hours=1)
+        [note] = store.pending(now=later)
+        note.next_attempt_at = None
+        store.put(note)
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 1
+        assert onenote.appended == ["page-orig"]
+
+    def test_rejected_note_dead_lettered(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote,
+    ):
+        """Test that a note OneNote keeps rejecting stops being retried."""
+        config = Config._parse_config({**minimal_config_data, "retry": {"max_attempts": 2}})
+        onenote.down = True
+        store.put(_note("a"))
+        later = datetime.now(timezone.utc) + timedelta(days=1)
+
+        for _ in range(2):
+            assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+            for note in store.pending(now=later):
+                note.next_attempt_at = None
+                store.put(note)
+
+        assert store.pending_count() == 0
+        assert [n.email_id for n in store.dead_letters()] == ["a"]
+
+    def test_unavailable_sink_never_dead_letters(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that a sink outage only reschedules notes."""
+        config = Config._parse_config({**minimal_config_data, "retry": {"max_attempts": 1}})
+
+        def section_down(self, section_name=None):
+            raise RuntimeError("Service unavailable")
+
+        monkeypatch.setattr(OneNoteService, "get_or_create_target_section", section_down)
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+
+        assert store.pending_count() == 1
+        assert store.dead_letters() == []
+
+    def test_open_circuit_never_dead_letters(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that a page write refused by an open circuit is only rescheduled."""
+        config = Config._parse_config({**minimal_config_data, "retry": {"max_attempts": 1}})
+
+        def circuit_open(self, title, html_content, parts=None, section_name=None):
+            raise CircuitOpenError("onenote circuit open (retrying in 60s)")
+
+        monkeypatch.setattr(OneNoteService, "get_or_create_target_section",
+                            lambda self, section_name=None: "section-1")
+        monkeypatch.setattr(OneNoteService, "create_page", circuit_open)
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+
+        assert store.pending_count() == 1
+        assert store.dead_letters() == []
+
+    def test_markdown_only_needs_no_onenote(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote, temp_dir: Path,
+    ):
+        """Test that a Markdown-only setup writes files and never calls OneNote."""
+        (temp_dir / "vault").mkdir()
+        config = Config._parse_config({
+            **minimal_config_data,
+            "sinks": {"enabled": ["markdown"]},
+            "markdown": {"vault_path": str(temp_dir / "vault")},
+        })
+        onenote.down = True
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 1
+
+        assert tracker.get_sink_location("a", "markdown") == "Email Notes/2026-10-19 a.md"
+        assert (temp_dir / "vault" / "Email Notes" / "2026-10-19 a.md").exists()
+        assert store.pending_count() == 0
+
+    def test_both_sinks_complete_together(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote, temp_dir: Path,
+    ):
+        """Test that a note stays pending until every sink has it."""
+        (temp_dir / "vault").mkdir()
+        config = Config._parse_config({
+            **minimal_config_data,
+            "sinks": {"enabled": ["onenote", "markdown"]},
+            "markdown": {"vault_path": str(temp_dir / "vault")},
+        })
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 1
+
+        assert onenote.created == ["a"]
+        assert tracker.get_sink_location("a", "onenote") == "page-1"
+        assert tracker.get_sink_location("a", "markdown") is not None
+
+    def test_failed_sink_retried_alone(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote, temp_dir: Path, monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that a retry goes only to the sink that failed."""
+        (temp_dir / "vault").mkdir()
+        config = Config._parse_config({
+            **minimal_config_data,
+            "sinks": {"enabled": ["onenote", "markdown"]},
+            "markdown": {"vault_path": str(temp_dir / "vault")},
+        })
+        onenote.down = True
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+        assert tracker.get_delivered(["a"], "markdown") == {"a"}
+        assert "onenote: Service unavailable" in store.pending(
+            now=datetime.now(timezone.utc) + timedelta(hours=1)
+        )[0].last_error
+
+        from src.sinks.markdown_sink import MarkdownSink
+
+        def no_rewrite(self, notes):
+            raise AssertionError("markdown sink called again")
+
+        monkeypatch.setattr(MarkdownSink, "publish_batch", no_rewrite)
+        onenote.down = False
+        [note] = store.pending(now=datetime.now(timezone.utc) + timedelta(hours=1))
+        note.next_attempt_at = None
+        store.put(note)
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 1
+        assert onenote.created == ["a"]
+        assert store.pending_count() == 0
+
+    def test_unavailable_sink_does_not_block_others(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote, temp_dir: Path, monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that notes reach the vault while OneNote cannot be reached."""
+        (temp_dir / "vault").mkdir()
+        config = Config._parse_config({
+            **minimal_config_data,
+            "sinks": {"enabled": ["onenote", "markdown"]},
+            "markdown": {"vault_path": str(temp_dir / "vault")},
+        })
+
+        def section_down(self):
+            raise RuntimeError("Service unavailable")
+
+        monkeypatch.setattr(OneNoteService, "get_or_create_target_section", section_down)
+        store.put(_note("a"))
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 0
+
+        assert tracker.get_delivered(["a"], "markdown") == {"a"}
+        assert store.pending_count() == 1
+
+
+def _email(email_id: str, minutes: int, body: str, unique_body: str = "") -> Email:
+    return Email(
+        id=email_id,
+        subject="[Note] Design review",
+        body_content=body,
+        body_content_type="text",
+        received_datetime=RECEIVED + timedelta(minutes=minutes),
+        sender_email="me@example.com",
+        is_read=True,
+        conversation_id="conv-1",
+        unique_body_content=unique_body,
+        unique_body_content_type="text" if unique_body else "",
+    )
+
+
+class TestConversations:
+    """Tests for collapsing a reply thread onto one page."""
+
+    def test_reply_appends_only_new_text(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote,
+    ):
+        """Test that a reply joins the thread's page without its quoted history."""
+        config = Config._parse_config({**minimal_config_data, "append": {"conversations": True}})
+        processor = EmailProcessor(config.email)
+        first = _email("a", 0, "Agenda")
+        reply = _email("b", 5, "Decision made\n> Agenda", unique_body="Decision made")
+
+        for email in (first, reply):
+            assert _ingest_one(email, config, False, processor, None, tracker, store)
+
+        [stored_reply] = [n for n in store.pending() if n.email_id == "b"]
+        assert stored_reply.append_to_email_id == "a"
+        assert "Decision made" in stored_reply.html_content
+        assert "Agenda" not in stored_reply.html_content
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 2
+        assert onenote.created == ["Design review"]
+        assert onenote.appended == ["page-1"]
+        assert tracker.get_conversation("conv-1")["message_count"] == 2
+
+    def test_off_by_default(
+        self, config: Config, store: NoteStore, tracker: ProcessedTracker
+    ):
+        """Test that without append.conversations each message is its own note."""
+        processor = EmailProcessor(config.email)
+
+        for email in (_email("a", 0, "Agenda"), _email("b", 5, "Reply", unique_body="Reply")):
+            assert _ingest_one(email, config, False, processor, None, tracker, store)
+
+        assert [n.append_to_email_id for n in store.pending()] == [None, None]
+        assert tracker.get_conversation("conv-1") is None
+
+
+class TestDedup:
+    """Tests for duplicate notes found at ingest."""
+
+    def test_link_resolved_when_original_published(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        onenote: FakeOneNote,
+    ):
+        """Test that a duplicate of a still-pending note ends up on its page."""
+        config = Config._parse_config({**minimal_config_data, "dedup": {"policy": "link"}})
+        processor = EmailProcessor(config.email)
+
+        assert _ingest_one(_email("a", 0, "Agenda"), config, False, processor, None, tracker, store)
+        assert not _ingest_one(
+            _email("b", 5, "Agenda"), config, False, processor, None, tracker, store
+        )
+        assert tracker.get_page_id("b") is None
+
+        assert sync_notes(config, "token", tracker=tracker, store=store) == 1
+
+        assert onenote.created == ["Design review"]
+        assert tracker.get_page_id("b") == "page-1"
+
+    def test_off_by_default(
+        self, config: Config, store: NoteStore, tracker: ProcessedTracker
+    ):
+        """Test that without a dedup policy every email becomes a note."""
+        processor = EmailProcessor(config.email)
+
+        for email in (_email("a", 0, "Agenda"), _email("b", 5, "Agenda")):
+            assert _ingest_one(email, config, False, processor, None, tracker, store)
+
+        assert store.pending_count() == 2
+
+
+class TestIngestFailures:
+    """Tests for backoff and dead-lettering of emails that fail to process."""
+
+    def test_failing_email_backs_off_then_dead_letters(
+        self, minimal_config_data: dict, store: NoteStore, tracker: ProcessedTracker,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that a poison email is skipped while waiting and after giving up."""
+        config = Config._parse_config({**minimal_config_data, "retry": {"max_attempts": 2}})
+        processor = EmailProcessor(config.email)
+        calls = []
+
+        def process_email(email):
+            calls.append(email.id)
+            raise ValueError("malformed HTML")
+
+        monkeypatch.setattr(processor, "process_email", process_email)
+        email = _email("a", 0, "Body")
+
+        assert not _ingest_one(email, config, False, processor, None, tracker, store)
+        assert not _ingest_one(email, config, False, processor, None, tracker, store)
+        assert calls == ["a"]
+        assert tracker.get_email_failure("a")["attempts"] == 1
+
+        tracker.record_email_failure("a", email.subject, RECEIVED, "malformed HTML", 2)
+
+        assert tracker.is_dead_letter("a")
+        assert not _ingest_one(email, config, False, processor, None, tracker, store)
+        assert calls == ["a"]
+        assert [d["email_id"] for d in tracker.get_dead_letters()] == ["a"]
+
+        assert tracker.clear_email_failure("a")
+        monkeypatch.undo()
+        assert _ingest_one(email, config, False, processor, None, tracker, store)
+        assert tracker.get_email_failure("a") is None
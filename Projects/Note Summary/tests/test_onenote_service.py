@@ -0,0 +1,150 @@
+"""Tests for OneNote notebook discovery."""
+
+import json
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import requests
+
+from src.services.onenote_service import GRAPH_BASE_URL, OneNoteService
+from src.utils.config import OneNoteConfig
+
+
+NOTEBOOKS_URL = f"{GRAPH_BASE_URL}/me/onenote/notebooks"
+
+
+def _response(status: int, payload: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(payload).encode("utf-8")
+    return response
+
+
+def _section(section_id: str) -> dict:
+    return {"id": section_id, "displayName": section_id.title()}
+
+
+class FakeSession:
+    """Serves canned GET responses by URL and records every request."""
+
+    def __init__(self, routes: dict, expand_supported: bool = True):
+        self.routes = routes
+        self.expand_supported = expand_supported
+        self.requests: List[str] = []
+        self.posts: List[str] = []
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers=None, params: Optional[dict] = None) -> requests.Response:
+        with self._lock:
+            self.requests.append(url)
+        if params and "sectionGroups" in params.get("$expand", "") and not self.expand_supported:
+            return _response(400, {"error": {"message": "expand not supported"}})
+        return _response(200, self.routes[url])
+
+    def post(self, url: str, headers=None, json=None) -> requests.Response:
+        self.posts.append(url)
+        return _response(201, {"id": f"new-{len(self.posts)}"})
+
+
+def _service(session: FakeSession, **config) -> OneNoteService:
+    return OneNoteService("token", OneNoteConfig(**config), session=session)
+
+
+class TestNotebookTree:
+    """Tests for OneNoteService.get_notebook_tree()."""
+
+    def test_expanded_tree_with_pagination(self):
+        """Test that the hierarchy comes from the $expand request and its next page."""
+        session = FakeSession({
+            NOTEBOOKS_URL: {
+                "value": [{
+                    "id": "nb1",
+                    "displayName": "Email Notes",
+                    "sections": [_section("captured notes")],
+                    "sectionGroups": [{
+                        "id": "g1", "displayName": "Archive", "sections": [_section("2025")],
+                    }],
+                }],
+                "@odata.nextLink": f"{NOTEBOOKS_URL}?$skip=1",
+            },
+            f"{NOTEBOOKS_URL}?$skip=1": {
+                "value": [{"id": "nb2", "displayName": "Work", "sections": []}],
+            },
+        })
+        service = _service(session)
+
+        tree = service.get_notebook_tree()
+
+        assert [nb.id for nb in tree] == ["nb1", "nb2"]
+        assert tree[0].sections[0].display_name == "Captured Notes"
+        assert tree[0].section_groups[0].sections[0].notebook_id == "nb1"
+        assert len(session.requests) == 2
+
+    def test_falls_back_to_concurrent_listing(self):
+        """Test per-notebook listing when $expand is refused."""
+        session = FakeSession({
+            NOTEBOOKS_URL: {"value": [
+                {"id": "nb1", "displayName": "One"},
+                {"id": "nb2", "displayName": "Two"},
+            ]},
+            f"{NOTEBOOKS_URL}/nb1/sections": {"value": [_section("a")]},
+            f"{NOTEBOOKS_URL}/nb2/sections": {"value": [_section("b")]},
+            f"{NOTEBOOKS_URL}/nb1/sectionGroups": {"value": []},
+            f"{NOTEBOOKS_URL}/nb2/sectionGroups": {
+                "value": [{"id": "g", "displayName": "G", "sections": [_section("c")]}],
+            },
+        }, expand_supported=False)
+
+        tree = _service(session).get_notebook_tree()
+
+        assert [[s.id for s in nb.sections] for nb in tree] == [["a"], ["b"]]
+        assert tree[1].section_groups[0].sections[0].id == "c"
+
+    def test_section_resolution_reuses_tree(self):
+        """Test that resolving the target section costs one listing request."""
+        session = FakeSession({
+            NOTEBOOKS_URL: {"value": [{
+                "id": "nb1", "displayName": "email notes", "sections": [_section("captured notes")],
+            }]},
+        })
+        service = _service(session)
+        service.get_notebook_tree()
+
+        assert service.get_or_create_target_section() == "captured notes"
+        assert session.requests == [NOTEBOOKS_URL]
+
+    def test_created_section_added_to_tree(self):
+        """Test that a newly created section is cached with its notebook."""
+        session = FakeSession({
+            NOTEBOOKS_URL: {"value": [{"id": "nb1", "displayName": "Email Notes", "sections": []}]},
+        })
+        service = _service(session)
+
+        section_id = service.get_or_create_target_section()
+
+        assert section_id == "new-1"
+        assert session.posts == [f"{NOTEBOOKS_URL}/nb1/sections"]
+        assert service.get_notebook_tree()[0].sections[0].id == "new-1"
+
+
+class TestFindPage:
+    """Tests for OneNoteService.find_page()."""
+
+    def test_ignores_pages_from_before(self):
+        """Test that only pages created after the given time match."""
+        pages_url = f"{GRAPH_BASE_URL}/me/onenote/sections/s1/pages"
+        session = FakeSession({pages_url: {"value": [
+            {"id": "new", "title": "Plan", "createdDateTime": "2026-10-19T09:05:00.1234567Z"},
+            {"id": "old", "title": "Plan", "createdDateTime": "2026-10-18T09:00:00Z"},
+        ]}})
+        service = _service(session, section_name="Emails")
+        service._section_ids["emails"] = "s1"
+
+        assert service.find_page("Plan") == "new"
+        assert service.find_page(
+            "Plan", created_after=datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+        ) == "new"
+        assert service.find_page(
+            "Plan", created_after=datetime(2026, 10, 19, 9, 10, tzinfo=timezone.utc)
+        ) is None
@@ -1,5 +1,6 @@
 """Tests for SQLite-based processed email tracker."""
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -71,6 +72,50 @@ class TestProcessedTrackerInit:
 
         assert result is not None
 
+    def test_uses_wal_journal(self, temp_dir: Path):
+        """Test that the database is switched to WAL for concurrent workers."""
+        import sqlite3
+
+        db_path = temp_dir / "test.db"
+        ProcessedTracker(db_path=db_path)
+
+        conn = sqlite3.connect(db_path)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+
+        assert mode == "wal"
+
+
+class TestEmailFailures:
+    """Tests for email failure counting."""
+
+    def test_concurrent_failures_all_counted(self, temp_dir: Path):
+        """Test that failures recorded at the same time by several workers are not lost."""
+        db_path = temp_dir / "test.db"
+        ProcessedTracker(db_path=db_path)
+        received = datetime(2026, 10, 19, 9, 0)
+
+        def fail(_: int) -> None:
+            ProcessedTracker(db_path=db_path).record_email_failure(
+                "e1", "[Note] e1", received, "boom", max_attempts=100
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(fail, range(40)))
+
+        assert ProcessedTracker(db_path=db_path).get_email_failure("e1")["attempts"] == 40
+
+    def test_dead_lettered_at_max_attempts(self, tracker: ProcessedTracker):
+        """Test that the last allowed attempt turns the email into a dead letter."""
+        received = datetime(2026, 10, 19, 9, 0)
+
+        first = tracker.record_email_failure("e1", "[Note] e1", received, "boom", 2)
+        second = tracker.record_email_failure("e1", "[Note] e1", received, "boom", 2)
+
+        assert first["next_attempt_at"] and not first["dead_lettered_at"]
+        assert second["attempts"] == 2 and second["dead_lettered_at"]
+        assert tracker.is_dead_letter("e1")
+
 
 class TestMarkProcessed:
     """Tests for ProcessedTracker.mark_processed() method."""
@@ -248,3 +293,216 @@ class TestGetRecentProcessed:
         assert record["email_id"] == "test-email"
         assert record["subject"] == "[Note] Test Subject"
         assert record["onenote_page_id"] == "page-123"
+
+
+class TestFindDuplicate:
+    """Tests for content-hash dedup lookups."""
+
+    def test_exact_match(self, tracker: ProcessedTracker):
+        """Test lookup by content hash."""
+        received = datetime.now(timezone.utc)
+        tracker.mark_processed("a", "[Note] A", received, "page-a", content_hash="h1")
+
+        match = tracker.find_duplicate("h1")
+
+        assert match == {"email_id": "a", "subject": "[Note] A", "onenote_page_id": "page-a"}
+        assert tracker.find_duplicate("h2") is None
+
+    def test_duplicates_are_not_originals(self, tracker: ProcessedTracker):
+        """Test that a recorded duplicate never becomes the match."""
+        received = datetime.now(timezone.utc)
+        tracker.mark_processed("b", "[Note] B", received, content_hash="h1", duplicate_of="a")
+
+        assert tracker.find_duplicate("h1") is None
+
+    def test_link_filled_in_when_original_published(self, tracker: ProcessedTracker):
+        """Test that a duplicate linked while its original is pending gets its page."""
+        received = datetime.now(timezone.utc)
+        tracker.mark_processed("a", "[Note] A", received, content_hash="h1")
+        tracker.mark_processed(
+            "b", "[Note] B", received, content_hash="h1", duplicate_of="a", link_to_original=True
+        )
+        tracker.mark_processed("c", "[Note] C", received, content_hash="h1", duplicate_of="a")
+        assert tracker.get_page_id("b") is None
+
+        tracker.mark_processed("a", "[Note] A", received, "page-a")
+
+        assert tracker.get_page_id("b") == "page-a"
+        assert tracker.get_page_id("c") is None
+
+    def test_link_to_published_original(self, tracker: ProcessedTracker):
+        """Test that a duplicate of a published note is linked at once."""
+        received = datetime.now(timezone.utc)
+        tracker.mark_processed("a", "[Note] A", received, "page-a", content_hash="h1")
+
+        tracker.mark_processed(
+            "b", "[Note] B", received, content_hash="h1", duplicate_of="a", link_to_original=True
+        )
+
+        assert tracker.get_page_id("b") == "page-a"
+
+    def test_near_match_within_distance(self, tracker: ProcessedTracker):
+        """Test SimHash lookup through the band index."""
+        received = datetime.now(timezone.utc)
+        value = 0x0123456789ABCDEF
+        tracker.mark_processed("a", "[Note] A", received, "page-a", content_hash="h1", simhash=value)
+
+        assert tracker.find_duplicate("h2", value ^ 0b111, max_distance=3)["email_id"] == "a"
+        assert tracker.find_duplicate("h2", value ^ 0b1111, max_distance=3) is None
+        assert tracker.find_duplicate("h2", value ^ 0b111, max_distance=0) is None
+
+    def test_migrates_old_database(self, temp_dir: Path):
+        """Test that a database from before dedup gains the new columns."""
+        import sqlite3
+
+        db_path = temp_dir / "old.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            """
+            CREATE TABLE processed_emails (
+                email_id TEXT PRIMARY KEY,
+                subject TEXT,
+                processed_at TIMESTAMP,
+                onenote_page_id TEXT,
+                received_at TIMESTAMP
+            )
+            """
+        )
+        conn.execute("INSERT INTO processed_emails (email_id) VALUES ('old')")
+        conn.commit()
+        conn.close()
+
+        tracker = ProcessedTracker(db_path=db_path)
+
+        assert tracker.is_processed("old")
+        assert tracker.find_duplicate("anything", 0, max_distance=3) is None
+
+
+class TestPageGroups:
+    """Tests for the append-mode page cache."""
+
+    def test_unknown_group(self, tracker: ProcessedTracker):
+        """Test that a new group has no page."""
+        assert tracker.get_group_page("tag=deal") is None
+
+    def test_counts_notes_per_page(self, tracker: ProcessedTracker):
+        """Test note counting and reset when a new page is started."""
+        tracker.record_group_note("tag=deal", "page-1")
+        tracker.record_group_note("tag=deal", "page-1")
+        assert tracker.get_group_page("tag=deal") == {"page_id": "page-1", "note_count": 2}
+
+        tracker.record_group_note("tag=deal", "page-2")
+        assert tracker.get_group_page("tag=deal") == {"page_id": "page-2", "note_count": 1}
+
+
+class TestConversations:
+    """Tests for the conversation-to-page index."""
+
+    def test_first_message_anchors_thread(self, tracker: ProcessedTracker):
+        """Test that replies count against the first note and resolve its page."""
+        assert tracker.get_conversation("conv") is None
+
+        tracker.mark_processed("a", "[Note] a", datetime.now(timezone.utc))
+        tracker.record_conversation_message("conv", "a")
+        tracker.record_conversation_message("conv", "b")
+
+        assert tracker.get_conversation("conv") == {
+            "email_id": "a", "page_id": None, "message_count": 2
+        }
+
+        tracker.mark_processed("a", "[Note] a", datetime.now(timezone.utc), onenote_page_id="p1")
+        assert tracker.get_conversation("conv")["page_id"] == "p1"
+
+
+class TestSyncState:
+    """Tests for values kept between runs."""
+
+    def test_clear_by_prefix(self, tracker: ProcessedTracker):
+        """Test that clearing a prefix leaves other keys alone."""
+        tracker.save_sync_state("mail_delta:f1", "link-1")
+        tracker.save_sync_state("mail_delta:f2", "link-2")
+        tracker.save_sync_state("mail_folder:Notes", "f1")
+
+        tracker.clear_sync_state("mail_delta:")
+
+        assert tracker.get_sync_state("mail_delta:f1") is None
+        assert tracker.get_sync_state("mail_delta:f2") is None
+        assert tracker.get_sync_state("mail_folder:Notes") == "f1"
+
+
+class TestSinkDeliveries:
+    """Tests for per-sink delivery tracking."""
+
+    def test_failure_then_delivery(self, tracker: ProcessedTracker):
+        """Test that failures are counted and a later delivery clears them."""
+        tracker.record_sink_failure("a", "onenote", "timeout")
+        tracker.record_sink_failure("a", "onenote", "timeout")
+        tracker.record_sink_location("a", "markdown", "Email Notes/a.md")
+
+        assert tracker.get_sink_location("a", "onenote") is None
+        assert tracker.get_delivered(["a", "b"], "markdown") == {"a"}
+        assert tracker.get_delivered(["a"], "onenote") == set()
+        onenote = tracker.get_deliveries("a")[1]
+        assert (onenote["status"], onenote["attempts"], onenote["last_error"]) == (
+            "failed", 2, "timeout"
+        )
+
+        tracker.record_sink_location("a", "onenote", "page-1")
+
+        assert tracker.get_sink_location("a", "onenote") == "page-1"
+        assert tracker.get_deliveries("a")[1]["last_error"] is None
+
+
+class TestSearch:
+    """Tests for the full-text note index."""
+
+    def test_ranks_title_matches_first(self, tracker: ProcessedTracker):
+        """Test ranking, snippets and joined metadata."""
+        received = datetime.now(timezone.utc)
+        tracker.mark_processed("a", "[Note] Groceries", received, "page-a")
+        tracker.index_note("a", "Groceries", "Buy milk and a budget planner")
+        tracker.mark_processed("b", "[Note] Budget review", received, "page-b")
+        tracker.index_note("b", "Budget review", "Quarterly numbers look fine")
+
+        results = tracker.search("budget")
+
+        assert [r["email_id"] for r in results] == ["b", "a"]
+        assert results[0]["onenote_page_id"] == "page-b"
+        assert "[budget]" in results[1]["snippet"]
+
+    def test_stemming_and_all_terms(self, tracker: ProcessedTracker):
+        """Test that word forms match and every term is required."""
+        tracker.index_note("a", "Planning", "We planned the meetings")
+
+        assert [r["email_id"] for r in tracker.search("plan meeting")] == ["a"]
+        assert tracker.search("plan holiday") == []
+
+    def test_query_syntax_is_not_interpreted(self, tracker: ProcessedTracker):
+        """Test that FTS5 operators in user input are treated as words."""
+        tracker.index_note("a", "Notes", "alpha beta")
+
+        assert tracker.search('alpha" OR "beta NEAR(') == []
+        assert tracker.search("***") == []
+
+    def test_reindex_replaces_entry(self, tracker: ProcessedTracker):
+        """Test that indexing the same email twice keeps one entry."""
+        tracker.index_note("a", "Old", "first version")
+        tracker.index_note("a", "New", "second version")
+
+        assert [r["title"] for r in tracker.search("version")] == ["New"]
+
+    def test_reindex_after_upgrade(self, temp_dir: Path):
+        """Test that notes indexed before the rowid map are still replaced."""
+        import sqlite3
+
+        tracker = ProcessedTracker(db_path=temp_dir / "old.db")
+        tracker.index_note("a", "Old", "first version")
+        conn = sqlite3.connect(temp_dir / "old.db")
+        conn.execute("DROP TABLE notes_fts_rows")
+        conn.commit()
+        conn.close()
+
+        upgraded = ProcessedTracker(db_path=temp_dir / "old.db")
+        upgraded.index_note("a", "New", "second version")
+
+        assert [r["title"] for r in upgraded.search("version")] == ["New"]
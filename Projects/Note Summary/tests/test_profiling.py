@@ -0,0 +1,66 @@
+"""Tests for cycle profiling support."""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from src.utils.metrics import get_metrics
+from src.utils.profiling import StackSampler, profile_call
+
+
+def _busy_cycle() -> int:
+    """Stand-in for a processing cycle with CPU and simulated network time."""
+    metrics = get_metrics()
+    metrics.observe("note_summary_graph_request_seconds", 0.2, method="GET", endpoint="/me")
+    with metrics.cpu_timer("note_summary_processor_cpu_seconds"):
+        total = sum(i * i for i in range(20000))
+    time.sleep(0.03)
+    return total
+
+
+class TestProfileCall:
+    """Tests for profile_call()."""
+
+    def test_writes_report_and_collapsed_stacks(self, temp_dir: Path):
+        """Test that a profiled run produces all output files."""
+        result, profile = profile_call(_busy_cycle, temp_dir, mode="cprofile", interval=0.001)
+
+        assert result == sum(i * i for i in range(20000))
+        assert profile.report_path.exists()
+        assert profile.collapsed_path.exists()
+        assert profile.stats_path is not None and profile.stats_path.exists()
+        assert "Network wait (Graph)" in profile.report_path.read_text()
+
+    def test_separates_network_and_cpu_time(self, temp_dir: Path):
+        """Test that network wait and processor CPU are reported separately."""
+        _, profile = profile_call(_busy_cycle, temp_dir, mode="sampling")
+
+        assert profile.network_seconds == pytest.approx(0.2)
+        assert profile.processor_cpu_seconds > 0
+        assert profile.stats_path is None
+
+    def test_restores_metrics_state(self, temp_dir: Path):
+        """Test that profiling does not leave metrics enabled."""
+        assert get_metrics().enabled is False
+
+        profile_call(_busy_cycle, temp_dir, mode="sampling")
+
+        assert get_metrics().enabled is False
+
+    def test_rejects_unknown_mode(self, temp_dir: Path):
+        """Test validation of the profiler mode."""
+        with pytest.raises(ValueError):
+            profile_call(_busy_cycle, temp_dir, mode="perf")
+
+
+class TestStackSampler:
+    """Tests for the stack sampler."""
+
+    def test_collapsed_format(self):
+        """Test that collapsed output is 'frame;frame count' lines."""
+        sampler = StackSampler(thread_id=0)
+        sampler.samples["main.py:main;main.py:process_emails"] = 3
+
+        assert sampler.collapsed() == "main.py:main;main.py:process_emails 3\n"
+        assert sampler.top_frames() == {"main.py:process_emails": 3}
@@ -0,0 +1,187 @@
+"""Tests for quoted-reply and signature stripping."""
+
+import pytest
+
+from src.processors.reply_stripper import ReplyStripper, is_forward
+
+
+@pytest.fixture
+def stripper() -> ReplyStripper:
+    """A stripper with the default signature patterns."""
+    return ReplyStripper()
+
+
+class TestStripHtml:
+    """Tests for ReplyStripper.strip_html()."""
+
+    def test_outlook_reply_header(self, stripper: ReplyStripper):
+        """Test that the Outlook divRplyFwdMsg block and its rule are removed."""
+        body = (
+            '<div>Decision: ship it</div><hr style="display:inline-block">'
+            '<div id="divRplyFwdMsg"><b>From:</b> Jane</div><div>Old thread</div>'
+        )
+
+        result = stripper.strip_html(body)
+
+        assert result.content == "<div>Decision: ship it</div>"
+        assert result.bytes_removed == len(body) - len(result.content)
+        assert result.removed == ["quote"]
+
+    def test_classic_outlook_header(self, stripper: ReplyStripper):
+        """Test that a From:/Sent:/To: header block starts the quote."""
+        body = (
+            "<p class=MsoNormal>New text</p><p class=MsoNormal><b>From:</b> Jane<br>\n"
+            "<b>Sent:</b> Monday<br><b>To:</b> me</p><p>Old text</p>"
+        )
+
+        assert stripper.strip_html(body).content == "<p class=MsoNormal>New text</p>"
+
+    def test_gmail_quote(self, stripper: ReplyStripper):
+        """Test that the gmail_quote container is removed."""
+        body = (
+            '<div dir="ltr">New text</div><div class="gmail_quote">'
+            '<div class="gmail_attr">On Mon, Jane wrote:</div><blockquote>Old</blockquote></div>'
+        )
+
+        assert stripper.strip_html(body).content == '<div dir="ltr">New text</div>'
+
+    def test_attributed_blockquote(self, stripper: ReplyStripper):
+        """Test that an "On ... wrote:" line and its blockquote are removed."""
+        body = (
+            "<p>Mine</p><div>On 19 Oct 2026, Jane &lt;jane@example.com&gt; wrote:</div>"
+            "<blockquote>Old</blockquote>"
+        )
+
+        assert stripper.strip_html(body).content == "<p>Mine</p>"
+
+    def test_note_blockquote_kept(self, stripper: ReplyStripper):
+        """Test that a block quote written into the note itself stays."""
+        body = "<p>Quote of the day:</p><blockquote>Ship early</blockquote><p>Agreed.</p>"
+
+        result = stripper.strip_html(body)
+
+        assert result.content == body
+        assert result.bytes_removed == 0
+
+    def test_signature_lines(self, stripper: ReplyStripper):
+        """Test that the signature delimiter and mobile footers are removed."""
+        assert stripper.strip_html(
+            "<div>Body</div><div>-- </div><div>Jane Doe<br>CEO</div>"
+        ).content == "<div>Body</div>"
+        assert stripper.strip_html(
+            "<div>Body</div><div>Sent from my iPhone</div>"
+        ).content == "<div>Body</div>"
+
+    def test_long_text_after_delimiter_kept(self, stripper: ReplyStripper):
+        """Test that a "-- " line followed by more than a signature stays."""
+        body = "<div>Intro</div><div>-- </div>" + "<p>Item</p>" * 200
+
+        assert stripper.strip_html(body).content == body
+
+    def test_custom_signature_pattern(self):
+        """Test that configured patterns cut disclaimers."""
+        stripper = ReplyStripper([r"^CONFIDENTIALITY NOTICE"])
+
+        result = stripper.strip_html("<p>Body</p><p>Confidentiality notice: lawyers</p>")
+
+        assert result.content == "<p>Body</p>"
+        assert result.removed == ["signature"]
+
+    def test_bare_forward_kept(self, stripper: ReplyStripper):
+        """Test that a body with nothing above the quote is left whole."""
+        body = '<div id="divRplyFwdMsg"><b>From:</b> Jane</div><div>The forwarded note</div>'
+
+        assert stripper.strip_html(body).content == body
+
+    def test_quotes_kept_when_disabled(self, stripper: ReplyStripper):
+        """Test that quotes=False keeps quoted history but still cuts signatures."""
+        body = '<div>New</div><div class="gmail_quote">Old</div>'
+
+        assert stripper.strip_html(body, quotes=False).content == body
+
+    def test_signature_before_kept_quote(self, stripper: ReplyStripper):
+        """Test that only the signature goes when quoted history is kept."""
+        quote = (
+            "<div>On Mon, 19 Oct 2026, Jane &lt;jane@example.com&gt; wrote:</div>"
+            '<blockquote type="cite"><div>Old thread</div></blockquote>'
+        )
+        body = f"<div>See below</div><div><br></div><div>Sent from my iPhone</div>{quote}"
+
+        result = stripper.strip_html(body, quotes=False)
+
+        assert result.content == f"<div>See below</div><div><br></div>{quote}"
+        assert result.removed == ["signature"]
+
+    def test_signature_line_inside_note_removed_alone(self, stripper: ReplyStripper):
+        """Test that a signature line with the note continuing below only loses itself."""
+        items = "<p>Item</p>" * 200
+        body = f"<div>Intro</div><div>Sent from my iPhone</div>{items}"
+
+        assert stripper.strip_html(body).content == f"<div>Intro</div>{items}"
+
+    def test_signature_kept_when_disabled(self, stripper: ReplyStripper):
+        """Test that signature=False leaves signature lines alone."""
+        body = "<div>Body</div><div>Sent from my iPhone</div>"
+
+        assert stripper.strip_html(body, signature=False).content == body
+
+
+class TestStripText:
+    """Tests for ReplyStripper.strip_text()."""
+
+    def test_attribution_and_quoted_lines(self, stripper: ReplyStripper):
+        """Test that the attribution line and quoted lines are removed."""
+        body = "Hello\n\nOn Mon, 19 Oct 2026 at 09:00, Jane <jane@example.com> wrote:\n> Old"
+
+        assert stripper.strip_text(body).content == "Hello"
+
+    def test_outlook_header(self, stripper: ReplyStripper):
+        """Test that the underscore rule and From:/Sent: header are removed."""
+        body = "Hi\n\n________________________________\nFrom: Jane\nSent: Monday\nTo: me\n\nOld"
+
+        assert stripper.strip_text(body).content == "Hi"
+
+    def test_inline_quotes_kept(self, stripper: ReplyStripper):
+        """Test that quoted lines answered below them stay."""
+        body = "> Can we ship?\nYes, Friday."
+
+        assert stripper.strip_text(body).content == body
+
+    def test_trailing_quote_and_signature(self, stripper: ReplyStripper):
+        """Test that the signature delimiter cuts before a trailing quote."""
+        result = stripper.strip_text("Thanks\n-- \nJane\n> Old")
+
+        assert result.content == "Thanks"
+        assert result.removed == ["quote", "signature"]
+
+    def test_bare_dashes_kept(self, stripper: ReplyStripper):
+        """Test that a "--" rule inside a note does not end it."""
+        body = "Agenda\n--\nItem one\nItem two"
+
+        assert stripper.strip_text(body).content == body
+
+    def test_rfc_delimiter_near_end(self, stripper: ReplyStripper):
+        """Test that "-- " (with the space) before a short signature cuts it."""
+        assert stripper.strip_text("Agenda\nItem one\n-- \nJane Doe\nCEO").content == (
+            "Agenda\nItem one"
+        )
+
+    def test_signature_before_kept_quote(self, stripper: ReplyStripper):
+        """Test that only the signature goes when quoted history is kept."""
+        body = "See below\nSent from my iPhone\n\nOn Mon, Jane wrote:\n> Old"
+
+        result = stripper.strip_text(body, quotes=False)
+
+        assert result.content == "See below\n\nOn Mon, Jane wrote:\n> Old"
+        assert result.removed == ["signature"]
+
+
+class TestIsForward:
+    """Tests for is_forward()."""
+
+    def test_forward_subjects_and_headers(self):
+        """Test that FW:/Fwd: subjects and forward headers are recognised."""
+        assert is_forward("FW: Budget")
+        assert is_forward("[Note] Fwd: Budget")
+        assert is_forward("[Note] Budget", "---------- Forwarded message ---------\nFrom: Jane")
+        assert not is_forward("[Note] Follow-up: Budget", "New text")
@@ -0,0 +1,150 @@
+"""Tests for output sinks."""
+
+import base64
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from src.sinks.markdown_sink import MarkdownSink, obsidian_tag, safe_file_name
+from src.storage.note_store import StoredImage, StoredNote
+from src.storage.processed_tracker import ProcessedTracker
+from src.utils.config import MarkdownConfig
+
+
+RECEIVED = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+
+
+def _note(email_id: str, title: str = "Acme call", **kwargs) -> StoredNote:
+    return StoredNote(
+        email_id=email_id,
+        subject=kwargs.pop("subject", f"[Note:Deal] {title}"),
+        title=title,
+        html_content=kwargs.pop("html_content", f"<p>Notes for {email_id}</p>"),
+        received_at=RECEIVED.isoformat(),
+        content_hash="abc",
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def tracker(temp_dir: Path) -> ProcessedTracker:
+    """Create a ProcessedTracker with a temp database."""
+    return ProcessedTracker(db_path=temp_dir / "test.db")
+
+
+@pytest.fixture
+def vault(temp_dir: Path) -> Path:
+    """An empty vault directory."""
+    path = temp_dir / "vault"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def sink(vault: Path, tracker: ProcessedTracker) -> MarkdownSink:
+    """A MarkdownSink writing into the temp vault."""
+    sink = MarkdownSink(MarkdownConfig(vault_path="vault"), tracker, vault.parent)
+    sink.open()
+    return sink
+
+
+class TestNames:
+    """Tests for file names and tags."""
+
+    def test_safe_file_name(self):
+        """Test that characters vaults reject are removed."""
+        assert safe_file_name('Q3: plan / "draft" #2') == "Q3 plan draft 2"
+        assert safe_file_name("...") == "Untitled"
+
+    def test_obsidian_tag(self):
+        """Test that subject tags become nested Obsidian tags."""
+        assert obsidian_tag("[Note:Deal] Acme") == "note/deal"
+        assert obsidian_tag("No tag") is None
+
+
+class TestMarkdownSink:
+    """Tests for MarkdownSink."""
+
+    def test_writes_note_with_front_matter(self, sink: MarkdownSink, vault: Path):
+        """Test that a note becomes a dated file with front matter."""
+        location = sink.publish(_note("a"))
+
+        assert location == "Email Notes/2026-10-19 Acme call.md"
+        text = (vault / location).read_text()
+        assert text.startswith('---\ntitle: "Acme call"\nemail_id: "a"\n')
+        assert 'tags: ["note/deal"]' in text
+        assert text.endswith("---\n\nNotes for a\n")
+
+    def test_same_title_gets_new_file(self, sink: MarkdownSink, vault: Path):
+        """Test that two notes with one title on one day don't overwrite each other."""
+        results = sink.publish_batch([_note("a"), _note("b")])
+
+        assert [r.location for r in results] == [
+            "Email Notes/2026-10-19 Acme call.md",
+            "Email Notes/2026-10-19 Acme call 2.md",
+        ]
+        assert "Notes for b" in (vault / results[1].location).read_text()
+
+    def test_group_notes_share_one_file(
+        self, sink: MarkdownSink, vault: Path, tracker: ProcessedTracker
+    ):
+        """Test that group notes are appended once each, even when re-published."""
+        group = {"group_key": "tag=note:deal", "group_title": "[Note:Deal]"}
+        notes = [_note("a", **group), _note("b", **group)]
+
+        results = sink.publish_batch(notes)
+        tracker.record_sink_location("a", sink.name, results[0].location)
+        sink.publish_batch(notes)
+
+        text = (vault / "Email Notes" / "Note Deal.md").read_text()
+        assert text.count("Notes for a") == 1
+        assert text.count("Notes for b") == 1
+        assert "<!-- note-summary: b -->" in text
+
+    def test_received_again_goes_to_original_file(
+        self, sink: MarkdownSink, vault: Path, tracker: ProcessedTracker
+    ):
+        """Test that dedup-append entries extend the original note's file."""
+        location = sink.publish(_note("orig"))
+        tracker.record_sink_location("orig", sink.name, location)
+
+        sink.publish(_note("dup", html_content="<p><em>Received again</em></p>",
+                           append_to_email_id="orig"))
+
+        text = (vault / location).read_text()
+        assert text.endswith("<!-- note-summary: dup -->\n*Received again*\n")
+
+    def test_images_written_to_attachments(self, sink: MarkdownSink, vault: Path):
+        """Test that inline images are saved and linked relative to the note."""
+        data = base64.b64encode(b"\x89PNG...").decode()
+        note = _note("a", html_content='<p><img src="name:image1"></p>',
+                     images=[StoredImage("image1", "image/png", data)])
+
+        text = (vault / sink.publish(note)).read_text()
+
+        [image] = (vault / "Email Notes" / "attachments").iterdir()
+        assert image.suffix == ".png"
+        assert f"![](attachments/{image.name})" in text
+
+    def test_pattern_routes_to_folder(self, tracker: ProcessedTracker, vault: Path):
+        """Test that folders_by_pattern picks the folder and images still resolve."""
+        config = MarkdownConfig(vault_path="vault", folders_by_pattern={"[DCN]": "Changes"})
+        sink = MarkdownSink(config, tracker, vault.parent)
+        sink.open()
+        data = base64.b64encode(b"\x89PNG...").decode()
+        note = _note("a", pattern="[DCN]", html_content='<p><img src="name:image1"></p>',
+                     images=[StoredImage("image1", "image/png", data)])
+
+        location = sink.publish(note)
+
+        assert location == "Changes/2026-10-19 Acme call.md"
+        [image] = (vault / "Email Notes" / "attachments").iterdir()
+        assert f"![](../Email%20Notes/attachments/{image.name})" in (vault / location).read_text()
+
+    def test_missing_vault_is_unavailable(self, tracker: ProcessedTracker, temp_dir: Path):
+        """Test that a missing vault fails open() instead of creating it."""
+        sink = MarkdownSink(MarkdownConfig(vault_path="nowhere"), tracker, temp_dir)
+
+        with pytest.raises(RuntimeError, match="Vault directory not found"):
+            sink.open()
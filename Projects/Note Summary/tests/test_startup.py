@@ -0,0 +1,25 @@
+"""Tests guarding the lightweight CLI startup path."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_importing_main_skips_heavy_dependencies():
+    """Test that importing the CLI does not load msal, requests or yaml."""
+    code = (
+        "import sys, src.main; "
+        "print(','.join(m for m in ('msal', 'requests', 'yaml') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == ""